@@ -0,0 +1,4 @@
+"""
+Benchmarks for the supply chain pipeline, run as modules from the repository root,
+e.g. python -m benchmarks.statistics_engines
+"""
@@ -0,0 +1,49 @@
+"""
+Compares exact value-weighted betweenness with sampled estimates at several error bounds
+(time, worst error and top-10 overlap), next to nx.betweenness_centrality, on the scaled graph.
+
+Usage: python -m benchmarks.bottlenecks [--scale 10] [--epsilons 0.1 0.07] [--workers 1]
+"""
+import argparse
+import networkx as nx
+import numpy as np
+from task1_supply_chain_graph.main import load_graph
+from task1_supply_chain_graph.models import GlobalTransactionStatistics
+from task1_supply_chain_graph.bottlenecks import DEFAULT_DELTA, sample_size, value_weighted_betweenness
+from .common import time_call, scale_graph
+
+def scale_statistics(statistics: GlobalTransactionStatistics, times: int) -> GlobalTransactionStatistics:
+    """Company statistics of the copies made by scale_graph, every copy trades like the original"""
+    scaled = GlobalTransactionStatistics()
+    for company_id, company_statistics in statistics.statistics_per_company.items():
+        for copy in range(times):
+            scaled.statistics_per_company[f'{company_id}#{copy}'] = company_statistics
+    return scaled
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=10, help='how many copies of the bundled graph')
+    parser.add_argument('--epsilons', type=float, nargs='+', default=[0.1, 0.07], help='error bounds to sample with')
+    parser.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    G, statistics = load_graph()
+    G = scale_graph(G, args.scale)
+    G.graph['version'] = 0
+    statistics = scale_statistics(statistics, args.scale)
+    print(f"{args.scale}x: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
+
+    _, nx_seconds = time_call(nx.betweenness_centrality, G)
+    print(f"  nx.betweenness_centrality (unweighted, exact): {nx_seconds * 1e3:9.1f} ms")
+    exact, exact_seconds = time_call(value_weighted_betweenness, G, statistics, epsilon=0.0001, workers=args.workers)
+    exact_top = {node_id for node_id, _ in exact.top(10)}
+    print(f"  value-weighted, exact ({exact.samples} sources): {exact_seconds * 1e3:9.1f} ms")
+    for epsilon in args.epsilons:
+        print(f"  value-weighted, epsilon {epsilon} ({sample_size(len(G), epsilon, DEFAULT_DELTA)} samples):", end=' ')
+        estimate, seconds = time_call(value_weighted_betweenness, G, statistics, epsilon=epsilon, workers=args.workers)
+        overlap = len(exact_top & {node_id for node_id, _ in estimate.top(10)})
+        print(f"{seconds * 1e3:9.1f} ms, sampled: {not estimate.exact}, "
+              f"worst error {np.abs(estimate.scores - exact.scores).max():.4f}, top-10 overlap {overlap}/10")
+
+if __name__ == "__main__":
+    main()
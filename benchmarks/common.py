@@ -0,0 +1,51 @@
+import random
+import time
+from pathlib import Path
+import networkx as nx
+from task1_supply_chain_graph.models import TransactionTable
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "task1_supply_chain_graph" / "data"
+
+def time_call(fn: callable, *args, repeat: int = 1, **kwargs):
+    """Runs fn repeat times, returns the last result and the best wall time in seconds"""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+def scale_table(table: TransactionTable, times: int) -> TransactionTable:
+    """Returns a table with all rows repeated the given number of times, sharing vocabularies"""
+    scaled = TransactionTable(table.flows, table.product_names, table.product_categories)
+    scaled.supplier_flow_codes = table.supplier_flow_codes * times
+    scaled.internal_flow_codes = table.internal_flow_codes * times
+    scaled.customer_flow_codes = table.customer_flow_codes * times
+    scaled.product_name_codes = table.product_name_codes * times
+    scaled.product_category_codes = table.product_category_codes * times
+    scaled.order_values = table.order_values * times
+    return scaled
+
+def scale_graph(G: nx.DiGraph, times: int, link_probability: float = 0.05, seed: int = 1) -> nx.DiGraph:
+    """
+    Returns a graph of the given number of copies of G, with node ids suffixed by '#copy',
+    chained together: every non-leaf node links to its own counterpart in the next copy,
+    so a search from the first copy reaches the same companies in all copies, and with
+    the given probability to a random non-leaf node of the next copy as well.
+    """
+    rng = random.Random(seed)
+    nodes = list(G.nodes)
+    inner_nodes = [node for node in nodes if G.out_degree(node) > 0]
+    weights = [attrs.get('weight', 1) for _, _, attrs in G.edges(data=True)]
+    scaled = nx.DiGraph()
+    for copy in range(times):
+        scaled.add_nodes_from(f'{node}#{copy}' for node in nodes)
+        scaled.add_edges_from((f'{u}#{copy}', f'{v}#{copy}', {'weight': attrs.get('weight', 1)})
+                              for u, v, attrs in G.edges(data=True))
+        if copy > 0:
+            for node in inner_nodes:
+                scaled.add_edge(f'{node}#{copy - 1}', f'{node}#{copy}', weight=rng.choice(weights))
+                if rng.random() < link_probability:
+                    scaled.add_edge(f'{node}#{copy - 1}', f'{rng.choice(inner_nodes)}#{copy}', weight=rng.choice(weights))
+    return scaled
@@ -0,0 +1,77 @@
+"""
+Compares traversal and shortest path algorithms on the CSR arrays with the NetworkX
+dict-of-dict versions, on the bundled graph scaled 10x, 100x and 1000x.
+
+Usage: python -m benchmarks.csr_graph [--scales 10 100 1000] [--pairs 50] [--seed 1]
+"""
+import argparse
+import random
+import networkx as nx
+from task1_supply_chain_graph.main import load_graph
+from task1_supply_chain_graph.task2 import GraphSearchMethod, find_related_leafs
+from task1_supply_chain_graph.task3 import GraphPathNotFound, dijkstra_shortest_path
+from task1_supply_chain_graph.csr_graph import (CSRGraph, csr_related_leafs, csr_shortest_path,
+                                                 reachable_codes, single_source_distances)
+from .common import time_call, scale_graph
+
+def run_pairs(algorithm: callable, graph, pairs) -> list:
+    results = []
+    for source, target in pairs:
+        try:
+            results.append(algorithm(graph, source, target)[1])
+        except GraphPathNotFound:
+            results.append(None)
+    return results
+
+def same_distances(expected: list, results: list) -> bool:
+    return all((a is None and b is None) or (a is not None and b is not None and abs(a - b) <= 1e-9 * max(1.0, a))
+               for a, b in zip(expected, results))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scales', type=int, nargs='+', default=[10, 100, 1000], help='how many copies of the bundled graph')
+    parser.add_argument('--pairs', type=int, default=50, help='random source/target pairs for point-to-point search')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    G, _ = load_graph()
+    for scale in args.scales:
+        scaled = scale_graph(G, scale, seed=args.seed)
+        csr, build_seconds = time_call(CSRGraph.from_networkx, scaled)
+        _, lists_seconds = time_call(csr.lists)
+        single_source_distances(csr, 0)  # imports scipy outside of the timings
+        print(f"{scale}x: {len(csr)} nodes, {csr.edge_count} edges, "
+              f"CSR built in {build_seconds * 1e3:.1f} ms (+{lists_seconds * 1e3:.1f} ms for list copies, once per graph)")
+
+        rng = random.Random(args.seed)
+        nodes = list(scaled.nodes)
+        # the company reaching most others in G, it reaches the same companies in every later copy
+        company = max(G.nodes, key=lambda node: len(nx.descendants(G, node)))
+        source = f"{company}#0"
+        expected, nx_seconds = time_call(nx.descendants, scaled, source, repeat=3)
+        result, csr_seconds = time_call(reachable_codes, csr, csr.code(source), repeat=3)
+        print(f"  reachable set ({len(result)} nodes): networkx {nx_seconds * 1e3:9.1f} ms | "
+              f"csr {csr_seconds * 1e3:9.1f} ms | same result: {len(expected) + 1 == len(result)}")
+
+        # paths of leafs grow with the number of copies, so leafs are searched from the tenth last copy
+        leaf_source = f"{company}#{max(0, scale - 10)}"
+        expected, nx_seconds = time_call(find_related_leafs, scaled, leaf_source, GraphSearchMethod.BFS, repeat=3)
+        result, csr_seconds = time_call(csr_related_leafs, csr, leaf_source, GraphSearchMethod.BFS, repeat=3)
+        print(f"  related leafs (BFS, {len(result)} leafs): networkx {nx_seconds * 1e3:9.1f} ms | "
+              f"csr {csr_seconds * 1e3:9.1f} ms | same result: {result == expected}")
+
+        pairs = [(rng.choice(nodes[:len(G)]), rng.choice(nodes)) for _ in range(args.pairs)]
+        expected, nx_seconds = time_call(run_pairs, dijkstra_shortest_path, scaled, pairs)
+        result, csr_seconds = time_call(run_pairs, csr_shortest_path, csr, pairs)
+        print(f"  dijkstra, {args.pairs} pairs: networkx {nx_seconds * 1e3:9.1f} ms | "
+              f"csr {csr_seconds * 1e3:9.1f} ms | same distances: {same_distances(expected, result)}")
+
+        expected, nx_seconds = time_call(nx.single_source_dijkstra_path_length, scaled, source, repeat=3)
+        result, csr_seconds = time_call(single_source_distances, csr, csr.code(source), repeat=3)
+        same = len(expected) == int((result < float('inf')).sum()) and \
+            all(abs(result[csr.code(node)] - distance) <= 1e-9 * max(1.0, distance) for node, distance in expected.items())
+        print(f"  single source distances ({len(expected)} nodes): networkx {nx_seconds * 1e3:9.1f} ms | "
+              f"csr {csr_seconds * 1e3:9.1f} ms | same distances: {same}")
+
+if __name__ == "__main__":
+    main()
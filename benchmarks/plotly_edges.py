@@ -0,0 +1,66 @@
+"""
+Compares figure build time and HTML payload size of the batched edge renderer
+against the previous renderer with one Scattermapbox trace per edge.
+
+Usage: python -m benchmarks.plotly_edges
+"""
+import networkx as nx
+import plotly.graph_objects as go
+from task1_supply_chain_graph.csv_loader import load_companies, load_connections
+from task1_supply_chain_graph.draw_with_plotly import plot_graph_nodes
+from task1_supply_chain_graph.graph_builder import MIN_EDGE_WEIGHT
+from task1_supply_chain_graph.main import load_graph
+from .common import DATA_DIR, time_call
+
+def plot_graph_nodes_per_edge_trace(G):
+    """Previous renderer, kept here as the baseline: one trace per edge"""
+    fig = go.Figure()
+    fig.add_trace(go.Scattermapbox(
+        lat=[attrs["lat"] for _, attrs in G.nodes(data=True)],
+        lon=[attrs["lon"] for _, attrs in G.nodes(data=True)],
+        mode="markers",
+        marker=dict(size=[attrs.get("size", 10) for _, attrs in G.nodes(data=True)]),
+        text=[attrs.get("name", node_id) for node_id, attrs in G.nodes(data=True)],
+        hoverinfo="text",
+    ))
+    for u, v, attrs in G.edges(data=True):
+        weight = attrs.get("weight", 1)
+        fig.add_trace(go.Scattermapbox(
+            lat=[G.nodes[u]["lat"], G.nodes[v]["lat"]],
+            lon=[G.nodes[u]["lon"], G.nodes[v]["lon"]],
+            mode="lines",
+            line=dict(width=weight),
+            hoverinfo="text",
+            text=f"Weight: {weight}"
+        ))
+    fig.update_layout(mapbox_style="open-street-map", mapbox_zoom=1.5,
+                      mapbox_center={"lat": 20, "lon": 0}, margin=dict(l=0, r=0, t=0, b=0))
+    return fig
+
+def all_connections_graph(app_graph: nx.DiGraph) -> nx.DiGraph:
+    """Graph of all companies and connections from CSV files, including ones without transactions"""
+    G = nx.DiGraph()
+    for company in load_companies(str(DATA_DIR / "companies.csv")):
+        G.add_node(company.id, **company._asdict())
+    for connection in load_connections(str(DATA_DIR / "connections.csv")):
+        if connection.id_from in G and connection.id_to in G:
+            weight = app_graph.edges[connection.id_from, connection.id_to]['weight'] \
+                if app_graph.has_edge(connection.id_from, connection.id_to) else MIN_EDGE_WEIGHT
+            G.add_edge(connection.id_from, connection.id_to, weight=weight)
+    return G
+
+def report(name: str, G: nx.DiGraph):
+    print(f"\n{name}: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
+    for label, renderer in (("per-edge traces", plot_graph_nodes_per_edge_trace), ("batched traces", plot_graph_nodes)):
+        fig, seconds = time_call(renderer, G)
+        html, html_seconds = time_call(fig.to_html, include_plotlyjs=False)
+        print(f"  {label:16} {len(fig.data):6} traces, build {seconds:6.2f} s, "
+              f"to_html {html_seconds:6.2f} s, payload {len(html) / 1024:8.0f} KiB")
+
+def main():
+    app_graph, _ = load_graph()
+    report("Application graph", app_graph)
+    report("All connections", all_connections_graph(app_graph))
+
+if __name__ == "__main__":
+    main()
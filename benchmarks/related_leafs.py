@@ -0,0 +1,71 @@
+"""
+Compares peak memory and time of task2.find_related_leafs with the previous
+path-copying search on a deep layered supply chain.
+
+Usage: python -m benchmarks.related_leafs [--depth 200] [--width 20] [--fanout 3]
+"""
+import argparse
+import random
+import tracemalloc
+from collections import deque
+import networkx as nx
+from task1_supply_chain_graph.task2 import GraphSearchMethod, find_related_leafs
+from .common import time_call
+
+def path_copying_related_leafs(G, company_id, method=GraphSearchMethod.BFS):
+    """Previous implementation, kept here as the baseline: copies the path into every queued entry"""
+    related_leafs_with_path = dict()
+    queue = deque(({"id": neighbor_id, "path": [company_id]}) for neighbor_id in G.neighbors(company_id))
+    visited = set([company_id])
+    while queue:
+        current = queue.popleft() if method == GraphSearchMethod.BFS else queue.pop()
+        current_id = current["id"]
+        if current_id in visited:
+            continue
+        visited.add(current_id)
+        if G.out_degree(current_id) == 0:
+            related_leafs_with_path[current_id] = current["path"] + [current_id]
+        else:
+            for neighbor in G.neighbors(current_id):
+                queue.append({"id": neighbor, "path": current["path"] + [current_id]})
+    return related_leafs_with_path
+
+def layered_graph(depth: int, width: int, fanout: int, seed: int = 1) -> nx.DiGraph:
+    """Chain of layers, every node connected to fanout random nodes of the next layer, leafs in the last one"""
+    rng = random.Random(seed)
+    G = nx.DiGraph()
+    G.add_node('root')
+    for node in range(width):
+        G.add_edge('root', (0, node))
+    for layer in range(depth - 1):
+        for node in range(width):
+            for neighbor in rng.sample(range(width), fanout):
+                G.add_edge((layer, node), (layer + 1, neighbor))
+    return G
+
+def peak_memory(fn: callable, *args) -> int:
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--depth', type=int, default=200)
+    parser.add_argument('--width', type=int, default=20)
+    parser.add_argument('--fanout', type=int, default=3)
+    args = parser.parse_args()
+
+    G = layered_graph(args.depth, args.width, args.fanout)
+    print(f"layered graph: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges, depth {args.depth}")
+    for method in GraphSearchMethod:
+        expected, old_seconds = time_call(path_copying_related_leafs, G, 'root', method)
+        result, new_seconds = time_call(find_related_leafs, G, 'root', method)
+        old_peak = peak_memory(path_copying_related_leafs, G, 'root', method)
+        new_peak = peak_memory(find_related_leafs, G, 'root', method)
+        print(f"  {method.name}: path copying {old_seconds * 1e3:8.1f} ms, {old_peak / 2**20:7.2f} MiB peak | "
+              f"parent pointers {new_seconds * 1e3:8.1f} ms, {new_peak / 2**20:7.2f} MiB peak | same result: {result == expected}")
+
+if __name__ == "__main__":
+    main()
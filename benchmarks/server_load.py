@@ -0,0 +1,134 @@
+"""
+Load test of the query server: concurrent keep-alive clients send a mix of shortest path, related leafs,
+company and flow statistics requests, latencies are reported per endpoint as p50/p99 with the throughput.
+Without --url, a server is started on a free port for the test.
+
+Usage: python -m benchmarks.server_load [--clients 16] [--requests 2000] [--workers 2] [--url http://127.0.0.1:8765]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import random
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode, urlsplit
+from task1_supply_chain_graph.main import load_graph
+from task1_supply_chain_graph.instrumentation import QueryMetrics
+from .common import DATA_DIR
+
+def request_targets(seed: int, count: int) -> list[tuple[str, str]]:
+    """(endpoint, path with query) of every request, drawn from the companies and flows of the bundled data"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        G, statistics = load_graph(DATA_DIR)
+    rng = random.Random(seed)
+    nodes = sorted(G.nodes)
+    inner_nodes = [node for node in nodes if G.out_degree(node) > 0]
+    flows = sorted(statistics.statistics_per_flow)
+    targets = []
+    for _ in range(count):
+        endpoint = rng.choices(['shortest_path', 'related_leafs', 'company_statistics', 'flow_statistics'], [4, 2, 2, 1])[0]
+        if endpoint == 'shortest_path':
+            params = {'source': rng.choice(inner_nodes), 'target': rng.choice(nodes)}
+        elif endpoint == 'related_leafs':
+            params = {'company': rng.choice(inner_nodes)}
+        elif endpoint == 'company_statistics':
+            params = {'company': rng.choice(nodes)}
+        else:
+            params = {'flow': rng.choice(flows)}
+        targets.append((endpoint, f'/{endpoint}?{urlencode(params)}'))
+    return targets
+
+async def get(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, host: str, path: str) -> tuple[int, bytes]:
+    writer.write(f'GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n'.encode())
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while (line := await reader.readline()) not in (b'\r\n', b''):
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+async def client(host: str, port: int, queue: asyncio.Queue, metrics: dict[str, QueryMetrics], errors: list):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while not queue.empty():
+            endpoint, path = queue.get_nowait()
+            start = time.perf_counter()
+            status, _ = await get(reader, writer, host, path)
+            metrics.setdefault(endpoint, QueryMetrics(endpoint)).latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors.append((path, status))
+    finally:
+        writer.close()
+
+async def run_load(host: str, port: int, targets: list[tuple[str, str]], clients: int) -> tuple[dict[str, QueryMetrics], list, float]:
+    queue = asyncio.Queue()
+    for target in targets:
+        queue.put_nowait(target)
+    metrics = {}
+    errors = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, queue, metrics, errors) for _ in range(clients)))
+    return metrics, errors, time.perf_counter() - start
+
+async def time_figure(host: str, port: int) -> tuple[float, float, int]:
+    """Latency of the first (built) and second (cached) figure request, with the figure size"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        latencies = []
+        for _ in range(2):
+            start = time.perf_counter()
+            _, body = await get(reader, writer, host, '/figure')
+            latencies.append(time.perf_counter() - start)
+        return latencies[0], latencies[1], len(body)
+    finally:
+        writer.close()
+
+def start_server(workers: int) -> tuple[subprocess.Popen, int]:
+    process = subprocess.Popen([sys.executable, '-m', 'task1_supply_chain_graph.server', '--port', '0', '--workers', str(workers)],
+                               stdout=subprocess.PIPE, text=True)
+    for line in process.stdout:
+        if line.startswith('Serving'):
+            return process, urlsplit(line.split(' on ')[1].split()[0]).port
+    raise RuntimeError('Server exited before listening')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--url', default=None, help='running server to test, by default one is started')
+    parser.add_argument('--clients', type=int, default=16, help='concurrent keep-alive connections')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=2, help='worker processes of the started server')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    targets = request_targets(args.seed, args.requests)
+    process = None
+    if args.url is None:
+        process, port = start_server(args.workers)
+        host = '127.0.0.1'
+    else:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port
+    try:
+        built, cached, size = asyncio.run(time_figure(host, port))
+        print(f"figure ({size / 2**20:.1f} MiB): first {built * 1e3:.1f} ms, cached {cached * 1e3:.1f} ms")
+        metrics, errors, seconds = asyncio.run(run_load(host, port, targets, args.clients))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    print(f"{args.requests} requests from {args.clients} clients in {seconds:.2f} s ({args.requests / seconds:.0f} requests/sec), "
+          f"{len(errors)} errors")
+    every = QueryMetrics('all', [latency for m in metrics.values() for latency in m.latencies])
+    for name, m in sorted(metrics.items()) + [('all', every)]:
+        print(f"  {name:20} {m.count:6} requests, p50 {m.quantile(0.5) * 1e3:8.2f} ms, "
+              f"p99 {m.quantile(0.99) * 1e3:8.2f} ms, max {max(m.latencies) * 1e3:8.2f} ms")
+    for path, status in errors[:5]:
+        print(f"  {status} {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Compares the point-to-point shortest path algorithms of task3 with the previous
+full-graph Dijkstra and nx.shortest_path on random company pairs.
+
+Usage: python -m benchmarks.shortest_path [--pairs 500] [--seed 1]
+"""
+import argparse
+import heapq
+import math
+import random
+import networkx as nx
+from task1_supply_chain_graph.main import load_graph
+from task1_supply_chain_graph.task3 import (GraphPathNotFound, dijkstra_shortest_path,
+                                            bidirectional_dijkstra_shortest_path, astar_shortest_path)
+from task1_supply_chain_graph.csr_graph import csr_dijkstra_shortest_path
+from .common import time_call
+
+def full_dijkstra_shortest_path(G, source, target):
+    """Previous implementation, kept here as the baseline: initializes all nodes, never stops early"""
+    queue = [(0, source)]
+    distances = {node: float('inf') for node in G.nodes}
+    distances[source] = 0
+    previous_nodes = {node: None for node in G.nodes}
+    while queue:
+        current_distance, current_node = heapq.heappop(queue)
+        if current_distance > distances[current_node]:
+            continue
+        for neighbor in G.neighbors(current_node):
+            distance = current_distance + G[current_node][neighbor].get('weight', 1)
+            if distance < distances[neighbor]:
+                distances[neighbor] = distance
+                previous_nodes[neighbor] = current_node
+                heapq.heappush(queue, (distance, neighbor))
+    if distances[target] == float('inf'):
+        raise GraphPathNotFound(f"No path exists between {source} and {target}.")
+    path = []
+    current_node = target
+    while current_node is not None:
+        path.append(current_node)
+        current_node = previous_nodes[current_node]
+    return path[::-1], distances[target]
+
+def networkx_shortest_path(G, source, target):
+    try:
+        path = nx.shortest_path(G, source, target, weight="weight")
+    except nx.NetworkXNoPath:
+        raise GraphPathNotFound(f"No path exists between {source} and {target}.")
+    return path, nx.path_weight(G, path, weight="weight")
+
+ALGORITHMS = {
+    'nx.shortest_path': networkx_shortest_path,
+    'dijkstra (previous, full)': full_dijkstra_shortest_path,
+    'dijkstra (early exit)': dijkstra_shortest_path,
+    'bidirectional dijkstra': bidirectional_dijkstra_shortest_path,
+    'a* (great-circle)': astar_shortest_path,
+    'dijkstra (csr arrays)': csr_dijkstra_shortest_path,
+}
+
+def run_pairs(algorithm: callable, G, pairs):
+    results = []
+    for source, target in pairs:
+        try:
+            results.append(algorithm(G, source, target)[1])
+        except GraphPathNotFound:
+            results.append(None)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pairs', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    G, _ = load_graph()
+    rng = random.Random(args.seed)
+    nodes = list(G.nodes)
+    # pairs are drawn among companies with outgoing connections, so most of them are connected
+    sources = [node for node in nodes if G.out_degree(node) > 0]
+    pairs = [(rng.choice(sources), rng.choice(nodes)) for _ in range(args.pairs)]
+
+    expected = None
+    print(f"{len(pairs)} random pairs on {G.number_of_nodes()} nodes, {G.number_of_edges()} edges")
+    for name, algorithm in ALGORITHMS.items():
+        costs, seconds = time_call(run_pairs, algorithm, G, pairs, repeat=3)
+        if expected is None:
+            expected = costs
+            print(f"  connected pairs: {sum(cost is not None for cost in costs)}")
+        same = all((a is None and b is None) or (a is not None and b is not None and math.isclose(a, b, rel_tol=1e-9))
+                   for a, b in zip(costs, expected))
+        print(f"  {name:28} {seconds / len(pairs) * 1e6:8.1f} us/query, costs match nx: {same}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Compares value sketches per flow with keeping every order value per flow (exact quantiles):
+memory per flow, build cost and accuracy of p50/p95/p99 and distinct products,
+for one pass and for sketches merged across shards.
+
+Usage: python -m benchmarks.sketches [--scale 10] [--shards 4]
+"""
+import argparse
+import tracemalloc
+from collections import defaultdict
+import numpy as np
+from task1_supply_chain_graph.csv_loader import load_transaction_table
+from task1_supply_chain_graph.statistics import merge_statistics
+from task1_supply_chain_graph.statistics_numpy import calculate_statistics_numpy
+from .common import DATA_DIR, time_call, scale_table
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+def values_per_flow(table) -> dict[str, list[float]]:
+    """Baseline: every order value and product of every flow"""
+    flow_ids = table.flows.values
+    product_names = table.product_names.values
+    values = defaultdict(list)
+    products = defaultdict(set)
+    for supplier, internal, customer, product, value in zip(table.supplier_flow_codes, table.internal_flow_codes,
+                                                            table.customer_flow_codes, table.product_name_codes, table.order_values):
+        for code in (supplier, internal, customer):
+            values[flow_ids[code]].append(value)
+            products[flow_ids[code]].add(product_names[product])
+    return values, products
+
+def traced_memory(fn: callable, *args, **kwargs) -> tuple[object, int]:
+    tracemalloc.start()
+    result = fn(*args, **kwargs)
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, current
+
+def rank_errors(statistics, values: dict[str, list[float]], min_quantity: int) -> list[float]:
+    """Worst rank error of the sketch quantiles per quantile, over flows with at least min_quantity values"""
+    errors = [0.0] * len(QUANTILES)
+    for flow_id, flow_values in values.items():
+        if len(flow_values) < min_quantity:
+            continue
+        flow_values = np.sort(flow_values)
+        sketch = statistics.statistics_per_flow[flow_id].sketch
+        for i, q in enumerate(QUANTILES):
+            estimate = sketch.quantile(q)
+            low = np.searchsorted(flow_values, estimate, 'left') / len(flow_values)
+            high = np.searchsorted(flow_values, estimate, 'right') / len(flow_values)
+            errors[i] = max(errors[i], 0.0 if low <= q <= high else min(abs(low - q), abs(high - q)))
+    return errors
+
+def product_error(statistics, products: dict[str, set]) -> float:
+    """Mean relative error of distinct product counts"""
+    errors = [abs(statistics.statistics_per_flow[flow_id].sketch.distinct_products() - len(flow_products)) / len(flow_products)
+              for flow_id, flow_products in products.items()]
+    return sum(errors) / len(errors)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=10, help='how many times to repeat the bundled transactions')
+    parser.add_argument('--shards', type=int, default=4, help='shards to aggregate separately and merge')
+    parser.add_argument('--min-quantity', type=int, default=1000, help='smallest flow to check quantiles on')
+    args = parser.parse_args()
+
+    table = scale_table(load_transaction_table(str(DATA_DIR / "transactions.csv")), args.scale)
+    (values, products), values_bytes = traced_memory(values_per_flow, table)
+    statistics, sketch_bytes = traced_memory(calculate_statistics_numpy, table, sketches=True)
+    _, plain_bytes = traced_memory(calculate_statistics_numpy, table)
+    flows = len(statistics.statistics_per_flow)
+    sketches = 1 + flows + 2 * len(statistics.statistics_per_company)
+    print(f"{len(table)} transactions, {flows} flows, {sketches} sketches (global, flows, companies exported/imported)")
+    print(f"  every value and product:  {values_bytes / flows:8.0f} bytes per flow")
+    print(f"  sketches:                 {(sketch_bytes - plain_bytes) / sketches:8.0f} bytes per sketch")
+
+    _, plain_time = time_call(calculate_statistics_numpy, table)
+    statistics, sketch_time = time_call(calculate_statistics_numpy, table, sketches=True)
+    _, values_time = time_call(values_per_flow, table)
+    print("Build:")
+    print(f"  statistics only:          {plain_time * 1e3:8.1f} ms")
+    print(f"  statistics with sketches: {sketch_time * 1e3:8.1f} ms")
+    print(f"  every value per flow:     {values_time * 1e3:8.1f} ms")
+
+    rows = list(range(len(table)))
+    shard_size = -(-len(rows) // args.shards)
+    merged = calculate_statistics_numpy(table.take(rows[:shard_size]), sketches=True)
+    for start in range(shard_size, len(rows), shard_size):
+        merge_statistics(merged, calculate_statistics_numpy(table.take(rows[start:start + shard_size]), sketches=True))
+
+    print(f"Worst rank error of {', '.join(f'p{round(q * 100)}' for q in QUANTILES)} "
+          f"over flows with at least {args.min_quantity} values:")
+    for name, result in (('one pass', statistics), (f'{args.shards} merged shards', merged)):
+        errors = ', '.join(f'{error:.4f}' for error in rank_errors(result, values, args.min_quantity))
+        print(f"  {name + ':':24}  {errors}, distinct products off by {product_error(result, products):.1%} on average")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Compares building the statistics cube once with answering every category query by a full scan
+over the filtered transactions, on the bundled transactions scaled up.
+
+Usage: python -m benchmarks.statistics_cube [--scale 10]
+"""
+import argparse
+import time
+import numpy as np
+from task1_supply_chain_graph.csv_loader import load_transaction_table
+from task1_supply_chain_graph.statistics_numpy import calculate_statistics_numpy
+from task1_supply_chain_graph.statistics_cube import StatisticsCube
+from .common import DATA_DIR, time_call, scale_table
+
+def scan_category(table, category: str):
+    """Baseline: filters the transactions of a category and aggregates them from scratch"""
+    code = table.product_categories.get(category)
+    indices = np.flatnonzero(np.frombuffer(table.product_category_codes, dtype=np.intc) == code)
+    return calculate_statistics_numpy(table.take(indices.tolist()))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=10, help='how many times to repeat the bundled transactions')
+    args = parser.parse_args()
+
+    table = scale_table(load_transaction_table(str(DATA_DIR / "transactions.csv")), args.scale)
+    categories = table.product_categories.values
+    flow_id = table.flows.values[table.supplier_flow_codes[0]]
+    print(f"Transactions: {len(table)}, categories: {len(categories)}")
+
+    _, full_time = time_call(calculate_statistics_numpy, table)
+    cube, build_time = time_call(StatisticsCube.from_table, table)
+    scans, scan_time = time_call(lambda: {category: scan_category(table, category) for category in categories})
+
+    start = time.perf_counter()
+    answers = {category: (cube.total(category), cube.flow(flow_id, category)) for category in categories}
+    query_time = time.perf_counter() - start
+
+    same = all(answers[category][0].quantity == scans[category].global_statistics.quantity
+               and answers[category][1] == scans[category].statistics_per_flow.get(flow_id, answers[category][1])
+               for category in categories)
+    print(f"  full statistics pass:         {full_time:7.3f} s")
+    print(f"  cube build (once):            {build_time:7.3f} s")
+    print(f"  full scans, one per category: {scan_time:7.3f} s ({scan_time / len(categories) * 1e3:.1f} ms per query)")
+    print(f"  cube queries:                 {query_time:7.5f} s ({query_time / len(categories) * 1e6:.1f} us per query)")
+    print(f"  cube pays off after {build_time / (scan_time / len(categories)):.1f} category queries, same results: {same}")
+
+if __name__ == "__main__":
+    main()
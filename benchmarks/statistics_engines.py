@@ -0,0 +1,28 @@
+"""
+Compares the Python and NumPy engines of calculate_statistics on the bundled transactions, scaled up.
+
+Usage: python -m benchmarks.statistics_engines [--scale 100]
+"""
+import argparse
+from task1_supply_chain_graph.csv_loader import load_transaction_table
+from task1_supply_chain_graph.statistics import calculate_statistics
+from task1_supply_chain_graph.statistics_numpy import calculate_statistics_numpy
+from .common import DATA_DIR, time_call, scale_table
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=100, help='how many times to repeat the bundled transactions')
+    args = parser.parse_args()
+
+    table = scale_table(load_transaction_table(str(DATA_DIR / "transactions.csv")), args.scale)
+    print(f"Transactions: {len(table)}")
+
+    python_result, python_time = time_call(calculate_statistics, table)
+    print(f"Python engine: {python_time:.2f} s")
+    numpy_result, numpy_time = time_call(calculate_statistics_numpy, table, repeat=3)
+    print(f"NumPy engine:  {numpy_time:.2f} s")
+
+    print(f"Speedup: {python_time / numpy_time:.1f}x, results identical: {python_result == numpy_result}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Compares memory per flow/company and update throughput of the slotted statistics models
+with the previous UserDict + __dict__ dataclass models and item-access update loop.
+
+Usage: python -m benchmarks.statistics_models [--scale 10]
+"""
+import argparse
+import tracemalloc
+from collections import UserDict
+from dataclasses import dataclass, field
+from task1_supply_chain_graph.csv_loader import load_transaction_table
+from task1_supply_chain_graph.statistics import calculate_statistics
+from .common import DATA_DIR, time_call, scale_table
+
+# Previous models and update loop, kept here as the baseline
+
+@dataclass
+class DictTransactionStatistics:
+    quantity: int = 0
+    total_value: float = 0.0
+    average_value: float = 0.0
+    max_value: float = 0.0
+    min_value: float = field(default_factory=lambda: float('inf'))
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+@dataclass
+class DictCompanyTransactionStatistics:
+    exported: DictTransactionStatistics = field(default_factory=DictTransactionStatistics)
+    imported: DictTransactionStatistics = field(default_factory=DictTransactionStatistics)
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+class StatisticsPerKey(UserDict):
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+
+    def __getitem__(self, key):
+        return super().__getitem__(key)
+
+@dataclass
+class DictGlobalTransactionStatistics:
+    global_statistics: DictTransactionStatistics = field(default_factory=DictTransactionStatistics)
+    statistics_per_flow: StatisticsPerKey = field(default_factory=StatisticsPerKey)
+    statistics_per_company: StatisticsPerKey = field(default_factory=StatisticsPerKey)
+
+    def __getitem__(self, key):
+        return getattr(self, key)
+
+def update_statistics_by_item(stats, value):
+    stats['quantity'] += 1
+    stats['total_value'] += value
+    stats['max_value'] = max(stats['max_value'], value)
+    stats['min_value'] = min(stats['min_value'], value)
+    stats['average_value'] = stats['total_value'] / stats['quantity'] if stats['quantity'] > 0 else 0.0
+
+def calculate_statistics_by_item(table):
+    results = DictGlobalTransactionStatistics()
+    flow_ids = table.flows.values
+    company_ids = table.flows.company_id_pairs()
+    for supplier, internal, customer, value in zip(table.supplier_flow_codes, table.internal_flow_codes,
+                                                   table.customer_flow_codes, table.order_values):
+        flow_codes = (supplier, internal, customer)
+        exporting_companies = [company_ids[code][0] for code in flow_codes]
+        importing_companies = [company_ids[code][1] for code in flow_codes]
+        update_statistics_by_item(results['global_statistics'], value)
+        for flow_id in [flow_ids[code] for code in flow_codes]:
+            if flow_id not in results['statistics_per_flow']:
+                results['statistics_per_flow'][flow_id] = DictTransactionStatistics()
+            update_statistics_by_item(results['statistics_per_flow'][flow_id], value)
+        for company_id in exporting_companies + importing_companies:
+            if company_id not in results['statistics_per_company']:
+                results['statistics_per_company'][company_id] = DictCompanyTransactionStatistics()
+        for company_id in exporting_companies:
+            update_statistics_by_item(results['statistics_per_company'][company_id]['exported'], value)
+        for company_id in importing_companies:
+            update_statistics_by_item(results['statistics_per_company'][company_id]['imported'], value)
+    return results
+
+def as_tuples(results) -> tuple:
+    def values(stats):
+        return (stats.quantity, stats.total_value, stats.average_value, stats.max_value, stats.min_value)
+    return (values(results.global_statistics),
+            [(flow_id, values(stats)) for flow_id, stats in results.statistics_per_flow.items()],
+            [(company_id, values(stats.exported), values(stats.imported)) for company_id, stats in results.statistics_per_company.items()])
+
+def traced_memory(fn: callable, *args) -> tuple[object, int]:
+    """Result of fn and the memory it still holds after returning"""
+    tracemalloc.start()
+    result = fn(*args)
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, current
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=10, help='how many times to repeat the bundled transactions')
+    args = parser.parse_args()
+
+    table = load_transaction_table(str(DATA_DIR / "transactions.csv"))
+    old_result, old_bytes = traced_memory(calculate_statistics_by_item, table)
+    new_result, new_bytes = traced_memory(calculate_statistics, table)
+    flows, companies = len(new_result.statistics_per_flow), len(new_result.statistics_per_company)
+    entries = flows + companies
+    print(f"{flows} flows, {companies} companies")
+    print(f"  previous models: {old_bytes / entries:6.0f} bytes per flow/company")
+    print(f"  slotted models:  {new_bytes / entries:6.0f} bytes per flow/company")
+    print(f"  same results: {as_tuples(old_result) == as_tuples(new_result)}")
+
+    table = scale_table(table, args.scale)
+    _, old_time = time_call(calculate_statistics_by_item, table)
+    _, new_time = time_call(calculate_statistics, table)
+    print(f"Update throughput on {len(table)} transactions:")
+    print(f"  previous models: {len(table) / old_time / 1e3:7.1f} k transactions/s")
+    print(f"  slotted models:  {len(table) / new_time / 1e3:7.1f} k transactions/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Compares serial and multi-process statistics aggregation on the bundled transactions file, scaled up.
+
+Usage: python -m benchmarks.statistics_parallel [--scale 100] [--workers 1 2 4 8]
+"""
+import argparse
+import math
+import os
+import tempfile
+from pathlib import Path
+from task1_supply_chain_graph.csv_loader import load_transaction_table
+from task1_supply_chain_graph.statistics_numpy import calculate_statistics_numpy
+from task1_supply_chain_graph.statistics_parallel import calculate_statistics_parallel
+from .common import DATA_DIR, time_call
+
+def write_scaled_csv(source: Path, target: Path, times: int) -> None:
+    """Writes the header of source once and its rows the given number of times"""
+    header, rows = source.read_text(encoding='utf-8').split('\n', 1)
+    if not rows.endswith('\n'):
+        rows += '\n'
+    with open(target, 'w', encoding='utf-8', newline='') as file:
+        file.write(header + '\n')
+        for _ in range(times):
+            file.write(rows)
+
+def same_statistics(a, b) -> bool:
+    """Counts, min/max and key order identical, totals equal up to summation order"""
+    def same(x, y):
+        return ((x.quantity, x.max_value, x.min_value) == (y.quantity, y.max_value, y.min_value)
+                and math.isclose(x.total_value, y.total_value, rel_tol=1e-9))
+    return (same(a.global_statistics, b.global_statistics)
+            and list(a.statistics_per_flow) == list(b.statistics_per_flow)
+            and list(a.statistics_per_company) == list(b.statistics_per_company)
+            and all(same(a.statistics_per_flow[k], v) for k, v in b.statistics_per_flow.items())
+            and all(same(a.statistics_per_company[k].exported, v.exported) and same(a.statistics_per_company[k].imported, v.imported)
+                    for k, v in b.statistics_per_company.items()))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=int, default=100, help='how many times to repeat the bundled transactions')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = Path(tmp_dir) / 'transactions.csv'
+        write_scaled_csv(DATA_DIR / 'transactions.csv', csv_path, args.scale)
+        print(f"{csv_path.stat().st_size / 2**20:.0f} MiB file, {os.cpu_count()} CPUs")
+
+        serial, serial_time = time_call(lambda: calculate_statistics_numpy(load_transaction_table(str(csv_path))))
+        print(f"  serial (load table + NumPy):  {serial_time:6.2f} s")
+        for workers in args.workers:
+            result, seconds = time_call(calculate_statistics_parallel, str(csv_path), workers)
+            print(f"  {workers:2} workers: {seconds:6.2f} s, speedup {serial_time / seconds:4.1f}x, same statistics: {same_statistics(result, serial)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Reproducible benchmark suite on a synthetic dataset: loading, statistics, graph building,
+related leafs, Dijkstra and both plot backends. Every case records its best time and a
+fingerprint of its result; with --baseline, results are compared against an earlier run
+and the exit code is 1 on a timing regression or a changed result.
+
+Usage: python -m benchmarks.suite [--scale 1] [--transactions N] [--repeat 3]
+                                  [--output results.json] [--baseline baseline.json] [--tolerance 0.2]
+"""
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import sys
+from dataclasses import asdict
+from pathlib import Path
+import matplotlib
+matplotlib.use('Agg')  # figures are drawn off screen
+import matplotlib.pyplot as plt
+import networkx as nx
+import numpy as np
+from task1_supply_chain_graph.csv_loader import load_companies, load_connections, load_transaction_table
+from task1_supply_chain_graph.models import FlowIndex
+from task1_supply_chain_graph.statistics import calculate_statistics
+from task1_supply_chain_graph.statistics_numpy import calculate_statistics_numpy
+from task1_supply_chain_graph.graph_builder import build_graph
+from task1_supply_chain_graph.graph_snapshot import file_hash
+from task1_supply_chain_graph.task2 import GraphSearchMethod, find_related_leafs
+from task1_supply_chain_graph.task3 import GraphPathNotFound, dijkstra_shortest_path
+from task1_supply_chain_graph.draw_with_plotly import plot_graph_nodes
+from task1_supply_chain_graph.draw_with_matplotlib import LayoutMethod, MatplotlibGraphView, get_layout
+from .common import time_call
+from .synthetic import SyntheticConfig, generate
+
+SUITE_VERSION = 1
+DATA_CACHE_DIR = Path(__file__).resolve().parent / ".data"
+# timing differences below this many seconds are noise, not regressions
+MIN_REGRESSION_SECONDS = 0.005
+
+def dataset_dir(config: SyntheticConfig) -> Path:
+    """Generates the dataset of the configuration once, later runs reuse the files"""
+    path = DATA_CACHE_DIR / config.key()
+    if not (path / "transactions.csv").exists():
+        print(f"Generating synthetic dataset in {path}...")
+        generate(path, config)
+    return path
+
+def quiet(fn: callable) -> callable:
+    """fn with its progress output swallowed, so it does not flood the report"""
+    def call(*args, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn(*args, **kwargs)
+    return call
+
+def statistics_fingerprint(statistics) -> dict:
+    return {'quantity': statistics.global_statistics.quantity,
+            'total_value': round(statistics.global_statistics.total_value, 2),
+            'flows': len(statistics.statistics_per_flow),
+            'companies': len(statistics.statistics_per_company)}
+
+def related_leafs_queries(G, sources: list[str]) -> dict:
+    leafs = paths = 0
+    for source in sources:
+        result = find_related_leafs(G, source, GraphSearchMethod.BFS)
+        leafs += len(result)
+        paths += sum(len(path) for path in result.values())
+    return {'leafs': leafs, 'path_nodes': paths}
+
+def dijkstra_queries(G, pairs: list[tuple[str, str]]) -> dict:
+    found = 0
+    total_distance = 0.0
+    for source, target in pairs:
+        try:
+            total_distance += dijkstra_shortest_path(G, source, target)[1]
+            found += 1
+        except GraphPathNotFound:
+            pass
+    return {'found': found, 'total_distance': round(total_distance, 6)}
+
+def draw_matplotlib(G) -> dict:
+    view = MatplotlibGraphView(G, LayoutMethod.GEOGRAPHIC)
+    view._draw_base()
+    view.figure.canvas.draw()
+    artists = len(view.figure.axes[0].get_children())
+    plt.close(view.figure)
+    return {'artists': artists}
+
+def run_suite(data_dir: Path, repeat: int = 3, queries: int = 50, seed: int = 1, plots: bool = True) -> dict:
+    """Times every case, returns {case: {'seconds': best time, 'result': fingerprint}}"""
+    cases = {}
+
+    def case(name: str, fn: callable, *args, fingerprint: callable = None, runs: int = repeat):
+        result, seconds = time_call(quiet(fn), *args, repeat=runs)
+        cases[name] = {'seconds': seconds, 'result': fingerprint(result) if fingerprint else result}
+        print(f"  {name:28} {seconds * 1e3:10.1f} ms  {cases[name]['result']}")
+        return result
+
+    companies = case('load_companies', load_companies, str(data_dir / "companies.csv"), fingerprint=len)
+    flow_index = FlowIndex()
+    connections = case('load_connections', load_connections, str(data_dir / "connections.csv"), flow_index, fingerprint=len)
+    table = case('load_transactions', load_transaction_table, str(data_dir / "transactions.csv"), flow_index, fingerprint=len)
+    case('calculate_statistics', calculate_statistics, table, fingerprint=statistics_fingerprint)
+    statistics = case('calculate_statistics_numpy', calculate_statistics_numpy, table, fingerprint=statistics_fingerprint)
+    G = case('build_graph', build_graph, companies, connections, statistics, flow_index,
+             fingerprint=lambda G: {'nodes': G.number_of_nodes(), 'edges': G.number_of_edges()})
+
+    rng = random.Random(seed)
+    nodes = sorted(G.nodes)
+    inner_nodes = [node for node in nodes if G.out_degree(node) > 0]
+    case('find_related_leafs', related_leafs_queries, G, rng.sample(inner_nodes, min(queries, len(inner_nodes))))
+    # targets are drawn from the companies downstream of the source, so most pairs have a path
+    pairs = []
+    for source in rng.choices(inner_nodes, k=queries):
+        pairs.append((source, rng.choice(sorted(nx.descendants(G, source)))))
+    case('dijkstra_shortest_path', dijkstra_queries, G, pairs)
+
+    if plots:
+        case('plotly_figure', plot_graph_nodes, G, fingerprint=lambda fig: {'traces': len(fig.data)})
+        get_layout(G, LayoutMethod.GEOGRAPHIC, cache_dir=None)  # layout is cached in memory, not in the data directory
+        # drawing every edge as an arrow patch is slow, one run is enough
+        case('matplotlib_draw', draw_matplotlib, G, runs=1)
+    return cases
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """Prints every case against the baseline, returns False on a regression or a changed result"""
+    if baseline.get('dataset') != results['dataset'] or baseline.get('suite_version') != SUITE_VERSION:
+        print("Baseline was recorded on a different dataset or suite version, results are not comparable.")
+        return False
+    ok = True
+    print(f"\nCase                          Baseline (ms)  Current (ms)   Ratio  Status")
+    for name, current in results['cases'].items():
+        expected = baseline['cases'].get(name)
+        if expected is None:
+            print(f"{name:28} {'-':>15} {current['seconds'] * 1e3:13.1f} {'-':>7}  new")
+            continue
+        ratio = current['seconds'] / expected['seconds'] if expected['seconds'] > 0 else float('inf')
+        if current['result'] != expected['result']:
+            status = f"RESULT CHANGED: {expected['result']} -> {current['result']}"
+            ok = False
+        elif ratio > 1 + tolerance and current['seconds'] - expected['seconds'] > MIN_REGRESSION_SECONDS:
+            status = "REGRESSION"
+            ok = False
+        elif ratio < 1 / (1 + tolerance):
+            status = "faster"
+        else:
+            status = "ok"
+        print(f"{name:28} {expected['seconds'] * 1e3:15.1f} {current['seconds'] * 1e3:13.1f} {ratio:7.2f}  {status}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1.0, help='size of every tier relative to the bundled dataset')
+    parser.add_argument('--transactions', type=int, default=None, help='number of transactions, defaults to 36000 times the scale')
+    parser.add_argument('--seed', type=int, default=1, help='seed of the dataset and of the query sample')
+    parser.add_argument('--data-dir', type=Path, default=None, help='existing dataset to run on instead of a synthetic one')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case, the best time is kept')
+    parser.add_argument('--queries', type=int, default=50, help='related leafs and shortest path queries per case')
+    parser.add_argument('--skip-plots', action='store_true', help='leave out the plotly and matplotlib cases')
+    parser.add_argument('--output', type=Path, default=None, help='JSON file to write results to, e.g. a new baseline')
+    parser.add_argument('--baseline', type=Path, default=None, help='JSON results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown relative to the baseline')
+    args = parser.parse_args()
+
+    if args.data_dir is not None:
+        data_dir = args.data_dir
+        dataset = {name: file_hash(data_dir / f"{name}.csv") for name in ('companies', 'connections', 'transactions')}
+    else:
+        config = SyntheticConfig.scaled(args.scale, args.transactions, args.seed)
+        data_dir = dataset_dir(config)
+        dataset = asdict(config)
+    print(f"Running benchmark suite on {data_dir} (best of {args.repeat}):")
+    results = {
+        'suite_version': SUITE_VERSION,
+        'dataset': dataset,
+        'queries': args.queries,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'cases': run_suite(data_dir, args.repeat, args.queries, args.seed, plots=not args.skip_plots),
+    }
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2), encoding='utf-8')
+        print(f"Results written to {args.output}")
+    if args.baseline is not None:
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Synthetic supply chain datasets in the schema of task1_supply_chain_graph/data:
+companies.csv, connections.csv and transactions.csv of a tiered network
+supplier -> production center -> market affiliate -> customer, at a configurable scale.
+
+Usage: python -m benchmarks.synthetic --output DIR [--scale 1] [--transactions 36000] [--seed 1]
+"""
+import argparse
+import csv
+import hashlib
+from dataclasses import dataclass, asdict
+from pathlib import Path
+import numpy as np
+
+CHUNK_ROWS = 100_000
+
+COUNTRIES = [
+    ('DE', 51.1657, 10.4515), ('PL', 51.9194, 19.1451), ('FR', 46.2276, 2.2137), ('ES', 40.4637, -3.7492),
+    ('IT', 41.8719, 12.5674), ('GB', 55.3781, -3.4360), ('NL', 52.1326, 5.2913), ('PT', 39.3999, -8.2245),
+    ('US', 37.0902, -95.7129), ('MX', 23.6345, -102.5528), ('BR', -14.2350, -51.9253), ('CN', 35.8617, 104.1954),
+    ('IN', 20.5937, 78.9629), ('TH', 15.8700, 100.9925), ('KR', 35.9078, 127.7669), ('JP', 36.2048, 138.2529),
+    ('AU', -25.2744, 133.7751), ('ZA', -30.5595, 22.9375), ('TR', 38.9637, 35.2433), ('CA', 56.1304, -106.3468),
+]
+
+CATEGORIES = [
+    ('CLEANING', 'Surface Cleaners', 'Spray'), ('ORAL CARE', 'Toothpaste', 'Tube'), ('PANTRY', 'Olive Oil', 'Bottle'),
+    ('MEDIA', 'Magazine', 'Issue'), ('DAIRY', 'Butter', 'Pack'), ('SNACKS', 'Chips', 'Bag'),
+    ('SAUCES', 'Mexican Salsa', 'Jar'), ('FROZEN', 'Ice Cream', 'Tub'), ('FROZEN', 'Frozen Pizza', 'Box'),
+    ('SAUCES', 'Italian Pomodoro', 'Jar'), ('BEVERAGES', 'Sparkling Water', 'Bottle'),
+]
+
+@dataclass(frozen=True)
+class SyntheticConfig:
+    """Sizes of every tier and of the transactions, defaults are close to the bundled dataset"""
+    suppliers: int = 2000
+    production_centers: int = 12
+    market_affiliates: int = 92
+    customers: int = 840
+    transactions: int = 36000
+    products: int = 2900
+    # connections without transactions, as a share of the connections used by transactions
+    unused_connections: float = 1.0
+    # share of transactions with a negative value (returns)
+    returns: float = 0.005
+    seed: int = 1
+
+    @staticmethod
+    def scaled(scale: float, transactions: int | None = None, seed: int = 1) -> 'SyntheticConfig':
+        """Every tier scaled by the given factor, production centers and products growing with its square root"""
+        default = SyntheticConfig()
+        return SyntheticConfig(
+            suppliers=max(1, round(default.suppliers * scale)),
+            production_centers=max(1, round(default.production_centers * scale ** 0.5)),
+            market_affiliates=max(1, round(default.market_affiliates * scale)),
+            customers=max(1, round(default.customers * scale)),
+            transactions=transactions if transactions is not None else round(default.transactions * scale),
+            products=max(1, round(default.products * scale ** 0.5)),
+            seed=seed,
+        )
+
+    def key(self) -> str:
+        """Short stable name of the configuration, e.g. for a cache directory"""
+        return hashlib.sha256(repr(sorted(asdict(self).items())).encode()).hexdigest()[:12]
+
+def company_ids(prefix: str, count: int) -> list[str]:
+    """
+    Ids with a letter or digit prefix and a fixed width counter. Ids of one tier have the same length
+    and no leading zero, so they stay distinct after unify_company_id strips zeros.
+    """
+    width = len(str(count))
+    return [f'{prefix}{i:0{width}d}' for i in range(1, count + 1)]
+
+def generate(output_dir: Path, config: SyntheticConfig = SyntheticConfig()) -> dict[str, Path]:
+    """Writes the three CSV files of a synthetic dataset, transactions are streamed in chunks"""
+    rng = np.random.default_rng(config.seed)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    tiers = [
+        ('Supplier', company_ids('42', config.suppliers)),
+        ('Production Center', company_ids('P', config.production_centers)),
+        ('Market Affiliate', company_ids('M', config.market_affiliates)),
+        ('Customer', company_ids('F', config.customers)),
+    ]
+    paths = {name: output_dir / f'{name}.csv' for name in ('companies', 'connections', 'transactions')}
+
+    with open(paths['companies'], 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['id', 'type', 'name', 'country', 'lat', 'lon'])
+        for company_type, ids in tiers:
+            countries = rng.integers(len(COUNTRIES), size=len(ids))
+            jitter = rng.normal(0, 1.5, size=(len(ids), 2))
+            for i, (company_id, country) in enumerate(zip(ids, countries.tolist())):
+                code, lat, lon = COUNTRIES[country]
+                writer.writerow([company_id, company_type, f'{company_type} {company_id}', code,
+                                 round(lat + jitter[i, 0], 6), round(lon + jitter[i, 1], 6)])
+
+    # every tier edge: sender tier i -> receiver tier i + 1, every receiver gets 1-3 senders
+    edges = []
+    for (_, senders), (_, receivers) in zip(tiers, tiers[1:]):
+        tier_edges = {}
+        if len(senders) > len(receivers):
+            # every sender feeds 1-2 receivers
+            for sender in range(len(senders)):
+                for receiver in set(rng.integers(len(receivers), size=rng.integers(1, 3)).tolist()):
+                    tier_edges[(sender, receiver)] = None
+        else:
+            for receiver in range(len(receivers)):
+                for sender in set(rng.integers(len(senders), size=rng.integers(1, 4)).tolist()):
+                    tier_edges[(sender, receiver)] = None
+        edges.append(np.array(list(tier_edges), dtype=np.int64).reshape(-1, 2))
+    flow_ids = [np.array([f'{senders[s]}_{receivers[r]}' for s, r in tier_edges.tolist()], dtype=object)
+                for tier_edges, (_, senders), (_, receivers) in zip(edges, tiers, tiers[1:])]
+
+    with open(paths['connections'], 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['flow_id'])
+        writer.writerows([flow_id] for tier_flows in flow_ids for flow_id in tier_flows.tolist())
+        all_ids = [company_id for _, ids in tiers for company_id in ids]
+        used = sum(len(tier_flows) for tier_flows in flow_ids)
+        unused = rng.integers(len(all_ids), size=(round(used * config.unused_connections), 2))
+        writer.writerows([f'{all_ids[a]}_{all_ids[b]}'] for a, b in unused.tolist() if a != b)
+
+    # a transaction picks a market affiliate -> customer edge, then a production center of that affiliate
+    # and a supplier of that production center; edges and products have Zipf-like popularity
+    def edges_by_receiver(tier_edges: np.ndarray, receivers: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        order = np.argsort(tier_edges[:, 1], kind='stable')
+        counts = np.bincount(tier_edges[:, 1], minlength=receivers)
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        return order, offsets, counts
+
+    def pick_incoming(by_receiver, receivers: np.ndarray) -> np.ndarray:
+        order, offsets, counts = by_receiver
+        return order[offsets[receivers] + (rng.random(len(receivers)) * counts[receivers]).astype(np.int64)]
+
+    def zipf_weights(count: int) -> np.ndarray:
+        weights = 1.0 / np.arange(1, count + 1) ** 0.8
+        return rng.permutation(weights / weights.sum())
+
+    supplier_edges, center_edges, customer_edges = edges
+    supplier_by_center = edges_by_receiver(supplier_edges, len(tiers[1][1]))
+    center_by_affiliate = edges_by_receiver(center_edges, len(tiers[2][1]))
+    customer_edge_weights = zipf_weights(len(customer_edges))
+    product_weights = zipf_weights(config.products)
+    product_categories = rng.integers(len(CATEGORIES), size=config.products)
+    product_names = np.array([f'{CATEGORIES[c][0]} {CATEGORIES[c][1]} {CATEGORIES[c][2]} {i}'
+                              for i, c in enumerate(product_categories.tolist(), 1)], dtype=object)
+    category_names = np.array([CATEGORIES[c][1] for c in product_categories.tolist()], dtype=object)
+
+    with open(paths['transactions'], 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['product_name', 'product_category', 'flow_id_supplier', 'flow_id_internal', 'flow_id_customer', 'order_value'])
+        for start in range(0, config.transactions, CHUNK_ROWS):
+            size = min(CHUNK_ROWS, config.transactions - start)
+            customer_edge = rng.choice(len(customer_edges), size=size, p=customer_edge_weights)
+            center_edge = pick_incoming(center_by_affiliate, customer_edges[customer_edge, 0])
+            supplier_edge = pick_incoming(supplier_by_center, center_edges[center_edge, 0])
+            products = rng.choice(config.products, size=size, p=product_weights)
+            values = np.round(rng.lognormal(9.0, 1.6, size=size), 5)
+            values[rng.random(size) < config.returns] *= -0.1
+            writer.writerows(zip(product_names[products].tolist(), category_names[products].tolist(),
+                                 flow_ids[0][supplier_edge].tolist(), flow_ids[1][center_edge].tolist(),
+                                 flow_ids[2][customer_edge].tolist(), values.tolist()))
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--output', type=Path, required=True, help='directory to write the CSV files to')
+    parser.add_argument('--scale', type=float, default=1.0, help='size of every tier relative to the bundled dataset')
+    parser.add_argument('--transactions', type=int, default=None, help='number of transactions, defaults to 36000 times the scale')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    config = SyntheticConfig.scaled(args.scale, args.transactions, args.seed)
+    paths = generate(args.output, config)
+    print(f"Generated {config.suppliers} suppliers, {config.production_centers} production centers, "
+          f"{config.market_affiliates} market affiliates, {config.customers} customers and "
+          f"{config.transactions} transactions in {args.output}:")
+    for path in paths.values():
+        print(f"  {path} ({path.stat().st_size / 2**20:.1f} MiB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Non-interactive queries: JSON-lines queries in, JSON-lines results out, in input order.
+
+Every line is a JSON object with a "type" and its parameters, and an optional "id" echoed in the result:
+  {"id": 1, "type": "shortest_path", "source": "42008902", "target": "F00001", "algorithm": "csr_dijkstra"}
+  {"id": 2, "type": "related_leafs", "company": "42008902", "paths": true}
+  {"id": 3, "type": "company_statistics", "company": "42008902", "category": "Chips"}
+  {"id": 4, "type": "flow_statistics", "flow": "42008902_0009"}
+Companies are given by id or unambiguous name, algorithms by name or menu number.
+Related leafs come with a path to every leaf only when "paths" is set.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from enum import Enum
+from typing import Iterable, Iterator, TextIO
+import networkx as nx
+from .models import GlobalTransactionStatistics, TransactionStatistics, unify_company_id
+from .supply_chain_app import SupplyChainApp
+from .company_search import get_company_search_index
+from .reachability_index import get_reachability_index
+from .csr_graph import get_csr_graph
+from .instrumentation import Instrumentation
+
+DEFAULT_ALGORITHM = SupplyChainApp.ShortestPathAlgorithms.CSR_DIJKSTRA
+CHUNK_SIZE = 64
+
+class QueryKind(Enum):
+    SHORTEST_PATH = 'shortest_path'
+    RELATED_LEAFS = 'related_leafs'
+    COMPANY_STATISTICS = 'company_statistics'
+    FLOW_STATISTICS = 'flow_statistics'
+
+QUERY_TYPES = {kind.value for kind in QueryKind}
+
+class QueryError(Exception):
+    """Invalid query: unknown type, missing parameter, unknown company, algorithm or category"""
+
+def warm_indexes(G: nx.DiGraph) -> None:
+    """Builds the per-graph indexes queries use, so workers forked afterwards share them"""
+    get_company_search_index(G)
+    get_reachability_index(G)
+    get_csr_graph(G)
+
+def statistics_to_dict(stats: TransactionStatistics) -> dict:
+    result = {
+        'quantity': stats['quantity'],
+        'total_value': stats['total_value'],
+        'average_value': stats['average_value'],
+        'max_value': stats['max_value'] if stats['quantity'] > 0 else None,
+        'min_value': stats['min_value'] if stats['quantity'] > 0 else None,
+    }
+    sketch = stats['sketch']
+    if sketch is not None and stats['quantity'] > 0:
+        result['percentiles'] = {f'p{round(q * 100)}': sketch.quantile(q) for q in (0.5, 0.95, 0.99)}
+        result['distinct_products'] = sketch.distinct_products()
+    return result
+
+def answer_query(app: SupplyChainApp, query: dict) -> dict:
+    """Result fields of a single query, raises QueryError for invalid queries"""
+    try:
+        kind = QueryKind(query.get('type'))
+    except ValueError:
+        raise QueryError(f"Unknown query type {query.get('type')!r}, expected one of: {', '.join(k.value for k in QueryKind)}")
+
+    if kind == QueryKind.SHORTEST_PATH:
+        source = _company(app, query, 'source')
+        target = _company(app, query, 'target')
+        algorithm = _algorithm(query.get('algorithm', DEFAULT_ALGORITHM.name.lower()))
+        result = app.query_shortest_path(source, target, algorithm.value)
+        return {'source': source, 'target': target, 'algorithm': algorithm.name.lower(),
+                'found': bool(result.path), 'path': result.path, 'total_weight': result.total_weight, 'cached': result.cached,
+                'compute_ms': round(result.compute_elapsed * 1e3, 3)}
+
+    if kind == QueryKind.FLOW_STATISTICS:
+        flow_id = query.get('flow')
+        if not isinstance(flow_id, str) or flow_id not in app.statistics['statistics_per_flow']:
+            raise QueryError(f"No statistics available for flow {flow_id!r}")
+        category = _category(app, query.get('category'))
+        stats = (app.graph.graph['statistics_cube'].flow(flow_id, category) if category is not None
+                 else app.statistics['statistics_per_flow'][flow_id])
+        return {'flow': flow_id, 'category': category, **statistics_to_dict(stats)}
+
+    company_id = _company(app, query, 'company')
+    if kind == QueryKind.RELATED_LEAFS:
+        index = get_reachability_index(app.graph)
+        leafs = index.related_leafs(company_id)
+        result = {'company': company_id, 'count': len(leafs), 'leafs': leafs}
+        if _flag(query.get('paths')):
+            result['paths'] = {leaf_id: index.path(company_id, leaf_id) for leaf_id in leafs}
+        return result
+
+    category = _category(app, query.get('category'))
+    if category is None:
+        stats = app.statistics['statistics_per_company'].get(company_id)
+        if stats is None:
+            raise QueryError(f"No statistics available for company {company_id}")
+    else:
+        stats = app.graph.graph['statistics_cube'].company(company_id, category)
+    return {'company': company_id, 'name': app.graph.nodes[company_id]['name'], 'category': category,
+            'exported': statistics_to_dict(stats['exported']), 'imported': statistics_to_dict(stats['imported'])}
+
+def run_query_line(app: SupplyChainApp, line: str) -> tuple[str, float, str]:
+    """(query type, latency in seconds, JSON result line) of one query line, errors become results with "error" set"""
+    start = time.perf_counter()
+    query = {}
+    try:
+        parsed = json.loads(line)
+        if not isinstance(parsed, dict):
+            raise QueryError("Query must be a JSON object")
+        query = parsed
+        result = {'ok': True, **answer_query(app, query)}
+    except json.JSONDecodeError as error:
+        result = {'ok': False, 'error': f"Invalid JSON: {error}"}
+    except QueryError as error:
+        result = {'ok': False, 'error': str(error)}
+    elapsed = time.perf_counter() - start
+    kind = query.get('type') if query.get('type') in QUERY_TYPES else 'invalid'
+    result = {'id': query.get('id'), 'type': kind, **result, 'elapsed_ms': round(elapsed * 1e3, 3)}
+    return kind, elapsed, json.dumps(result)
+
+def run_batch(graph: nx.DiGraph,
+              statistics: GlobalTransactionStatistics,
+              lines: Iterable[str],
+              workers: int | None = None,
+              chunk_size: int = CHUNK_SIZE) -> Iterator[tuple[str, float, str]]:
+    """
+    Yields run_query_line results of every non-empty line, in input order, as soon as they are answered.
+    Lines are sent to a process pool in chunks by a reader thread, with a bounded number of chunks in flight,
+    so results of earlier chunks are yielded while later lines are still awaited; use chunk_size=1 for
+    interactive streams. Workers get the graph once, from the pool initializer; workers=1 runs in this process.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    warm_indexes(graph)
+    chunks = _chunks((line for line in lines if line.strip()), chunk_size)
+    if workers <= 1:
+        init_query_worker(graph, statistics)
+        for chunk in chunks:
+            yield from _run_chunk(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_query_worker, initargs=(graph, statistics)) as executor:
+        executor.submit(os.getpid).result()  # workers are forked now, before the reader thread exists
+        futures = queue.Queue()
+        slots = threading.Semaphore(workers * 4)
+        errors = []
+
+        def submit_chunks():
+            try:
+                for chunk in chunks:
+                    slots.acquire()
+                    futures.put(executor.submit(_run_chunk, chunk))
+            except Exception as error:  # reading the input failed, re-raised in the caller
+                errors.append(error)
+            finally:
+                futures.put(None)
+
+        threading.Thread(target=submit_chunks, daemon=True).start()
+        while (future := futures.get()) is not None:
+            results = future.result()
+            slots.release()
+            yield from results
+        if errors:
+            raise errors[0]
+
+def run_batch_stream(graph: nx.DiGraph,
+                     statistics: GlobalTransactionStatistics,
+                     source: TextIO,
+                     output: TextIO,
+                     workers: int | None = None,
+                     instrumentation: Instrumentation | None = None,
+                     chunk_size: int = CHUNK_SIZE) -> tuple[int, float]:
+    """
+    Writes the result of every query in source to output, flushed line by line, so a client
+    waiting for an answer gets it right away. Returns the query count and the elapsed seconds.
+    """
+    count = 0
+    start = time.perf_counter()
+    for kind, elapsed, line in run_batch(graph, statistics, source, workers, chunk_size):
+        output.write(line + '\n')
+        output.flush()
+        count += 1
+        if instrumentation is not None:
+            instrumentation.record_query(kind, elapsed)
+    return count, time.perf_counter() - start
+
+def _company(app: SupplyChainApp, query: dict, field: str) -> str:
+    value = query.get(field)
+    if not isinstance(value, str) or not value.strip():
+        raise QueryError(f"Missing {field!r} company ID or name")
+    index = get_company_search_index(app.graph)
+    # ids as written in the CSV files, e.g. 0009, are unified like the loader does
+    company_id = index.lookup(value)
+    if company_id is None:
+        company_id = index.lookup(unify_company_id(value))
+    if company_id is None:
+        raise QueryError(f"Company ID or name {value!r} not found")
+    return company_id
+
+def _algorithm(value) -> SupplyChainApp.ShortestPathAlgorithms:
+    for algorithm in SupplyChainApp.ShortestPathAlgorithms:
+        if str(value).casefold() in (algorithm.name.casefold(), algorithm.value):
+            return algorithm
+    raise QueryError(f"Unknown algorithm {value!r}, expected one of: "
+                     f"{', '.join(a.name.lower() for a in SupplyChainApp.ShortestPathAlgorithms)}")
+
+def _category(app: SupplyChainApp, value) -> str | None:
+    if value is None:
+        return None
+    cube = app.graph.graph.get('statistics_cube')
+    for category in (cube.categories.values if cube is not None else []):
+        if category.casefold() == str(value).casefold():
+            return category
+    raise QueryError(f"Unknown product category {value!r}")
+
+def _flag(value) -> bool:
+    """Boolean query parameter, given as JSON or as a URL query string value"""
+    return value is True or str(value).casefold() in ('true', '1', 'yes')
+
+def _chunks(lines: Iterable[str], size: int) -> Iterator[list[str]]:
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# application of the worker process over the graph sent once by the pool initializer
+_worker_app = None
+
+def init_query_worker(graph: nx.DiGraph, statistics: GlobalTransactionStatistics):
+    """Pool initializer: the worker answers queries over the given graph from now on"""
+    global _worker_app
+    _worker_app = SupplyChainApp(graph, statistics)
+
+def answer_worker_query(query: dict) -> dict:
+    """answer_query in a worker set up by init_query_worker"""
+    return answer_query(_worker_app, query)
+
+def worker_figure_json() -> bytes:
+    """Plotly figure JSON of the graph, built in a worker set up by init_query_worker"""
+    return _worker_app.get_figure().to_json().encode()
+
+def _run_chunk(lines: list[str]) -> list[tuple[str, float, str]]:
+    return [run_query_line(_worker_app, line) for line in lines]
@@ -0,0 +1,171 @@
+"""
+Bottleneck companies: value-weighted betweenness, exact or sampled with an error bound.
+"""
+import math
+import os
+import random
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+import networkx as nx
+import numpy as np
+from .models import GlobalTransactionStatistics
+from .csr_graph import CSRGraph, get_csr_graph
+
+DEFAULT_EPSILON = 0.02
+DEFAULT_DELTA = 0.1
+
+class BottleneckRanking(NamedTuple):
+    """
+    Value-weighted betweenness of every company.
+
+    The score of a company is the share of value-weighted demand routed through it:
+    the sum over (source, target) pairs of shortest paths (fewest hops) through the company,
+    each pair weighted by the source's share of exported value times the target's share of
+    imported value. When sampled, every score is within epsilon of the exact one with
+    probability at least 1 - delta.
+    """
+    node_ids: list[str]
+    scores: np.ndarray
+    samples: int
+    exact: bool
+    epsilon: float
+    delta: float
+
+    def top(self, count: int = 10) -> list[tuple[str, float]]:
+        """Companies with the highest scores, with their scores"""
+        order = np.argsort(-self.scores, kind='stable')[:count]
+        return [(self.node_ids[code], float(self.scores[code])) for code in order]
+
+def sample_size(node_count: int, epsilon: float, delta: float) -> int:
+    """
+    Sampled sources for all scores to be within epsilon with probability 1 - delta.
+    A sample contributes a value in [0, 1] to every score, so by Hoeffding's inequality and a union bound
+    over the nodes, k samples fail with probability at most 2 * n * exp(-2 * k * epsilon**2).
+    """
+    return math.ceil(math.log(2 * max(node_count, 1) / delta) / (2 * epsilon ** 2))
+
+def value_shares(G: nx.DiGraph, statistics: GlobalTransactionStatistics) -> tuple[np.ndarray, np.ndarray]:
+    """Exported and imported value of every company (in G.nodes order) as shares of their totals"""
+    exported = np.zeros(len(G))
+    imported = np.zeros(len(G))
+    for code, node_id in enumerate(G.nodes):
+        company_statistics = statistics.statistics_per_company.get(node_id)
+        if company_statistics is not None:
+            exported[code] = max(company_statistics.exported.total_value, 0.0)
+            imported[code] = max(company_statistics.imported.total_value, 0.0)
+    return _shares(exported), _shares(imported)
+
+def value_weighted_betweenness(G: nx.DiGraph,
+                               statistics: GlobalTransactionStatistics,
+                               epsilon: float = DEFAULT_EPSILON,
+                               delta: float = DEFAULT_DELTA,
+                               workers: int | None = None,
+                               seed: int = 0) -> BottleneckRanking:
+    """
+    Brandes' dependency accumulation from sources drawn with probability proportional to their exported value,
+    so the mean of the sampled dependencies is an unbiased estimate. When the sample would not be smaller than
+    the set of exporting companies, all of them are used with their exact weights instead.
+    Sources are processed on a process pool; workers=1 runs in this process.
+    """
+    csr = get_csr_graph(G)
+    source_shares, target_shares = value_shares(G, statistics)
+    exporters = np.flatnonzero(source_shares > 0)
+    samples = sample_size(len(csr), epsilon, delta)
+    exact = samples >= len(exporters)
+    if exact:
+        sources = exporters.tolist()
+        multipliers = source_shares[exporters].tolist()
+    else:
+        drawn = random.Random(seed).choices(exporters.tolist(), weights=source_shares[exporters].tolist(), k=samples)
+        sources, counts = np.unique(drawn, return_counts=True)
+        sources = sources.tolist()
+        multipliers = (counts / samples).tolist()
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    chunks = _chunks(list(zip(sources, multipliers)), max(1, workers * 4))
+    scores = np.zeros(len(csr))
+    if workers <= 1 or len(chunks) <= 1:
+        _init_worker(csr, target_shares)
+        for partial in map(_chunk_dependencies, chunks):
+            scores += partial
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(csr, target_shares)) as executor:
+            for partial in executor.map(_chunk_dependencies, chunks):
+                scores += partial
+    return BottleneckRanking(csr.node_ids, scores, len(sources) if exact else samples, exact, epsilon, delta)
+
+def source_dependencies(indptr: list[int], indices: list[int], target_shares: list[float], source: int,
+                        scores: np.ndarray, multiplier: float = 1.0) -> None:
+    """
+    Adds multiplier times the dependencies of the source on every other node to scores:
+    a BFS counts the shortest paths (sigma) and their predecessors, then dependencies are
+    accumulated in reverse BFS order, every target w weighing its imported value share.
+    """
+    sigma = {source: 1}
+    distances = {source: 0}
+    predecessors = {source: []}
+    order = [source]
+    for current in order:
+        next_distance = distances[current] + 1
+        for j in range(indptr[current], indptr[current + 1]):
+            neighbor = indices[j]
+            distance = distances.get(neighbor)
+            if distance is None:
+                distances[neighbor] = next_distance
+                sigma[neighbor] = sigma[current]
+                predecessors[neighbor] = [current]
+                order.append(neighbor)
+            elif distance == next_distance:
+                sigma[neighbor] += sigma[current]
+                predecessors[neighbor].append(current)
+
+    dependencies = dict.fromkeys(order, 0.0)
+    for node in reversed(order):
+        coefficient = (target_shares[node] + dependencies[node]) / sigma[node]
+        for predecessor in predecessors[node]:
+            dependencies[predecessor] += sigma[predecessor] * coefficient
+        if node != source:
+            scores[node] += multiplier * dependencies[node]
+
+def _shares(values: np.ndarray) -> np.ndarray:
+    total = values.sum()
+    return values / total if total > 0 else values
+
+def _chunks(items: list, count: int) -> list[list]:
+    size = -(-len(items) // count)
+    return [items[i:i + size] for i in range(0, len(items), size)] if items else []
+
+# CSR lists and target weights of the worker process, sent once by the pool initializer
+_worker_graph = None
+
+def _init_worker(csr: CSRGraph, target_shares: np.ndarray):
+    global _worker_graph
+    indptr, indices, _ = csr.lists()
+    _worker_graph = (len(csr), indptr, indices, target_shares.tolist())
+
+def _chunk_dependencies(chunk: list[tuple[int, float]]) -> np.ndarray:
+    node_count, indptr, indices, target_shares = _worker_graph
+    scores = np.zeros(node_count)
+    for source, multiplier in chunk:
+        source_dependencies(indptr, indices, target_shares, source, scores, multiplier)
+    return scores
+
+# rankings per graph object, keyed by graph version and error bound
+_rankings = weakref.WeakKeyDictionary()
+
+def get_bottleneck_ranking(G: nx.DiGraph,
+                           statistics: GlobalTransactionStatistics,
+                           epsilon: float = DEFAULT_EPSILON,
+                           delta: float = DEFAULT_DELTA,
+                           workers: int | None = None) -> BottleneckRanking:
+    """Ranking cached per graph version and (epsilon, delta), older versions are dropped"""
+    version = G.graph.get('version')
+    cached = _rankings.get(G)
+    if cached is None or cached[0] != version:
+        cached = _rankings[G] = (version, {})
+    ranking = cached[1].get((epsilon, delta))
+    if ranking is None:
+        ranking = cached[1][(epsilon, delta)] = value_weighted_betweenness(G, statistics, epsilon, delta, workers)
+    return ranking
@@ -0,0 +1,166 @@
+"""
+Company lookup by id or name: case-folded exact match, prefix autocomplete and fuzzy matching.
+"""
+import heapq
+import weakref
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from enum import Enum
+from typing import Iterable, NamedTuple
+import networkx as nx
+
+class MatchKind(Enum):
+    EXACT = 0
+    PREFIX = 1
+    FUZZY = 2
+
+class CompanyMatch(NamedTuple):
+    """Search candidate, ranked by match kind, then by edit distance and name"""
+    company_id: str
+    name: str
+    kind: MatchKind
+    distance: int = 0
+
+class CompanySearchIndex:
+    """
+    Index of company ids and names, built once.
+
+    Exact lookups are dict hits on case-folded keys, prefix lookups a binary search
+    in the sorted keys, fuzzy lookups shortlist keys sharing most trigrams with the query
+    and rank them by Levenshtein distance.
+    """
+
+    def __init__(self, companies: Iterable[tuple[str, str]]):
+        self.names: dict[str, str] = {}
+        self._exact: dict[str, list[str]] = defaultdict(list)
+        for company_id, name in companies:
+            self.names[company_id] = name
+            for key in {company_id.casefold(), name.casefold()}:
+                self._exact[key].append(company_id)
+        self._exact = dict(self._exact)
+        self._keys = sorted(self._exact)
+        self._trigrams: dict[str, list[int]] = defaultdict(list)
+        for i, key in enumerate(self._keys):
+            for trigram in set(_trigrams(key)):
+                self._trigrams[trigram].append(i)
+        self._trigrams = dict(self._trigrams)
+
+    @staticmethod
+    def from_graph(G: nx.Graph) -> 'CompanySearchIndex':
+        return CompanySearchIndex((node, data.get('name', node)) for node, data in G.nodes(data=True))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def lookup(self, query: str) -> str | None:
+        """Company id by exact id, or by case-folded id or name when it is unambiguous"""
+        if query in self.names:
+            return query
+        company_ids = self._exact.get(query.strip().casefold())
+        if company_ids is not None and len(company_ids) == 1:
+            return company_ids[0]
+        return None
+
+    def exact(self, query: str) -> list[CompanyMatch]:
+        return [self._match(company_id, MatchKind.EXACT) for company_id in self._exact.get(query.strip().casefold(), [])]
+
+    def prefix(self, query: str, limit: int = 10) -> list[CompanyMatch]:
+        """Companies whose case-folded id or name starts with the query, in key order"""
+        query = query.strip().casefold()
+        matches = {}
+        i = bisect_left(self._keys, query)
+        while i < len(self._keys) and len(matches) < limit and self._keys[i].startswith(query):
+            for company_id in self._exact[self._keys[i]]:
+                matches.setdefault(company_id, self._match(company_id, MatchKind.PREFIX))
+            i += 1
+        return list(matches.values())[:limit]
+
+    def fuzzy(self, query: str, limit: int = 10, max_distance: int | None = None, shortlist: int = 30) -> list[CompanyMatch]:
+        """
+        Companies with an id or name close to the query by edit distance.
+        Only the keys sharing most trigrams with the query are compared,
+        max_distance defaults to a quarter of the query length.
+        """
+        query = query.strip().casefold()
+        if max_distance is None:
+            max_distance = max(1, len(query) // 4)
+        query_trigrams = set(_trigrams(query))
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(self._trigrams.get(trigram, ()))
+
+        # an edit removes at most 3 trigrams, keys sharing fewer ones are too far
+        min_shared = len(query_trigrams) - 3 * max_distance
+        candidates = [(count, -i) for i, count in shared.items() if count >= min_shared]
+
+        matches = {}
+        for count, i in heapq.nlargest(shortlist, candidates):
+            if count < len(query_trigrams) - 3 * max_distance:
+                break
+            key = self._keys[-i]
+            distance = levenshtein(query, key, max_distance)
+            if distance > max_distance:
+                continue
+            for company_id in self._exact[key]:
+                if company_id not in matches or distance < matches[company_id].distance:
+                    matches[company_id] = self._match(company_id, MatchKind.FUZZY, distance)
+            if len(matches) >= limit:
+                # later candidates only matter if they are closer than the current worst match
+                max_distance = min(max_distance, max(match.distance for match in matches.values()))
+        return sorted(matches.values(), key=lambda match: (match.distance, match.name))[:limit]
+
+    def search(self, query: str, limit: int = 5) -> list[CompanyMatch]:
+        """Ranked candidates: exact matches first, then prefix and fuzzy matches"""
+        matches = {}
+        for match in self.exact(query) + self.prefix(query, limit) + self.fuzzy(query, limit):
+            matches.setdefault(match.company_id, match)
+        return list(matches.values())[:limit]
+
+    def _match(self, company_id: str, kind: MatchKind, distance: int = 0) -> CompanyMatch:
+        return CompanyMatch(company_id, self.names[company_id], kind, distance)
+
+def _trigrams(key: str) -> list[str]:
+    padded = f'  {key} '
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+def levenshtein(a: str, b: str, max_distance: int | None = None) -> int:
+    """
+    Edit distance of two strings. With max_distance only the diagonal band of that width is computed,
+    and any distance above it is returned as max_distance + 1.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    band = len(a) if max_distance is None else max_distance
+    if len(a) - len(b) > band:
+        return band + 1
+    over = band + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        low, high = max(1, i - band), min(len(b), i + band)
+        current = [over] * (len(b) + 1)
+        if low == 1:
+            current[0] = i
+        row_min = current[0]
+        for j in range(low, high + 1):
+            cost = previous[j - 1] + (char_a != b[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost
+            if cost < row_min:
+                row_min = cost
+        if row_min > band:
+            return over
+        previous = current
+    return min(previous[-1], over)
+
+# index per graph object, rebuilt when the graph version changes
+_indexes = weakref.WeakKeyDictionary()
+
+def get_company_search_index(G: nx.Graph) -> CompanySearchIndex:
+    version = G.graph.get('version')
+    cached = _indexes.get(G)
+    if cached is None or cached[0] != version:
+        cached = _indexes[G] = (version, CompanySearchIndex.from_graph(G))
+    return cached[1]
@@ -0,0 +1,215 @@
+"""
+Immutable compressed sparse row (CSR) form of the supply chain graph for analytics:
+integer node codes and indptr / indices / weights arrays instead of dict-of-dict adjacency.
+"""
+import heapq
+import math
+from collections import deque
+import networkx as nx
+import numpy as np
+from .task2 import GraphSearchMethod
+from .task3 import GraphPathNotFound
+
+class CSRGraph:
+    """
+    Directed graph with nodes coded 0..n-1 in the order of G.nodes.
+
+    Successors of node i are indices[indptr[i]:indptr[i + 1]], in the order of G.adj,
+    with edge weights at the same positions. The arrays are read-only, a changed graph
+    gets a new CSRGraph (see get_csr_graph). Python-level algorithms run on list copies
+    of the arrays, made once, since indexing a list is much faster than indexing an array.
+    """
+
+    def __init__(self, node_ids: list[str], indptr: np.ndarray, indices: np.ndarray, weights: np.ndarray, version=None):
+        self.node_ids = node_ids
+        self.node_codes = {node_id: i for i, node_id in enumerate(node_ids)}
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=np.float64)
+        for array in (self.indptr, self.indices, self.weights):
+            array.flags.writeable = False
+        self.version = version
+        self._lists = None
+        self._reverse = None
+
+    @staticmethod
+    def from_networkx(G: nx.DiGraph, weight: str = 'weight') -> 'CSRGraph':
+        """CSR arrays of a graph, edges without the weight attribute weigh 1"""
+        node_ids = list(G.nodes)
+        node_codes = {node_id: i for i, node_id in enumerate(node_ids)}
+        indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+        indices = []
+        weights = []
+        for i, node_id in enumerate(node_ids):
+            for neighbor, attrs in G.adj[node_id].items():
+                indices.append(node_codes[neighbor])
+                weights.append(attrs.get(weight, 1))
+            indptr[i + 1] = len(indices)
+        return CSRGraph(node_ids, indptr, np.array(indices, dtype=np.int32), np.array(weights, dtype=np.float64),
+                        G.graph.get('version'))
+
+    def __len__(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self.indices)
+
+    def code(self, node_id: str) -> int:
+        """Node code of a node id, raises KeyError for unknown nodes"""
+        return self.node_codes[node_id]
+
+    def successors(self, code: int) -> np.ndarray:
+        return self.indices[self.indptr[code]:self.indptr[code + 1]]
+
+    def out_degrees(self) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def in_degrees(self) -> np.ndarray:
+        return np.bincount(self.indices, minlength=len(self))
+
+    def leaf_codes(self) -> np.ndarray:
+        """Codes of nodes without successors"""
+        return np.flatnonzero(self.out_degrees() == 0)
+
+    def lists(self) -> tuple[list[int], list[int], list[float]]:
+        """indptr, indices and weights as Python lists, for the pure Python algorithms"""
+        if self._lists is None:
+            self._lists = (self.indptr.tolist(), self.indices.tolist(), self.weights.tolist())
+        return self._lists
+
+    def reverse(self) -> 'CSRGraph':
+        """Graph with every edge reversed (predecessor adjacency), made once"""
+        if self._reverse is None:
+            order = np.argsort(self.indices, kind='stable')
+            sources = np.repeat(np.arange(len(self), dtype=np.int32), self.out_degrees())
+            indptr = np.zeros(len(self) + 1, dtype=np.int64)
+            np.cumsum(self.in_degrees(), out=indptr[1:])
+            self._reverse = CSRGraph(self.node_ids, indptr, sources[order], self.weights[order], self.version)
+            self._reverse._reverse = self
+        return self._reverse
+
+    def to_scipy(self):
+        """Weighted adjacency as a scipy.sparse CSR array sharing the arrays, needs scipy"""
+        from scipy.sparse import csr_array
+        return csr_array((self.weights, self.indices, self.indptr), shape=(len(self), len(self)))
+
+def dijkstra_arrays(csr: CSRGraph, source: int, target: int | None = None) -> tuple[dict[int, float], dict[int, int]]:
+    """
+    Dijkstra over node codes, stopping at the target when given.
+    Returns distances and predecessors (-1 for the source) of the nodes reached so far.
+    """
+    indptr, indices, weights = csr.lists()
+    distances = {source: 0.0}
+    previous_nodes = {source: -1}
+    queue = [(0.0, source)]
+    while queue:
+        current_distance, current = heapq.heappop(queue)
+        if current == target:
+            break
+        if current_distance > distances[current]:
+            continue
+        for j in range(indptr[current], indptr[current + 1]):
+            neighbor = indices[j]
+            distance = current_distance + weights[j]
+            if distance < distances.get(neighbor, math.inf):
+                distances[neighbor] = distance
+                previous_nodes[neighbor] = current
+                heapq.heappush(queue, (distance, neighbor))
+    return distances, previous_nodes
+
+def single_source_distances(csr: CSRGraph, source: int) -> np.ndarray:
+    """
+    Distances from the source to every node code, inf for unreachable nodes.
+    Runs scipy's compiled Dijkstra when scipy is installed, Dijkstra over the arrays otherwise.
+    """
+    try:
+        from scipy.sparse.csgraph import dijkstra
+    except ImportError:
+        distances = np.full(len(csr), np.inf)
+        reached = dijkstra_arrays(csr, source)[0]
+        distances[list(reached)] = list(reached.values())
+        return distances
+    return dijkstra(csr.to_scipy(), directed=True, indices=source)
+
+def csr_shortest_path(csr: CSRGraph, source: str, target: str) -> tuple[list[str], float]:
+    """Same result as task3.dijkstra_shortest_path, computed on the CSR arrays"""
+    source_code, target_code = csr.code(source), csr.code(target)
+    distances, previous_nodes = dijkstra_arrays(csr, source_code, target_code)
+    if target_code not in distances:
+        raise GraphPathNotFound(f"No path exists between {source} and {target}.")
+    return [csr.node_ids[code] for code in _path_to(previous_nodes, target_code)], distances[target_code]
+
+def csr_dijkstra_shortest_path(G: nx.DiGraph, source: str, target: str) -> tuple[list[str], float]:
+    """Shortest path on the cached CSR form of the graph, a drop-in for the task3 algorithms"""
+    return csr_shortest_path(get_csr_graph(G), source, target)
+
+def csr_related_leafs(csr: CSRGraph, company_id: str, method: GraphSearchMethod = GraphSearchMethod.BFS) -> dict[str, list[str]]:
+    """
+    Same result as task2.find_related_leafs, with the BFS/DFS running on node codes:
+    leaf id -> path from the company, in the order the search finds the leafs.
+    """
+    if method not in (GraphSearchMethod.BFS, GraphSearchMethod.DFS):
+        raise ValueError("Invalid graph search method")
+    indptr, indices, _ = csr.lists()
+    start = csr.code(company_id)
+    queue = deque((indices[j], start) for j in range(indptr[start], indptr[start + 1]))
+    parents = {start: -1}
+    leafs = []
+    if method == GraphSearchMethod.BFS:
+        queue = deque(entry for entry in queue if entry[0] != start)
+        visited = set(parents)
+        visited.update(node for node, _ in queue)
+        while queue:
+            current, parent = queue.popleft()
+            parents[current] = parent
+            if indptr[current] == indptr[current + 1]:
+                leafs.append(current)
+            else:
+                for j in range(indptr[current], indptr[current + 1]):
+                    neighbor = indices[j]
+                    if neighbor not in visited:
+                        visited.add(neighbor)
+                        queue.append((neighbor, current))
+    else:
+        while queue:
+            current, parent = queue.pop()
+            if current in parents:
+                continue
+            parents[current] = parent
+            if indptr[current] == indptr[current + 1]:
+                leafs.append(current)
+            else:
+                for j in range(indptr[current], indptr[current + 1]):
+                    neighbor = indices[j]
+                    if neighbor not in parents:
+                        queue.append((neighbor, current))
+    return {csr.node_ids[leaf]: [csr.node_ids[code] for code in _path_to(parents, leaf)] for leaf in leafs}
+
+def reachable_codes(csr: CSRGraph, source: int) -> np.ndarray:
+    """Codes of all nodes reachable from the source, the source included, in BFS order"""
+    indptr, indices, _ = csr.lists()
+    visited = {source}
+    order = [source]
+    for current in order:
+        for j in range(indptr[current], indptr[current + 1]):
+            neighbor = indices[j]
+            if neighbor not in visited:
+                visited.add(neighbor)
+                order.append(neighbor)
+    return np.array(order, dtype=np.int32)
+
+def _path_to(previous_nodes: dict[int, int], code: int) -> list[int]:
+    path = []
+    while code != -1:
+        path.append(code)
+        code = previous_nodes[code]
+    path.reverse()
+    return path
+
+def get_csr_graph(G: nx.DiGraph) -> CSRGraph:
+    """CSR form of the graph, kept in G.graph['csr'] and rebuilt when the graph version changes"""
+    csr = G.graph.get('csr')
+    if csr is None or csr.version != G.graph.get('version'):
+        csr = G.graph['csr'] = CSRGraph.from_networkx(G)
+    return csr
@@ -1,29 +1,40 @@
 import csv
-from .models import Company, Connection, Transaction
+from typing import Iterator
+from .models import Company, Connection, Transaction, TransactionTable, FlowIndex, unify_company_id
 
-def load_rows_from_csv(csv_path: str, transform: callable = None) -> list[dict]:
+def iter_rows_from_csv(csv_path: str, transform: callable = None) -> Iterator[dict]:
   """
-  Loads rows from a CSV file
+  Lazily yields rows from a CSV file, one at a time
   
   Args:
     csv_path: Path to the CSV file
+    transform: Optional in-place transformation applied to every row
       
-  Returns:
-    List of dictionaries representing CSV rows
+  Yields:
+    Dictionaries representing CSV rows
   """
   try:
-    rows = []
-    with open(csv_path, 'r', encoding='utf-8') as file:
+    with open(csv_path, 'r', encoding='utf-8', newline='') as file:
+      print(f"Loading CSV from: {csv_path}")
       reader = csv.DictReader(file)
       for row in reader:
         if transform:
           transform(row)
-        rows.append(row)
-      print(f"Loading CSV from: {csv_path}")
-      return rows
+        yield row
   except Exception as error:
     print(f'Error loading data from CSV: {error}')
-    return []
+
+def load_rows_from_csv(csv_path: str, transform: callable = None) -> list[dict]:
+  """
+  Loads rows from a CSV file
+  
+  Args:
+    csv_path: Path to the CSV file
+      
+  Returns:
+    List of dictionaries representing CSV rows
+  """
+  return list(iter_rows_from_csv(csv_path, transform))
 
 def load_companies(csv_path: str) -> list[Company]:
     """
@@ -50,23 +61,25 @@ def load_companies(csv_path: str) -> list[Company]:
       return []
 
 
-def load_connections(csv_path: str) -> list[Connection]:
+def load_connections(csv_path: str, flow_index: FlowIndex | None = None) -> list[Connection]:
     """
     Loads connection markers from a CSV file
     
     Args:
       csv_path: Path to the CSV file
+      flow_index: Index used to parse flow ids, shared with the other pipeline stages
         
     Returns:
       List of Connection objects
     """
+    if flow_index is None:
+      flow_index = FlowIndex()
     try:
-      rows = load_rows_from_csv(csv_path)
-      return [Connection(
-        flow_id=row['flow_id'], 
-        id_from=unify_company_id(row['flow_id'].split('_')[0]), 
-        id_to=unify_company_id(row['flow_id'].split('_')[1])
-      ) for row in rows]  # type: ignore
+      connections = []
+      for row in iter_rows_from_csv(csv_path):
+        id_from, id_to = flow_index.lookup(row['flow_id'])
+        connections.append(Connection(flow_id=row['flow_id'], id_from=id_from, id_to=id_to))
+      return connections
     except Exception as error:
       print(f'Error loading connections from CSV: {error}')
       return []
@@ -94,6 +107,31 @@ def load_transactions(csv_path: str) -> list[Transaction]:
     except Exception as error:
       print(f'Error loading connections from CSV: {error}')
       return []
+
+def load_transaction_table(csv_path: str, flow_index: FlowIndex | None = None) -> TransactionTable:
+    """
+    Streams transactions from CSV file into a columnar table,
+    without keeping intermediate rows in memory
     
-def unify_company_id(company_id: str) -> str:
-  return company_id.strip('0').upper()
\ No newline at end of file
+    Args:
+        csv_path: Path to the CSV file
+        flow_index: Index used as the table's flow vocabulary, shared with the other pipeline stages
+        
+    Returns:
+        TransactionTable with all transactions
+    """
+    table = TransactionTable(flows=flow_index)
+    try:
+      for row in iter_rows_from_csv(csv_path):
+        table.append(
+          product_name=row['product_name'],
+          product_category=row['product_category'],
+          flow_id_supplier=row['flow_id_supplier'],
+          flow_id_internal=row['flow_id_internal'],
+          flow_id_customer=row['flow_id_customer'],
+          order_value=float(row['order_value'])
+        )
+      return table
+    except Exception as error:
+      print(f'Error loading transactions from CSV: {error}')
+      return TransactionTable(flows=flow_index)
\ No newline at end of file
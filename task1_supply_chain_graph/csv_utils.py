@@ -1,36 +1,198 @@
+import argparse
 import csv
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator
+from .models import TransactionTable
 
-def reduce_rows(transactions: list, 
-                filter: callable,
-                limit_unique_combinations: int, 
-                combo_fn: callable) -> list:
-  unique_combinations_times = dict() # set of unique flow_id combinations to amount of times seen
-  reduced_transactions = []
-  for t in transactions:
+def split_csv_byte_ranges(csv_path: str, chunk_count: int) -> tuple[list[str], list[tuple[int, int]]]:
+  """
+  Splits the rows of a CSV file into about chunk_count byte ranges, every range starting
+  and ending on a line boundary. Fields must not contain line breaks.
+
+  Returns:
+    Header field names and (start, end) byte offsets of the ranges, end exclusive
+  """
+  size = os.path.getsize(csv_path)
+  with open(csv_path, 'rb') as file:
+    fieldnames = next(csv.reader([file.readline().decode('utf-8-sig')]), [])
+    start = file.tell()
+    chunk_size = max(1, (size - start) // max(1, chunk_count))
+    ranges = []
+    while start < size:
+      end = start + chunk_size
+      if end < size:
+        file.seek(end)
+        file.readline()  # move the boundary to the end of the current line
+        end = file.tell()
+      end = min(end, size)
+      ranges.append((start, end))
+      start = end
+  return fieldnames, ranges
+
+def iter_lines_in_byte_range(csv_path: str, start: int, end: int) -> Iterator[str]:
+  """Yields decoded lines of a byte range returned by split_csv_byte_ranges, reading one line at a time"""
+  with open(csv_path, 'rb') as file:
+    file.seek(start)
+    while start < end:
+      line = file.readline()
+      if not line:
+        break
+      start += len(line)
+      yield line.decode('utf-8')
+
+def iter_rows_in_byte_range(csv_path: str, fieldnames: list[str], start: int, end: int) -> Iterator[dict]:
+  """Yields rows of a byte range returned by split_csv_byte_ranges as dictionaries"""
+  yield from csv.DictReader(iter_lines_in_byte_range(csv_path, start, end), fieldnames=fieldnames)
+
+TRANSACTION_FIELDS = ['product_name', 'product_category', 'flow_id_supplier', 'flow_id_internal', 'flow_id_customer', 'order_value']
+FLOW_FIELDS = ['flow_id_supplier', 'flow_id_internal', 'flow_id_customer']
+DEFAULT_LIMIT_PER_COMBINATION = 5
+WRITE_BUFFER_ROWS = 10000
+DEFAULT_RANGE_SIZE = 64 * 1024 * 1024
+
+def iter_reduced_rows(transactions: Iterable,
+                      filter: callable,
+                      limit_per_combination: int,
+                      combo_fn: callable,
+                      counts: dict | None = None) -> Iterator[tuple[int, object]]:
+  """
+  Yields (index, row) of the rows to keep: rows matching filter are skipped,
+  of the other rows the first limit_per_combination ones of every combination are kept, in input order.
+
+  Args:
+    counts: Rows kept per combination so far, updated in-place, to continue over several inputs
+  """
+  if counts is None:
+    counts = dict()
+  for i, t in enumerate(transactions):
     if filter(t):
       continue
     combo = combo_fn(t)
-    times = unique_combinations_times.get(combo, 0)
-    if not times:
-      unique_combinations_times[combo] = 1
-    else:
-      times += 1
-      unique_combinations_times[combo] = times
-      if times < limit_unique_combinations:
-        reduced_transactions.append(t)
-
-  return reduced_transactions
-
-def write_reduced_transactions_to_csv(transactions: list, csv_path: str) -> list:
-  reduced_rows = reduce_rows(transactions, 
-                             filter=lambda x: not x['flow_id_supplier'] or not x['flow_id_internal'] or not x['flow_id_customer'],
-                             limit_unique_combinations=5, combo_fn=lambda x: (x['flow_id_supplier'], x['flow_id_internal'], x['flow_id_customer']))
-  path = csv_path.replace('.csv', '_reduced.csv')
-  with open(path, 'w', newline='', encoding='utf-8') as file:
-      fieldnames = ['product_name', 'product_category', 'flow_id_supplier', 'flow_id_internal', 'flow_id_customer', 'order_value']
-      writer = csv.DictWriter(file, fieldnames=fieldnames)
-      writer.writeheader()
-      for row in reduced_rows:
-        writer.writerow(row)
-
-  return reduced_rows
\ No newline at end of file
+    times = counts.get(combo, 0)
+    if times < limit_per_combination:
+      counts[combo] = times + 1
+      yield i, t
+
+def reduce_rows(transactions: list | TransactionTable, 
+                filter: callable,
+                limit_unique_combinations: int, 
+                combo_fn: callable) -> list | TransactionTable:
+  """Keeps at most limit_unique_combinations rows of every combination, the first ones, see iter_reduced_rows"""
+  kept = iter_reduced_rows(transactions, filter, limit_unique_combinations, combo_fn)
+  if isinstance(transactions, TransactionTable):
+    # keep row indices only, so the reduced table shares the vocabularies instead of copying rows
+    return transactions.take([i for i, _ in kept])
+  return [t for _, t in kept]
+
+def get_field(row, name: str):
+  """Reads a field from a CSV dict row or a Transaction"""
+  return row[name] if isinstance(row, dict) else getattr(row, name)
+
+def has_missing_flow(row) -> bool:
+  return not all(get_field(row, name) for name in FLOW_FIELDS)
+
+def flow_combination(row) -> tuple[str, str, str]:
+  return tuple(get_field(row, name) for name in FLOW_FIELDS)
+
+def reduced_csv_path(csv_path: str) -> str:
+  return csv_path.replace('.csv', '_reduced.csv')
+
+def write_reduced_transactions_to_csv(transactions: list | TransactionTable, csv_path: str,
+                                      limit_per_combination: int = DEFAULT_LIMIT_PER_COMBINATION) -> list | TransactionTable:
+  reduced_rows = reduce_rows(transactions, filter=has_missing_flow,
+                             limit_unique_combinations=limit_per_combination, combo_fn=flow_combination)
+  with open(reduced_csv_path(csv_path), 'w', newline='', encoding='utf-8') as file:
+      writer = csv.writer(file)
+      writer.writerow(TRANSACTION_FIELDS)
+      writer.writerows([get_field(row, name) for name in TRANSACTION_FIELDS] for row in reduced_rows)
+
+  return reduced_rows
+
+def reduce_transactions_csv(csv_path: str,
+                            output_path: str | None = None,
+                            limit_per_combination: int = DEFAULT_LIMIT_PER_COMBINATION,
+                            workers: int = 1,
+                            range_size: int = DEFAULT_RANGE_SIZE) -> int:
+  """
+  Streams a transactions CSV file into a reduced one, keeping the first limit_per_combination rows
+  of every (supplier, internal, customer) flow combination and skipping rows with a missing flow.
+  Memory is bounded by the number of combinations, rows are written in buffered batches.
+
+  With several workers, byte ranges of the file, at least one per worker and at most range_size bytes
+  each, are reduced in worker processes into part files, read line by line, which are merged in file order with the same per-combination limit. A combination's first rows
+  of the whole file are among the first rows of the ranges, so the output is the same as serial.
+
+  Returns:
+    Number of rows written
+  """
+  if output_path is None:
+    output_path = reduced_csv_path(csv_path)
+  if workers <= 1:
+    with open(csv_path, 'r', newline='', encoding='utf-8-sig') as file, \
+         open(output_path, 'w', newline='', encoding='utf-8') as output:
+      reader = csv.reader(file)
+      fieldnames = next(reader, [])
+      writer = csv.writer(output)
+      writer.writerow(fieldnames)
+      return _write_reduced(writer, reader, _flow_columns(fieldnames), limit_per_combination)
+
+  size = os.path.getsize(csv_path)
+  fieldnames, ranges = split_csv_byte_ranges(csv_path, max(workers, -(-size // range_size)))
+  flow_columns = _flow_columns(fieldnames)
+  with open(output_path, 'w', newline='', encoding='utf-8') as output:
+    writer = csv.writer(output)
+    writer.writerow(fieldnames)
+    with tempfile.TemporaryDirectory(prefix='.reduce-', dir=os.path.dirname(os.path.abspath(output_path))) as tmp_dir:
+      part_paths = [os.path.join(tmp_dir, f'part-{i}.csv') for i in range(len(ranges))]
+      with ProcessPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(_reduce_range, [csv_path] * len(ranges), ranges, [flow_columns] * len(ranges),
+                          [limit_per_combination] * len(ranges), part_paths))
+      counts = dict()
+      written = 0
+      for part_path in part_paths:
+        with open(part_path, 'r', newline='', encoding='utf-8') as part:
+          written += _write_reduced(writer, csv.reader(part), flow_columns, limit_per_combination, counts)
+      return written
+
+def _reduce_range(csv_path: str, byte_range: tuple[int, int], flow_columns: list[int], limit_per_combination: int, part_path: str) -> int:
+  """Reduces a byte range of the file into a part file without header, runs in a worker process"""
+  rows = csv.reader(iter_lines_in_byte_range(csv_path, *byte_range))
+  with open(part_path, 'w', newline='', encoding='utf-8') as part:
+    return _write_reduced(csv.writer(part), rows, flow_columns, limit_per_combination)
+
+def _flow_columns(fieldnames: list[str]) -> list[int]:
+  return [fieldnames.index(name) for name in FLOW_FIELDS]
+
+def _write_reduced(writer, rows: Iterable[list[str]], flow_columns: list[int], limit_per_combination: int, counts: dict | None = None) -> int:
+  written = 0
+  buffer = []
+  kept = iter_reduced_rows(rows,
+                           filter=lambda row: len(row) <= max(flow_columns) or not all(row[i] for i in flow_columns),
+                           limit_per_combination=limit_per_combination,
+                           combo_fn=lambda row: tuple(row[i] for i in flow_columns),
+                           counts=counts)
+  for _, row in kept:
+    buffer.append(row)
+    if len(buffer) >= WRITE_BUFFER_ROWS:
+      writer.writerows(buffer)
+      written += len(buffer)
+      buffer.clear()
+  writer.writerows(buffer)
+  return written + len(buffer)
+
+def main(argv: list[str] | None = None):
+  parser = argparse.ArgumentParser(prog="python -m task1_supply_chain_graph.csv_utils",
+                                   description="Writes a sample of a transactions CSV file with the first rows of every flow combination")
+  parser.add_argument("csv_path", help="transactions CSV file")
+  parser.add_argument("--output", default=None, help="output file, defaults to <csv_path>_reduced.csv")
+  parser.add_argument("--limit", type=int, default=DEFAULT_LIMIT_PER_COMBINATION, help="rows to keep per flow combination")
+  parser.add_argument("--workers", type=int, default=1, help="worker processes")
+  args = parser.parse_args(argv)
+
+  written = reduce_transactions_csv(args.csv_path, args.output, args.limit, args.workers)
+  print(f"Written {written} rows to {args.output or reduced_csv_path(args.csv_path)}")
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,149 @@
+"""
+Batch shortest path precomputation: distance and predecessor tables from many sources.
+
+Usage: python -m task1_supply_chain_graph.distance_tables --output tables.npz [--workers 4] [--source ID ...]
+"""
+import argparse
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import networkx as nx
+import numpy as np
+from .task3 import GraphPathNotFound, dijkstra_single_source
+
+PRODUCTION_CENTER_TYPE = 'Production Center'
+
+class DistanceTable:
+    """
+    Shortest path distances and predecessors from a set of sources to every node.
+
+    Row i holds the single-source Dijkstra result of sources[i]: distances are inf for
+    unreachable nodes, predecessors are node codes with -1 for the source and unreachable nodes.
+    Path lookups walk the predecessor row and never search again.
+    """
+
+    def __init__(self, node_ids: list[str], sources: np.ndarray, distances: np.ndarray, predecessors: np.ndarray):
+        self.node_ids = node_ids
+        self.node_codes = {node_id: i for i, node_id in enumerate(node_ids)}
+        self.sources = sources
+        self.source_rows = {int(code): row for row, code in enumerate(sources)}
+        self.distances = distances
+        self.predecessors = predecessors
+
+    def distance(self, source: str, target: str) -> float:
+        return float(self.distances[self._row(source), self.node_codes[target]])
+
+    def path(self, source: str, target: str) -> tuple[list[str], float]:
+        """Returns path and total weight like dijkstra_shortest_path, from the precomputed tables"""
+        row = self._row(source)
+        code = self.node_codes[target]
+        total_weight = self.distances[row, code]
+        if math.isinf(total_weight):
+            raise GraphPathNotFound(f"No path exists between {source} and {target}.")
+
+        path = []
+        predecessors = self.predecessors[row]
+        while code >= 0:
+            path.append(self.node_ids[code])
+            code = predecessors[code]
+        path.reverse()
+        return path, float(total_weight)
+
+    def matrix(self, targets: list[str]) -> np.ndarray:
+        """Distances from every source (rows) to the given targets (columns)"""
+        return self.distances[:, [self.node_codes[target] for target in targets]]
+
+    def save(self, path: Path) -> None:
+        np.savez_compressed(path,
+                            node_ids=np.array(self.node_ids, dtype=str),
+                            sources=self.sources,
+                            distances=self.distances,
+                            predecessors=self.predecessors)
+
+    @staticmethod
+    def load(path: Path) -> 'DistanceTable':
+        with np.load(path) as data:
+            return DistanceTable(data['node_ids'].tolist(), data['sources'], data['distances'], data['predecessors'])
+
+    def _row(self, source: str) -> int:
+        row = self.source_rows.get(self.node_codes.get(source, -1))
+        if row is None:
+            raise KeyError(f"{source} is not a source of this distance table")
+        return row
+
+def production_centers(G: nx.Graph) -> list[str]:
+    return [node for node, node_type in G.nodes(data='type') if node_type == PRODUCTION_CENTER_TYPE]
+
+def leafs(G: nx.DiGraph) -> list[str]:
+    return [node for node in G.nodes if G.out_degree(node) == 0]
+
+def compute_distance_table(G: nx.DiGraph, sources: list[str] | None = None, workers: int | None = None) -> DistanceTable:
+    """
+    Runs single-source Dijkstra from every source, in parallel on a process pool.
+    Sources default to all production centers; workers=1 runs in this process.
+    """
+    if sources is None:
+        sources = production_centers(G)
+    node_ids = list(G.nodes)
+    node_codes = {node_id: i for i, node_id in enumerate(node_ids)}
+    distances = np.full((len(sources), len(node_ids)), np.inf)
+    predecessors = np.full((len(sources), len(node_ids)), -1, dtype=np.int32)
+
+    if workers is None:
+        workers = min(len(sources), os.cpu_count() or 1)
+    if workers <= 1 or len(sources) <= 1:
+        _init_worker(G)
+        rows = map(_single_source_row, sources)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(G,))
+        rows = executor.map(_single_source_row, sources, chunksize=max(1, len(sources) // (workers * 4)))
+
+    try:
+        for row, (source_distances, source_predecessors) in enumerate(rows):
+            for node, distance in source_distances.items():
+                code = node_codes[node]
+                distances[row, code] = distance
+                previous_node = source_predecessors[node]
+                if previous_node is not None:
+                    predecessors[row, code] = node_codes[previous_node]
+    finally:
+        if workers > 1 and len(sources) > 1:
+            executor.shutdown()
+
+    return DistanceTable(node_ids, np.array([node_codes[source] for source in sources], dtype=np.int32), distances, predecessors)
+
+# graph of the worker process, sent once by the pool initializer instead of with every task
+_worker_graph = None
+
+def _init_worker(G: nx.DiGraph):
+    global _worker_graph
+    _worker_graph = G
+
+def _single_source_row(source: str) -> tuple[dict, dict]:
+    return dijkstra_single_source(_worker_graph, source)
+
+def main(argv: list[str] | None = None):
+    from .main import load_graph
+
+    parser = argparse.ArgumentParser(prog="python -m task1_supply_chain_graph.distance_tables", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", type=Path, required=True, help="compressed .npz file to write")
+    parser.add_argument("--source", action="append", help="source company id, repeatable; defaults to all production centers")
+    parser.add_argument("--all-sources", action="store_true", help="use every company as a source")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes, defaults to CPU count")
+    args = parser.parse_args(argv)
+
+    G, _ = load_graph()
+    sources = list(G.nodes) if args.all_sources else args.source
+    start = time.perf_counter()
+    table = compute_distance_table(G, sources, args.workers)
+    elapsed = time.perf_counter() - start
+    table.save(args.output)
+
+    reachable = np.isfinite(table.matrix(leafs(G))).sum()
+    print(f"Computed distances from {len(table.sources)} sources to {len(table.node_ids)} companies in {elapsed:.2f} s, "
+          f"{reachable} source-leaf pairs reachable. Saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,157 @@
+import hashlib
+import weakref
+from enum import Enum
+from pathlib import Path
 import matplotlib.pyplot as plt
 import networkx as nx
+import numpy as np
 
-def draw_graph_with_matplotlib(G: nx.Graph, highlight_path_nodes: list[str] | None = None):
-    pos = nx.spring_layout(G)  # positions for all nodes
+LAYOUT_CACHE_DIR = Path(__file__).parent / "data" / ".layout_cache"
+LAYOUT_SEED = 42
+# layout files kept on disk, the least recently used ones are removed beyond this
+LAYOUT_CACHE_MAX_FILES = 16
 
-    # nodes
-    node_sizes = [G.nodes[node].get('size', 300) for node in G.nodes()]
-    nx.draw_networkx_nodes(G, pos, node_size=node_sizes, node_color='lightblue')
+class LayoutMethod(Enum):
+    SPRING = 'spring'            # force-directed, connection-driven placing
+    GEOGRAPHIC = 'geographic'    # lon/lat of companies, linear time
+    FORCEATLAS2 = 'forceatlas2'  # force-directed, better separated clusters
 
-    # edges
-    edge_weights = [G[u][v].get('weight', 1) for u, v in G.edges()]
-    nx.draw_networkx_edges(G, pos, width=edge_weights, edge_color='gray', arrows=True)
+# positions per graph object, keyed by (graph version, layout method)
+_layouts = weakref.WeakKeyDictionary()
 
-    if highlight_path_nodes:
-        # Highlight path edges
-        path_edges = list(zip(highlight_path_nodes, highlight_path_nodes[1:]))
-        nx.draw_networkx_edges(G, pos, edgelist=path_edges, width=5, edge_color='red', arrows=True)
+def graph_fingerprint(G: nx.Graph) -> str:
+    """
+    Hash of nodes and edges, identifies a graph structure on disk. Edge weights are left out,
+    so appended transactions, which only change weights, reuse the stored layout.
+    """
+    digest = hashlib.sha1()
+    for node in G.nodes():
+        digest.update(f'{node}\n'.encode())
+    for u, v in G.edges():
+        digest.update(f'{u}>{v}\n'.encode())
+    return digest.hexdigest()
 
-    # labels
-    labels = {node: G.nodes[node].get('name', node) for node in G.nodes()}
-    nx.draw_networkx_labels(G, pos, labels, font_size=5)
+def compute_layout(G: nx.Graph, method: LayoutMethod = LayoutMethod.SPRING) -> dict:
+    if method == LayoutMethod.GEOGRAPHIC:
+        return {node: (float(attrs['lon']), float(attrs['lat'])) for node, attrs in G.nodes(data=True)}
+    if method == LayoutMethod.FORCEATLAS2:
+        return nx.forceatlas2_layout(G, seed=LAYOUT_SEED)
+    return nx.spring_layout(G, seed=LAYOUT_SEED)
 
-    plt.title("Supply Chain Graph")
-    plt.axis('off')  # Turn off the axis
-    plt.show()
+def get_layout(G: nx.Graph, method: LayoutMethod = LayoutMethod.SPRING, cache_dir: Path | None = LAYOUT_CACHE_DIR) -> dict:
+    """
+    Returns node positions, computed once per graph version and layout method.
+    Positions are cached in memory and, if cache_dir is given, on disk by graph structure fingerprint.
+    """
+    version = G.graph.get('version')
+    key = (version, method)
+    cached = _layouts.setdefault(G, {})
+    if key in cached:
+        return cached[key]
+
+    nodes = list(G.nodes())
+    path = cache_dir / f'{method.value}-{graph_fingerprint(G)}.npy' if cache_dir is not None else None
+    if path is not None and path.exists():
+        positions = np.load(path)
+        pos = {node: positions[i] for i, node in enumerate(nodes)}
+        path.touch()  # marks the file as recently used
+    else:
+        pos = compute_layout(G, method)
+        if path is not None:
+            try:
+                cache_dir.mkdir(parents=True, exist_ok=True)
+                np.save(path, np.array([pos[node] for node in nodes], dtype=np.float64).reshape(len(nodes), 2))
+                prune_layout_cache(cache_dir)
+            except OSError as error:
+                print(f'Error saving layout cache: {error}')
+
+    # positions of older graph versions are not needed anymore, other methods of this version are kept
+    for old_key in [old_key for old_key in cached if old_key[0] != version]:
+        del cached[old_key]
+    cached[key] = pos
+    return pos
+
+def prune_layout_cache(cache_dir: Path, max_files: int = LAYOUT_CACHE_MAX_FILES) -> None:
+    """Removes the least recently used layout files beyond max_files"""
+    files = sorted(cache_dir.glob('*.npy'), key=lambda file: file.stat().st_mtime, reverse=True)
+    for file in files[max_files:]:
+        file.unlink(missing_ok=True)
+
+class MatplotlibGraphView:
+    """
+    Draws a graph once in a non-blocking window and redraws only the highlighted path
+    on later calls, while the window is still open. After the window is closed,
+    the base graph is redrawn from the cached layout positions.
+    """
+
+    def __init__(self, G: nx.Graph, layout: LayoutMethod = LayoutMethod.SPRING):
+        self.G = G
+        self.layout = layout
+        self.figure = None
+        self._version = None
+        self._highlight_artists = []
+
+    def draw(self, highlight_path_nodes: list[str] | None = None, block: bool = False):
+        """Draws or updates the figure; without block, the window stays open while the console continues"""
+        if not self._is_base_drawn():
+            self._draw_base()
+        self._draw_highlight(highlight_path_nodes)
+        self.figure.canvas.draw_idle()
+        if block:
+            plt.show(block=True)
+        else:
+            plt.show(block=False)
+            plt.pause(0.001)  # lets the GUI event loop render the update
+
+    def _is_base_drawn(self) -> bool:
+        return (self.figure is not None
+                and plt.fignum_exists(self.figure.number)
+                and self._version == self.G.graph.get('version'))
+
+    def _draw_base(self):
+        if self.figure is not None:
+            plt.close(self.figure)
+        G = self.G
+        pos = get_layout(G, self.layout)
+        self.figure = plt.figure()
+        self._version = G.graph.get('version')
+        self._highlight_artists = []
+
+        # nodes
+        node_sizes = [G.nodes[node].get('size', 300) for node in G.nodes()]
+        nx.draw_networkx_nodes(G, pos, node_size=node_sizes, node_color='lightblue')
+
+        # edges
+        edge_weights = [G[u][v].get('weight', 1) for u, v in G.edges()]
+        nx.draw_networkx_edges(G, pos, width=edge_weights, edge_color='gray', arrows=True)
+
+        # labels
+        labels = {node: G.nodes[node].get('name', node) for node in G.nodes()}
+        nx.draw_networkx_labels(G, pos, labels, font_size=5)
+
+        plt.title("Supply Chain Graph")
+        plt.axis('off')  # Turn off the axis
+
+    def _draw_highlight(self, highlight_path_nodes: list[str] | None):
+        for artist in self._highlight_artists:
+            artist.remove()
+        self._highlight_artists = []
+        if highlight_path_nodes:
+            # Highlight path edges
+            plt.figure(self.figure.number)
+            path_edges = list(zip(highlight_path_nodes, highlight_path_nodes[1:]))
+            artists = nx.draw_networkx_edges(self.G, get_layout(self.G, self.layout), edgelist=path_edges,
+                                             width=5, edge_color='red', arrows=True)
+            self._highlight_artists = artists if isinstance(artists, list) else [artists]
+
+_view = None
+
+def draw_graph_with_matplotlib(G: nx.Graph, highlight_path_nodes: list[str] | None = None,
+                               layout: LayoutMethod = LayoutMethod.SPRING, block: bool = False):
+    global _view
+    if _view is None or _view.G is not G or _view.layout != layout:
+        _view = MatplotlibGraphView(G, layout)
+    _view.draw(highlight_path_nodes, block=block)
 
 if __name__ == "__main__":
     # Example usage
@@ -32,4 +160,4 @@ if __name__ == "__main__":
     G.add_node("2", name="Company B", size=30)
     G.add_edge("1", "2", weight=2)
 
-    draw_graph_with_matplotlib(G)
\ No newline at end of file
+    draw_graph_with_matplotlib(G, block=True)
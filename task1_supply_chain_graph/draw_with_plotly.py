@@ -1,6 +1,13 @@
 import plotly.graph_objects as go
 
-def plot_graph_nodes(G):
+EDGE_WIDTH_CLASSES = 5
+PATH_TRACE_NAME = "Path"
+
+def plot_graph_nodes(G, edge_width_classes: int = EDGE_WIDTH_CLASSES):
+    """
+    Plots companies on a map with connections drawn as a few batched traces:
+    one line trace per edge width class plus one marker trace with hover text at edge midpoints.
+    """
     lats = []
     lons = []
     labels = []
@@ -22,22 +29,12 @@ def plot_graph_nodes(G):
         marker=dict(size=sizes),
         text=labels,
         hoverinfo="text",
+        name="Companies",
+        showlegend=False,
     ))
 
-    for u, v, attrs in G.edges(data=True):
-        weight = attrs.get("weight", 1)
-        lat_u = G.nodes[u]["lat"]
-        lon_u = G.nodes[u]["lon"]
-        lat_v = G.nodes[v]["lat"]
-        lon_v = G.nodes[v]["lon"]
-        fig.add_trace(go.Scattermapbox(
-            lat=[lat_u, lat_v],
-            lon=[lon_u, lon_v],
-            mode="lines",
-            line=dict(width=weight),
-            hoverinfo="text",
-            text=f"Weight: {weight}"
-        ))
+    for trace in edge_traces(G, edge_width_classes):
+        fig.add_trace(trace)
 
     # Base map settings
     fig.update_layout(
@@ -49,34 +46,92 @@ def plot_graph_nodes(G):
 
     return fig
 
-def highlight_path(G, fig, path, clear_previous=True):
-    """Highlight a path on the graph with improved visualization."""
-    if clear_previous:
-        # Remove previous path highlights (traces added after initial graph)
-        # Keep only original nodes and edges (first N traces)
-        initial_traces = len(G.edges()) + 1  # edges + nodes
-        fig.data = fig.data[:initial_traces]
-    
-    # Add highlighted edges
-    # Iterate through consecutive node pairs in path
-    for i in range(len(path) - 1):
-        u = path[i]
-        v = path[i + 1]
+def edge_traces(G, edge_width_classes: int = EDGE_WIDTH_CLASSES) -> list[go.Scattermapbox]:
+    """
+    Builds batched edge traces: edges are bucketed into width classes by weight,
+    every class is one line trace with None-separated coordinates.
+    Hover text is served by a separate trace of markers at edge midpoints.
+    """
+    edges = [(u, v, attrs.get("weight", 1)) for u, v, attrs in G.edges(data=True)]
+    if not edges:
+        return []
+    min_weight = min(weight for _, _, weight in edges)
+    max_weight = max(weight for _, _, weight in edges)
+    class_span = (max_weight - min_weight) / edge_width_classes
+
+    class_lats = [[] for _ in range(edge_width_classes)]
+    class_lons = [[] for _ in range(edge_width_classes)]
+    mid_lats = []
+    mid_lons = []
+    hover_texts = []
+    for u, v, weight in edges:
+        lat_u, lon_u = float(G.nodes[u]["lat"]), float(G.nodes[u]["lon"])
+        lat_v, lon_v = float(G.nodes[v]["lat"]), float(G.nodes[v]["lon"])
+        width_class = min(int((weight - min_weight) / class_span), edge_width_classes - 1) if class_span > 0 else 0
+        class_lats[width_class] += [lat_u, lat_v, None]
+        class_lons[width_class] += [lon_u, lon_v, None]
+        mid_lats.append((lat_u + lat_v) / 2)
+        mid_lons.append((lon_u + lon_v) / 2)
+        hover_texts.append(f"Weight: {weight}")
+
+    traces = []
+    for width_class in range(edge_width_classes):
+        if not class_lats[width_class]:
+            continue
+        # line width is the middle weight of the class
+        width = min_weight + (width_class + 0.5) * class_span if class_span > 0 else min_weight
+        traces.append(go.Scattermapbox(
+            lat=class_lats[width_class],
+            lon=class_lons[width_class],
+            mode="lines",
+            line=dict(width=width),
+            hoverinfo="skip",
+            showlegend=False,
+            name=f"Connections {width_class + 1}",
+        ))
+    traces.append(go.Scattermapbox(
+        lat=mid_lats,
+        lon=mid_lons,
+        mode="markers",
+        marker=dict(size=6, opacity=0),
+        text=hover_texts,
+        hoverinfo="text",
+        showlegend=False,
+        name="Connection info",
+    ))
+    return traces
 
-        lat_u = G.nodes[u]["lat"]
-        lon_u = G.nodes[u]["lon"]
-        lat_v = G.nodes[v]["lat"]
-        lon_v = G.nodes[v]["lon"]
+def highlight_path(G, fig, path, clear_previous=True):
+    """
+    Highlights a path as a single overlay trace, updated in place on repeated calls,
+    so the cost is proportional to the path length, not to the graph size.
+    With clear_previous=False the path is appended to the highlighted ones.
+    """
+    lats = [G.nodes[node]["lat"] for node in path]
+    lons = [G.nodes[node]["lon"] for node in path]
 
-        # Add path edge with distinct style
+    overlay = next((trace for trace in fig.data if trace.name == PATH_TRACE_NAME), None)
+    if overlay is None:
         fig.add_trace(go.Scattermapbox(
-            lat=[lat_u, lat_v],
-            lon=[lon_u, lon_v],
+            lat=lats,
+            lon=lons,
             mode="lines",
             line=dict(width=5, color="red"),
             hoverinfo="skip",
             showlegend=False,
-            name="Path"
+            name=PATH_TRACE_NAME
         ))
-        
+    elif clear_previous:
+        overlay.update(lat=lats, lon=lons)
+    else:
+        # None separates the new path from the previously highlighted ones
+        overlay.update(lat=list(overlay.lat) + [None] + lats, lon=list(overlay.lon) + [None] + lons)
+
+    return fig
+
+def clear_highlight(fig):
+    """Empties the path overlay trace, if any, keeping it for later highlights"""
+    for trace in fig.data:
+        if trace.name == PATH_TRACE_NAME:
+            trace.update(lat=[], lon=[])
     return fig
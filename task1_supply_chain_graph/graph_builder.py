@@ -1,47 +1,41 @@
 import networkx as nx
-from .models import Company, Connection, Transaction, GlobalTransactionStatistics
+from .models import Company, Connection, Transaction, FlowIndex, GlobalTransactionStatistics
+from .csr_graph import CSRGraph
 
-def build_graph(companies: list[Company], 
-                connections: list[Connection], 
-                statistics: GlobalTransactionStatistics
+MIN_NODE_SIZE = 10.0
+MAX_NODE_SIZE = 30.0
+MIN_EDGE_WEIGHT = 1.0
+MAX_EDGE_WEIGHT = 10.0
+
+def build_graph(companies: list[Company],
+                connections: list[Connection],
+                statistics: GlobalTransactionStatistics,
+                flow_index: FlowIndex | None = None
                 ) -> nx.Graph:
-    """Builds a NetworkX graph from companies, connections, transactions, and statistics"""
+    """
+    Builds a NetworkX graph from companies, connections, transactions, and statistics.
+    The flow index used to load the data is kept on the graph for later incremental updates,
+    and an immutable CSR form of the graph for analytics in G.graph['csr'].
+    """
 
     filtered_companies = [company for company in companies if company.id in statistics.statistics_per_company]
     filtered_connections = [connection for connection in connections if connection.flow_id in statistics.statistics_per_flow]
 
-    min_node_size = 10.0
-    max_node_size = 30.0
-    d_node_size = max_node_size - min_node_size
-    min_edge_weight = 1.0
-    max_edge_weight = 10.0
-    d_edge_weight = max_edge_weight - min_edge_weight
-
-    def get_company_size(company: Company) -> float:
-        return statistics.statistics_per_company[company.id].exported.total_value + statistics.statistics_per_company[company.id].imported.total_value
-    company_sizes = {company.id : get_company_size(company) for company in filtered_companies}
-    min_company_size = min(company_sizes.values())
-    max_company_size = max(company_sizes.values())
-    d_company_size = max_company_size - min_company_size
-
-    min_connection_size = min(statistics.statistics_per_flow.values(), key=lambda x: x.total_value).total_value
-    max_connection_size = max(statistics.statistics_per_flow.values(), key=lambda x: x.total_value).total_value
-    d_connection_size = max_connection_size - min_connection_size
-
-    def compute_node_size(company: Company) -> float:
-        k = (company_sizes[company.id] - min_company_size) / d_company_size
-        return min_node_size + k * d_node_size
-    
-    def compute_edge_size(connection: Connection) -> float:
-        k = (statistics.statistics_per_flow[connection.flow_id].total_value - min_connection_size) / d_connection_size
-        return min_edge_weight + k * d_edge_weight
+    company_sizes = {company.id : get_company_size(statistics, company.id) for company in filtered_companies}
+    company_size_bounds = (min(company_sizes.values()), max(company_sizes.values()))
+    connection_size_bounds = get_connection_size_bounds(statistics)
 
     G = nx.DiGraph()
+    # normalization bounds are kept on the graph, so incremental updates can detect when they move
+    G.graph['company_size_bounds'] = company_size_bounds
+    G.graph['connection_size_bounds'] = connection_size_bounds
+    G.graph['version'] = 0
+    G.graph['flow_index'] = flow_index if flow_index is not None else FlowIndex()
 
     for company in filtered_companies:
         G.add_node(
             company.id,
-            size=compute_node_size(company),
+            size=compute_node_size(company_sizes[company.id], company_size_bounds),
             **company._asdict(),
         )
     for connection in filtered_connections:
@@ -51,10 +45,38 @@ def build_graph(companies: list[Company],
         G.add_edge(
             connection.id_from,
             connection.id_to,
-            weight=compute_edge_size(connection),
+            weight=compute_edge_size(statistics.statistics_per_flow[connection.flow_id].total_value, connection_size_bounds),
             **connection._asdict(),
         )
 
+    G.graph['csr'] = CSRGraph.from_networkx(G)
     print(f'Graph built with {G.number_of_nodes()} nodes and {G.number_of_edges()} edges.')
 
     return G
+
+def get_company_size(statistics: GlobalTransactionStatistics, company_id: str) -> float:
+    """Total transaction volume of a company, imports + exports"""
+    company_statistics = statistics.statistics_per_company[company_id]
+    return company_statistics.exported.total_value + company_statistics.imported.total_value
+
+def get_connection_size_bounds(statistics: GlobalTransactionStatistics) -> tuple[float, float]:
+    min_connection_size = min(statistics.statistics_per_flow.values(), key=lambda x: x.total_value).total_value
+    max_connection_size = max(statistics.statistics_per_flow.values(), key=lambda x: x.total_value).total_value
+    return min_connection_size, max_connection_size
+
+def compute_node_size(company_size: float, bounds: tuple[float, float]) -> float:
+    k = (company_size - bounds[0]) / (bounds[1] - bounds[0])
+    return MIN_NODE_SIZE + k * (MAX_NODE_SIZE - MIN_NODE_SIZE)
+
+def compute_edge_size(connection_size: float, bounds: tuple[float, float]) -> float:
+    k = (connection_size - bounds[0]) / (bounds[1] - bounds[0])
+    return MIN_EDGE_WEIGHT + k * (MAX_EDGE_WEIGHT - MIN_EDGE_WEIGHT)
+
+def rescale_graph(G: nx.DiGraph, statistics: GlobalTransactionStatistics) -> None:
+    """Recomputes every node size and edge weight in-place from the normalization bounds stored on the graph"""
+    company_size_bounds = G.graph['company_size_bounds']
+    connection_size_bounds = G.graph['connection_size_bounds']
+    for node_id, attrs in G.nodes(data=True):
+        attrs['size'] = compute_node_size(get_company_size(statistics, node_id), company_size_bounds)
+    for _, _, attrs in G.edges(data=True):
+        attrs['weight'] = compute_edge_size(statistics.statistics_per_flow[attrs['flow_id']].total_value, connection_size_bounds)
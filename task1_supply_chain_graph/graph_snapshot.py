@@ -0,0 +1,251 @@
+"""
+On-disk binary snapshot of the built graph and statistics, for fast startup.
+
+A snapshot is a directory of .npy arrays, readable through a memory map:
+CSR adjacency (indptr / indices, also loaded as the CSRGraph) with edge attribute columns, node attribute columns
+statistics columns with their value sketches and the statistics cube cells, plus a manifest.json with the key of the source CSV files
+and the names of all arrays; a snapshot missing any of them is invalid.
+The key is every file's size, mtime and content hash, so the snapshot is invalidated
+automatically when the source data changes. A file that was only touched (new mtime,
+same size and hash) keeps the snapshot valid.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+import networkx as nx
+import numpy as np
+from .models import FlowIndex, TransactionStatistics, CompanyTransactionStatistics, GlobalTransactionStatistics, ValueSketch
+from .statistics_cube import CubeCells, StatisticsCube
+from .csr_graph import CSRGraph
+
+SNAPSHOT_FORMAT_VERSION = 4
+MANIFEST_FILE = 'manifest.json'
+NODE_FIELDS = ['id', 'name', 'type', 'country', 'lat', 'lon']
+EDGE_FIELDS = ['flow_id', 'id_from', 'id_to']
+CUBE_CELLS = ['global', 'flow', 'exported', 'imported']
+
+def file_key(path: Path) -> dict:
+    """Size, mtime and content hash of a source file"""
+    stat = path.stat()
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_hash(path)}
+
+def file_hash(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def is_snapshot_valid(snapshot_dir: Path, sources: list[Path]) -> bool:
+    """Checks the snapshot key against source files, hashing only files whose mtime changed"""
+    manifest_path = snapshot_dir / MANIFEST_FILE
+    if not manifest_path.exists():
+        return False
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return False
+    if manifest.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+        return False
+
+    keys = manifest.get('sources', {})
+    if set(keys) != {str(source) for source in sources}:
+        return False
+    touched = False
+    for source in sources:
+        key = keys[str(source)]
+        stat = source.stat()
+        if stat.st_size != key['size']:
+            return False
+        if stat.st_mtime_ns != key['mtime_ns']:
+            if file_hash(source) != key['sha256']:
+                return False
+            key['mtime_ns'] = stat.st_mtime_ns
+            touched = True
+    if touched:
+        # remember new mtimes, so the content is not hashed again on the next start;
+        # in a read-only directory the snapshot stays valid, files are just hashed again next time
+        try:
+            manifest_path.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+        except OSError as error:
+            print(f'Could not refresh snapshot manifest: {error}')
+    return True
+
+def save_snapshot(snapshot_dir: Path, sources: list[Path], G: nx.DiGraph, statistics: GlobalTransactionStatistics) -> None:
+    """
+    Writes the graph and statistics snapshot into a new directory and swaps it in by renames:
+    the previous snapshot is moved aside, the new one moved in, then the previous one deleted.
+    A reader in another process sees the old or the new complete snapshot, or briefly none.
+    """
+    snapshot_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(prefix='.snapshot-', dir=snapshot_dir.parent))
+    try:
+        arrays = {**_graph_to_arrays(G), **_statistics_to_arrays(statistics)}
+        cube = G.graph.get('statistics_cube')
+        if cube is not None:
+            arrays.update(_cube_to_arrays(cube))
+        for name, array in arrays.items():
+            np.save(tmp_dir / f'{name}.npy', array)
+        manifest = {
+            'format_version': SNAPSHOT_FORMAT_VERSION,
+            'sources': {str(source): file_key(source) for source in sources},
+            'company_size_bounds': list(G.graph['company_size_bounds']),
+            'connection_size_bounds': list(G.graph['connection_size_bounds']),
+            'statistics_cube': cube is not None,
+            'arrays': sorted(arrays),
+        }
+        (tmp_dir / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+
+        old_dir = None
+        if snapshot_dir.exists():
+            old_dir = Path(tempfile.mkdtemp(prefix='.snapshot-old-', dir=snapshot_dir.parent))
+            os.replace(snapshot_dir, old_dir)
+        os.replace(tmp_dir, snapshot_dir)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    if old_dir is not None:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+def load_snapshot(snapshot_dir: Path, sources: list[Path]) -> tuple[nx.DiGraph, GlobalTransactionStatistics] | None:
+    """Loads graph and statistics from a valid snapshot, returns None when it is missing or stale"""
+    try:
+        if not is_snapshot_valid(snapshot_dir, sources):
+            return None
+        manifest = json.loads((snapshot_dir / MANIFEST_FILE).read_text(encoding='utf-8'))
+        # a missing array fails the load, so a partial snapshot is never used
+        arrays = {name: np.load(snapshot_dir / f'{name}.npy', mmap_mode='r') for name in manifest['arrays']}
+        statistics = _statistics_from_arrays(arrays)
+        G = _graph_from_arrays(arrays)
+        cube = _cube_from_arrays(arrays) if manifest['statistics_cube'] else None
+    except Exception as error:
+        print(f'Error loading graph snapshot: {error}')
+        return None
+
+    G.graph['company_size_bounds'] = tuple(manifest['company_size_bounds'])
+    G.graph['connection_size_bounds'] = tuple(manifest['connection_size_bounds'])
+    G.graph['version'] = 0
+    G.graph['flow_index'] = FlowIndex.from_flow_ids(statistics.statistics_per_flow.keys())
+    G.graph['statistics_cube'] = cube
+    # the snapshot already holds the CSR arrays in G.nodes order, copied out of the memory map
+    G.graph['csr'] = CSRGraph(list(G.nodes), np.array(arrays['indptr']), np.array(arrays['indices']),
+                              np.array(arrays['edge_weight']), version=0)
+    return G, statistics
+
+def _graph_to_arrays(G: nx.DiGraph) -> dict[str, np.ndarray]:
+    node_ids = list(G.nodes)
+    node_codes = {node_id: i for i, node_id in enumerate(node_ids)}
+    indptr = np.zeros(len(node_ids) + 1, dtype=np.int64)
+    indices = []
+    edges = []
+    for i, node_id in enumerate(node_ids):
+        for neighbor, attrs in G.adj[node_id].items():
+            indices.append(node_codes[neighbor])
+            edges.append(attrs)
+        indptr[i + 1] = len(indices)
+
+    arrays = {
+        'indptr': indptr,
+        'indices': np.array(indices, dtype=np.int32),
+        'node_key': np.array(node_ids, dtype=str),
+        'node_size': np.array([G.nodes[node_id]['size'] for node_id in node_ids], dtype=np.float64),
+        'edge_weight': np.array([attrs['weight'] for attrs in edges], dtype=np.float64),
+    }
+    for field in NODE_FIELDS:
+        arrays[f'node_{field}'] = np.array([G.nodes[node_id][field] for node_id in node_ids], dtype=str)
+    for field in EDGE_FIELDS:
+        arrays[f'edge_{field}'] = np.array([attrs[field] for attrs in edges], dtype=str)
+    return arrays
+
+def _graph_from_arrays(arrays: dict[str, np.ndarray]) -> nx.DiGraph:
+    node_ids = arrays['node_key'].tolist()
+    node_sizes = arrays['node_size'].tolist()
+    node_columns = [arrays[f'node_{field}'].tolist() for field in NODE_FIELDS]
+    edge_weights = arrays['edge_weight'].tolist()
+    edge_columns = [arrays[f'edge_{field}'].tolist() for field in EDGE_FIELDS]
+    indptr = arrays['indptr'].tolist()
+    indices = arrays['indices'].tolist()
+
+    G = nx.DiGraph()
+    G.add_nodes_from(
+        (node_id, {'size': size, **dict(zip(NODE_FIELDS, values))})
+        for node_id, size, *values in zip(node_ids, node_sizes, *node_columns)
+    )
+    G.add_edges_from(
+        (node_ids[i], node_ids[indices[j]], {'weight': edge_weights[j], **{field: column[j] for field, column in zip(EDGE_FIELDS, edge_columns)}})
+        for i in range(len(node_ids))
+        for j in range(indptr[i], indptr[i + 1])
+    )
+    return G
+
+def _statistics_columns(stats: list[TransactionStatistics]) -> tuple[np.ndarray, np.ndarray]:
+    """Quantities and (total, average, max, min) values of a list of statistics"""
+    quantities = np.array([s.quantity for s in stats], dtype=np.int64)
+    values = np.array([(s.total_value, s.average_value, s.max_value, s.min_value) for s in stats], dtype=np.float64).reshape(len(stats), 4)
+    return quantities, values
+
+def _statistics_from_columns(quantities: np.ndarray, values: np.ndarray) -> list[TransactionStatistics]:
+    return [TransactionStatistics(quantity=q, total_value=total, average_value=average, max_value=max_v, min_value=min_v)
+            for q, (total, average, max_v, min_v) in zip(quantities.tolist(), values.tolist())]
+
+def _statistics_to_arrays(statistics: GlobalTransactionStatistics) -> dict[str, np.ndarray]:
+    flows = statistics.statistics_per_flow
+    companies = statistics.statistics_per_company
+    arrays = {
+        'flow_key': np.array(list(flows.keys()), dtype=str),
+        'company_key': np.array(list(companies.keys()), dtype=str),
+    }
+    for name, stats in (('global', [statistics.global_statistics]),
+                        ('flow', list(flows.values())),
+                        ('company_exported', [c.exported for c in companies.values()]),
+                        ('company_imported', [c.imported for c in companies.values()])):
+        arrays[f'{name}_quantity'], arrays[f'{name}_values'] = _statistics_columns(stats)
+        if all(s.sketch is not None for s in stats):
+            for column, array in ValueSketch.to_arrays([s.sketch for s in stats]).items():
+                arrays[f'{name}_sketch_{column}'] = array
+    return arrays
+
+def _statistics_from_arrays(arrays: dict[str, np.ndarray]) -> GlobalTransactionStatistics:
+    def columns(name: str) -> list[TransactionStatistics]:
+        stats = _statistics_from_columns(arrays[f'{name}_quantity'], arrays[f'{name}_values'])
+        if f'{name}_sketch_counts' in arrays:
+            sketches = ValueSketch.from_arrays({column: arrays[f'{name}_sketch_{column}']
+                                                for column in ('registers', 'level_sizes', 'counts', 'values')})
+            for s, sketch in zip(stats, sketches):
+                s.sketch = sketch
+        return stats
+
+    statistics = GlobalTransactionStatistics(global_statistics=columns('global')[0])
+    for flow_id, stats in zip(arrays['flow_key'].tolist(), columns('flow')):
+        statistics.statistics_per_flow[flow_id] = stats
+    for company_id, exported, imported in zip(arrays['company_key'].tolist(), columns('company_exported'), columns('company_imported')):
+        statistics.statistics_per_company[company_id] = CompanyTransactionStatistics(exported=exported, imported=imported)
+    return statistics
+
+def _cube_to_arrays(cube: StatisticsCube) -> dict[str, np.ndarray]:
+    arrays = {
+        'cube_flow_key': np.array(cube.flows.values, dtype=str),
+        'cube_company_key': np.array(cube.companies.values, dtype=str),
+        'cube_category_key': np.array(cube.categories.values, dtype=str),
+    }
+    for name in CUBE_CELLS:
+        cells = getattr(cube, f'{name}_cells')
+        for column in ('quantity', 'total_value', 'max_value', 'min_value'):
+            arrays[f'cube_{name}_{column}'] = getattr(cells, column)
+    return arrays
+
+def _cube_from_arrays(arrays: dict[str, np.ndarray]) -> StatisticsCube:
+    cube = StatisticsCube()
+    for codes, key in ((cube.flows, 'cube_flow_key'), (cube.companies, 'cube_company_key'), (cube.categories, 'cube_category_key')):
+        for value in arrays[key].tolist():
+            codes.code(value)
+    for name in CUBE_CELLS:
+        cells = CubeCells()
+        for column in ('quantity', 'total_value', 'max_value', 'min_value'):
+            # copied out of the memory map, cells are updated in-place by incremental updates
+            setattr(cells, column, np.array(arrays[f'cube_{name}_{column}']))
+        setattr(cube, f'{name}_cells', cells)
+    return cube
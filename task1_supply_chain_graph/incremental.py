@@ -0,0 +1,92 @@
+from typing import Iterable, NamedTuple
+import networkx as nx
+from .models import Transaction, GlobalTransactionStatistics
+from .statistics import add_transaction
+from .graph_builder import get_company_size, compute_node_size, compute_edge_size, rescale_graph
+
+class GraphUpdate(NamedTuple):
+    """Summary of an incremental update of statistics and graph"""
+    transactions: int
+    nodes: set[str]
+    edges: set[tuple[str, str]]
+    rescaled: bool
+
+def apply_transactions(G: nx.DiGraph,
+                       statistics: GlobalTransactionStatistics,
+                       delta: Iterable[Transaction]) -> GraphUpdate:
+    """
+    Appends a batch of transactions to statistics in-place and refreshes
+    only the affected node sizes and edge weights of a graph made by build_graph.
+
+    When the normalization bounds move, all sizes and weights are rescaled from statistics,
+    which is still much cheaper than a rebuild. Companies and flows that are not in the graph
+    only get their statistics updated: adding them needs Company/Connection data and a full build.
+    """
+    delta = list(delta)
+    if not delta:
+        return GraphUpdate(0, set(), set(), False)
+    flow_index = G.graph['flow_index']
+
+    flow_ids = {flow_id for t in delta for flow_id in (t.flow_id_supplier, t.flow_id_internal, t.flow_id_customer)}
+    edges = dict()  # flow_id -> (id_from, id_to) for flows present in the graph
+    nodes = set()
+    for flow_id in flow_ids:
+        sender, receiver = flow_index.lookup(flow_id)
+        nodes.update(node for node in (sender, receiver) if node in G)
+        if G.has_edge(sender, receiver) and G.edges[sender, receiver]['flow_id'] == flow_id:
+            edges[flow_id] = (sender, receiver)
+
+    def connection_size(flow_id: str) -> float | None:
+        flow_statistics = statistics.statistics_per_flow.get(flow_id)
+        return flow_statistics.total_value if flow_statistics is not None else None
+
+    old_company_sizes = {node: get_company_size(statistics, node) for node in nodes}
+    old_connection_sizes = {flow_id: connection_size(flow_id) for flow_id in flow_ids}
+
+    for t in delta:
+        add_transaction(statistics, t, flow_index)
+    cube = G.graph.get('statistics_cube')
+    if cube is not None:
+        cube.add(delta)
+
+    new_company_sizes = {node: get_company_size(statistics, node) for node in nodes}
+    new_connection_sizes = {flow_id: connection_size(flow_id) for flow_id in flow_ids}
+
+    company_size_bounds = _updated_bounds(
+        G.graph['company_size_bounds'], old_company_sizes, new_company_sizes,
+        lambda: [get_company_size(statistics, node) for node in G.nodes])
+    connection_size_bounds = _updated_bounds(
+        G.graph['connection_size_bounds'], old_connection_sizes, new_connection_sizes,
+        lambda: [flow_statistics.total_value for flow_statistics in statistics.statistics_per_flow.values()])
+
+    rescaled = (company_size_bounds != G.graph['company_size_bounds']
+                or connection_size_bounds != G.graph['connection_size_bounds'])
+    G.graph['company_size_bounds'] = company_size_bounds
+    G.graph['connection_size_bounds'] = connection_size_bounds
+
+    if rescaled:
+        rescale_graph(G, statistics)
+    else:
+        for node in nodes:
+            G.nodes[node]['size'] = compute_node_size(new_company_sizes[node], company_size_bounds)
+        for flow_id, (sender, receiver) in edges.items():
+            G.edges[sender, receiver]['weight'] = compute_edge_size(new_connection_sizes[flow_id], connection_size_bounds)
+
+    G.graph['version'] = G.graph.get('version', 0) + 1
+    return GraphUpdate(len(delta), nodes, set(edges.values()), rescaled)
+
+def _updated_bounds(bounds: tuple[float, float],
+                    old_sizes: dict[str, float | None],
+                    new_sizes: dict[str, float],
+                    all_sizes: callable) -> tuple[float, float]:
+    """
+    Derives new (min, max) bounds from the changed sizes only, falling back to a full scan
+    when a value that defined a bound has moved inwards.
+    """
+    low, high = bounds
+    for key, old_size in old_sizes.items():
+        new_size = new_sizes[key]
+        if old_size is not None and ((old_size == low and new_size > low) or (old_size == high and new_size < high)):
+            sizes = all_sizes()
+            return min(sizes), max(sizes)
+    return min([low, *new_sizes.values()]), max([high, *new_sizes.values()])
@@ -0,0 +1,216 @@
+"""
+Instrumentation of the load -> statistics -> graph -> query pipeline: per-stage wall time,
+peak RSS, allocated memory blocks and row counts, per-query latencies, and optional cProfile
+and tracemalloc captures. Metrics export as JSON or as Prometheus text.
+"""
+import cProfile
+import io
+import json
+import math
+import pstats
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+METRIC_PREFIX = 'supply_chain'
+QUANTILES = (0.5, 0.9, 0.99)
+# where a cProfile capture is saved when no metrics file is written
+PROFILE_PATH = Path('profile.prof')
+
+def peak_rss_bytes() -> int | None:
+    """Peak resident set size of this process so far, None where getrusage is not available"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+@dataclass(slots=True)
+class StageMetrics:
+    name: str
+    seconds: float = 0.0
+    peak_rss_bytes: int | None = None
+    allocated_blocks: int = 0
+    rows: int | None = None
+    traced_peak_bytes: int | None = None
+
+@dataclass(slots=True)
+class QueryMetrics:
+    """Latencies of one kind of query, in seconds"""
+    kind: str
+    latencies: list[float] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def total(self) -> float:
+        return sum(self.latencies)
+
+    def quantile(self, q: float) -> float:
+        """Nearest-rank quantile, nan without queries"""
+        if not self.latencies:
+            return math.nan
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
+
+    def summary(self) -> dict:
+        return {'count': self.count, 'total_seconds': self.total,
+                **{f'p{round(q * 100)}_seconds': self.quantile(q) for q in QUANTILES},
+                'max_seconds': max(self.latencies, default=math.nan)}
+
+class Instrumentation:
+    """
+    Collects stage and query metrics of a run.
+
+    Stage timing, peak RSS (getrusage) and net allocated blocks (sys.getallocatedblocks) are cheap
+    and always on. With trace_memory, tracemalloc also records the peak traced memory of every stage
+    and the top allocation sites; with profile, cProfile runs from construction until stop().
+    Both slow the pipeline down, so they are off by default.
+    """
+
+    def __init__(self, profile: bool = False, trace_memory: bool = False):
+        self.stages: list[StageMetrics] = []
+        self.queries: dict[str, QueryMetrics] = {}
+        self.trace_memory = trace_memory
+        self.allocation_sites: list[str] = []
+        self.profiler = cProfile.Profile() if profile else None
+        if self.trace_memory:
+            tracemalloc.start()
+        if self.profiler is not None:
+            self.profiler.enable()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Measures the enclosed block as a pipeline stage, the yielded StageMetrics can take a row count"""
+        metrics = StageMetrics(name)
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            yield metrics
+        finally:
+            metrics.seconds = time.perf_counter() - start
+            metrics.allocated_blocks = sys.getallocatedblocks() - blocks
+            metrics.peak_rss_bytes = peak_rss_bytes()
+            if self.trace_memory:
+                metrics.traced_peak_bytes = tracemalloc.get_traced_memory()[1]
+            self.stages.append(metrics)
+
+    def record_query(self, kind: str, seconds: float) -> None:
+        metrics = self.queries.get(kind)
+        if metrics is None:
+            metrics = self.queries[kind] = QueryMetrics(kind)
+        metrics.latencies.append(seconds)
+
+    @contextmanager
+    def query(self, kind: str):
+        """Records the latency of the enclosed block as a query of the given kind"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_query(kind, time.perf_counter() - start)
+
+    def stop(self, profile_path: Path | None = None) -> None:
+        """
+        Stops cProfile and tracemalloc captures, metrics collected so far are kept.
+        With profile_path, the cProfile capture is saved there for pstats or snakeviz.
+        """
+        if self.profiler is not None:
+            self.profiler.disable()
+            if profile_path is not None:
+                try:
+                    self.profiler.dump_stats(profile_path)
+                    print(f"Profile written to {profile_path}", file=sys.stderr)
+                except OSError as error:
+                    print(f"Error writing profile: {error}", file=sys.stderr)
+        if self.trace_memory and tracemalloc.is_tracing():
+            self.allocation_sites = self.top_allocations()
+            tracemalloc.stop()
+
+    def to_dict(self) -> dict:
+        return {
+            'stages': [asdict(stage) for stage in self.stages],
+            'queries': {kind: metrics.summary() for kind, metrics in self.queries.items()},
+            'peak_rss_bytes': peak_rss_bytes(),
+        }
+
+    def to_prometheus(self) -> str:
+        """Metrics in the Prometheus text exposition format"""
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples: list[tuple[dict, float | int | None]]):
+            samples = [(labels, value) for labels, value in samples if value is not None]
+            if not samples:
+                return
+            lines.append(f'# HELP {METRIC_PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {METRIC_PREFIX}_{name} {kind}')
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{label}"' for key, label in labels.items())
+                lines.append(f'{METRIC_PREFIX}_{name}{{{label_text}}} {value}' if label_text else f'{METRIC_PREFIX}_{name} {value}')
+
+        metric('stage_seconds', 'gauge', 'Wall time of a pipeline stage',
+               [({'stage': s.name}, s.seconds) for s in self.stages])
+        metric('stage_peak_rss_bytes', 'gauge', 'Peak resident set size of the process at the end of a stage',
+               [({'stage': s.name}, s.peak_rss_bytes) for s in self.stages])
+        metric('stage_allocated_blocks', 'gauge', 'Net memory blocks allocated by a stage',
+               [({'stage': s.name}, s.allocated_blocks) for s in self.stages])
+        metric('stage_rows', 'gauge', 'Rows or items produced by a stage',
+               [({'stage': s.name}, s.rows) for s in self.stages])
+        metric('stage_traced_peak_bytes', 'gauge', 'Peak memory traced by tracemalloc during a stage',
+               [({'stage': s.name}, s.traced_peak_bytes) for s in self.stages])
+        query_samples = []
+        for kind, metrics in self.queries.items():
+            query_samples += [({'kind': kind, 'quantile': str(q)}, metrics.quantile(q)) for q in QUANTILES]
+        metric('query_latency_seconds', 'summary', 'Latency of interactive queries', query_samples)
+        for kind, metrics in self.queries.items():
+            lines.append(f'{METRIC_PREFIX}_query_latency_seconds_sum{{kind="{kind}"}} {metrics.total}')
+            lines.append(f'{METRIC_PREFIX}_query_latency_seconds_count{{kind="{kind}"}} {metrics.count}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: Path) -> None:
+        """Writes metrics as JSON for a .json path, as Prometheus text otherwise; a cProfile capture goes next to it as .prof"""
+        path = Path(path)
+        if path.suffix == '.json':
+            path.write_text(json.dumps(self.to_dict(), indent=2), encoding='utf-8')
+        else:
+            path.write_text(self.to_prometheus(), encoding='utf-8')
+        if self.profiler is not None:
+            self.profiler.dump_stats(path.with_suffix('.prof'))
+
+    def report(self, top: int = 15) -> str:
+        """Human readable summary of stages, queries and captures"""
+        lines = ['Stage                      Time (ms)   Peak RSS (MiB)   Alloc. blocks        Rows']
+        for s in self.stages:
+            rss = f'{s.peak_rss_bytes / 2**20:16.1f}' if s.peak_rss_bytes is not None else f'{"-":>16}'
+            rows = f'{s.rows:11}' if s.rows is not None else f'{"-":>11}'
+            lines.append(f'{s.name:24} {s.seconds * 1e3:11.1f} {rss} {s.allocated_blocks:15} {rows}')
+            if s.traced_peak_bytes is not None:
+                lines.append(f'{"":24} traced peak {s.traced_peak_bytes / 2**20:.1f} MiB')
+        for kind, metrics in self.queries.items():
+            lines.append(f'Query {kind}: {metrics.count} queries, '
+                         + ', '.join(f'p{round(q * 100)} {metrics.quantile(q) * 1e3:.2f} ms' for q in QUANTILES))
+        if self.allocation_sites:
+            lines.append('Top allocation sites (tracemalloc):')
+            lines += [f'  {line}' for line in self.allocation_sites[:top]]
+        if self.profiler is not None:
+            stream = io.StringIO()
+            pstats.Stats(self.profiler, stream=stream).sort_stats('cumulative').print_stats(top)
+            lines.append(stream.getvalue())
+        return '\n'.join(lines)
+
+    def top_allocations(self, count: int = 10) -> list[str]:
+        if not tracemalloc.is_tracing():
+            return []
+        return [str(stat) for stat in tracemalloc.take_snapshot().statistics('lineno')[:count]]
@@ -1,45 +1,171 @@
+import argparse
+import contextlib
+import sys
 from pathlib import Path
-from .csv_loader import load_companies, load_connections, load_transactions
-from .statistics import calculate_statistics
+import networkx as nx
+from .csv_loader import load_companies, load_connections, load_transaction_table
+from .models import FlowIndex, GlobalTransactionStatistics
+from .statistics_numpy import calculate_statistics_numpy
+from .statistics_parallel import calculate_statistics_parallel
+from .statistics_cube import StatisticsCube
 from .graph_builder import build_graph
+from .graph_snapshot import load_snapshot, save_snapshot
 from .supply_chain_app import SupplyChainApp
+from .instrumentation import PROFILE_PATH, Instrumentation
+from .draw_with_matplotlib import LayoutMethod
+from .batch_queries import CHUNK_SIZE, run_batch_stream
+
+DATA_DIR = Path(__file__).parent / "data"
+SNAPSHOT_DIR = DATA_DIR / ".snapshot"
+
+def load_graph(data_dir: Path = DATA_DIR,
+               use_cache: bool = True,
+               workers: int | None = None,
+               instrumentation: Instrumentation | None = None) -> tuple[nx.DiGraph, GlobalTransactionStatistics]:
+    """
+    Loads graph and statistics from the snapshot cache when it is valid, otherwise builds them from CSV files.
+    With more than one worker, transaction statistics are aggregated in parallel worker processes.
+    Every stage is measured by the given instrumentation.
+    """
+    if instrumentation is None:
+        instrumentation = Instrumentation()
+    sources = [data_dir / "companies.csv", data_dir / "connections.csv", data_dir / "transactions.csv"]
+    snapshot_dir = data_dir / SNAPSHOT_DIR.name
+
+    if use_cache:
+        with instrumentation.stage("load_snapshot") as stage:
+            snapshot = load_snapshot(snapshot_dir, sources)
+            stage.rows = len(snapshot[0]) if snapshot is not None else 0
+        if snapshot is not None:
+            print("Loaded graph and statistics from snapshot cache.")
+            return snapshot
+
+    print("Loading data about companies, connections and transactions...")
+    flow_index = FlowIndex()
+    with instrumentation.stage("load_companies") as stage:
+        companies = load_companies(str(sources[0]))
+        stage.rows = len(companies)
+    with instrumentation.stage("load_connections") as stage:
+        connections = load_connections(str(sources[1]), flow_index)
+        stage.rows = len(connections)
+    if workers is not None and workers > 1:
+        print(f"Calculating statistics based on transactions in {workers} worker processes...")
+        with instrumentation.stage("calculate_statistics_parallel") as stage:
+            cube = StatisticsCube()
+            statistics = calculate_statistics_parallel(str(sources[2]), workers, cube=cube)
+            stage.rows = statistics.global_statistics.quantity
+        for flow_id in statistics.statistics_per_flow:
+            flow_index.code(flow_id)
+    else:
+        with instrumentation.stage("load_transactions") as stage:
+            transactions = load_transaction_table(str(sources[2]), flow_index)
+            stage.rows = len(transactions)
+        print("Calculating statistics based on transactions...")
+        with instrumentation.stage("calculate_statistics") as stage:
+            statistics = calculate_statistics_numpy(transactions, sketches=True)
+            stage.rows = len(statistics.statistics_per_flow) + len(statistics.statistics_per_company)
+        with instrumentation.stage("build_statistics_cube") as stage:
+            cube = StatisticsCube.from_table(transactions)
+            stage.rows = len(cube.flows) * len(cube.categories)
+
+    print("Building graph...")
+    with instrumentation.stage("build_graph") as stage:
+        graph = build_graph(companies, connections, statistics, flow_index)
+        graph.graph['statistics_cube'] = cube
+        stage.rows = graph.number_of_nodes() + graph.number_of_edges()
+    print(f"Flow index: {len(flow_index)} distinct flows, {flow_index.hits} hits, {flow_index.misses} misses.")
+
+    if use_cache:
+        try:
+            with instrumentation.stage("save_snapshot"):
+                save_snapshot(snapshot_dir, sources, graph, statistics)
+        except Exception as error:
+            print(f"Error saving graph snapshot: {error}")
+    return graph, statistics
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="python -m task1_supply_chain_graph", description="Supply chain data visualizer")
+    parser.add_argument("--no-cache", action="store_true", help="rebuild graph from CSV files, ignoring and not writing the snapshot cache")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes for statistics of a large transactions file and for bottleneck ranking")
+    parser.add_argument("--profile", action="store_true", help="capture a cProfile of the whole run, print the top functions on exit and save it "
+                        "next to --metrics-out as .prof, or as profile.prof without it")
+    parser.add_argument("--trace-memory", action="store_true", help="trace allocations with tracemalloc: peak per stage and top allocation sites")
+    parser.add_argument("--metrics-out", type=Path, default=None,
+                        help="write stage and query metrics on exit, as JSON for a .json file, as Prometheus text otherwise")
+    parser.add_argument("--layout", choices=[method.value for method in LayoutMethod], default=LayoutMethod.SPRING.value,
+                        help="matplotlib layout: spring (default), geographic (lon/lat, fastest) or forceatlas2")
+    parser.add_argument("--batch", metavar="FILE|-", default=None,
+                        help="answer JSON-lines queries from a file or stdin without prompts, writing JSON-lines results to stdout")
+    args = parser.parse_args(argv)
+    instrumentation = Instrumentation(profile=args.profile, trace_memory=args.trace_memory)
+
+    if args.batch is not None:
+        run_batch_mode(args, instrumentation)
+        return
 
-def main():
     print("Hi, it's supply chain data visualizer!")
     print("It loads data about companies and transactions from csv and builds an oriented graph, " \
     "so you can explore and get insights about supply chain data and find useful information")
     print("PS: pardon for not the most user-friendly UX, reactive grapth visuals would require a setup with extra dependencies, " \
     "so this is a quick console-based solution for homework purpose.")
 
-    # Get the directory of this script and construct paths relative to it
-    script_dir = Path(__file__).parent
-    data_dir = script_dir / "data"
-
-    print("Loading data about companies, connections and transactions...")
-    companies = load_companies(str(data_dir / "companies.csv"))
-    connections = load_connections(str(data_dir / "connections.csv"))
-    transactions = load_transactions(str(data_dir / "transactions.csv"))
-
-    print("Calculating statistics based on transactions...")
-    statistics = calculate_statistics(transactions)
-
-    print("Building graph...")
-    graph = build_graph(companies, connections, statistics)
-    print(f"\nGraph loaded with {len(graph.nodes())} companies and {len(graph.edges())} connections.")
+    graph, statistics = load_graph(DATA_DIR, use_cache=not args.no_cache, workers=args.workers, instrumentation=instrumentation)
+    load_seconds = sum(stage.seconds for stage in instrumentation.stages)
+    print(f"\nGraph loaded with {len(graph.nodes())} companies and {len(graph.edges())} connections in {load_seconds * 1000:.0f} ms.")
     print("Enter 'quit', 'exit', or 'q' to stop.\n")
 
     print("Loading application...")
-    app = SupplyChainApp(graph, statistics)
+    app = SupplyChainApp(graph, statistics, workers=args.workers, instrumentation=instrumentation,
+                         matplotlib_layout=LayoutMethod(args.layout))
     print("Application loaded.")
     app.print_info()
     print("Graph will be displayed separately, but user interaction is still through console. Ready to start?")
-    display_tool = app.get_valid_display_tool()
-    if display_tool is not None:
-        app.set_display_tool(display_tool)
-        app.show_graph()
-        app.run()
+    try:
+        display_tool = app.get_valid_display_tool()
+        if display_tool is not None:
+            app.set_display_tool(display_tool)
+            app.show_graph()
+            app.run()
+    finally:
+        # without a metrics file, the profile is saved on its own, with one it goes next to the metrics
+        instrumentation.stop(PROFILE_PATH if args.metrics_out is None else None)
+        if args.profile or args.trace_memory:
+            print(instrumentation.report())
+        if args.metrics_out is not None:
+            try:
+                instrumentation.write(args.metrics_out)
+                print(f"Metrics written to {args.metrics_out}")
+            except OSError as error:
+                print(f"Error writing metrics: {error}")
     
     print("\nExiting...")
 
+def run_batch_mode(args: argparse.Namespace, instrumentation: Instrumentation):
+    """Loads the graph once and answers every query of the batch, stdout carries only results"""
+    with contextlib.redirect_stdout(sys.stderr):
+        graph, statistics = load_graph(DATA_DIR, use_cache=not args.no_cache, workers=args.workers, instrumentation=instrumentation)
+    try:
+        source = sys.stdin if args.batch == "-" else open(args.batch, encoding="utf-8")
+    except OSError as error:
+        print(f"Error opening batch file: {error}", file=sys.stderr)
+        sys.exit(1)
+    try:
+        with source:
+            # queries from stdin are sent one by one, so every answer is written as soon as it is ready
+            chunk_size = 1 if source is sys.stdin else CHUNK_SIZE
+            count, seconds = run_batch_stream(graph, statistics, source, sys.stdout, args.workers, instrumentation, chunk_size)
+    finally:
+        instrumentation.stop(PROFILE_PATH if args.metrics_out is None else None)
+    rate = count / seconds if seconds > 0 else float('inf')
+    print(f"Answered {count} queries in {seconds:.2f} s ({rate:.0f} queries/sec).", file=sys.stderr)
+    if args.profile or args.trace_memory:
+        print(instrumentation.report(), file=sys.stderr)
+    if args.metrics_out is not None:
+        try:
+            instrumentation.write(args.metrics_out)
+            print(f"Metrics written to {args.metrics_out}", file=sys.stderr)
+        except OSError as error:
+            print(f"Error writing metrics: {error}", file=sys.stderr)
+
 if __name__ == "__main__":
     main()
@@ -1,4 +1,10 @@
 from .csv_data import Company, Connection, Transaction
+from .sketches import QuantileSketch, DistinctCounter, ValueSketch
 from .statistics_data import TransactionStatistics, GlobalTransactionStatistics, CompanyTransactionStatistics
+from .string_codes import StringCodes
+from .flow_index import FlowIndex, parse_flow_id, unify_company_id
+from .transaction_table import TransactionTable
 
-__all__ = ['Company', 'Connection', 'Transaction', 'TransactionStatistics', 'GlobalTransactionStatistics', 'CompanyTransactionStatistics']
+__all__ = ['Company', 'Connection', 'Transaction', 'TransactionStatistics', 'GlobalTransactionStatistics', 'CompanyTransactionStatistics',
+           'StringCodes', 'FlowIndex', 'parse_flow_id', 'unify_company_id', 'TransactionTable',
+           'QuantileSketch', 'DistinctCounter', 'ValueSketch']
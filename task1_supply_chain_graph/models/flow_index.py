@@ -0,0 +1,90 @@
+"""
+Shared index from flow ids to the integer codes of the companies they connect
+"""
+
+
+from array import array
+from typing import Iterable
+
+from .string_codes import StringCodes
+
+
+def unify_company_id(company_id: str) -> str:
+    return company_id.strip('0').upper()
+
+
+def parse_flow_id(flow_id: str) -> tuple[str, str]:
+    """Splits a flow id like 42008902_0009 into unified (sender, receiver) company ids"""
+    company_ids = flow_id.split('_')
+    if len(company_ids) < 2:
+        raise ValueError(f'Invalid flow_id format: {flow_id}: should contain _ separator')
+    return unify_company_id(company_ids[0]), unify_company_id(company_ids[1])
+
+
+class FlowIndex(StringCodes):
+    """
+    Flow id vocabulary that parses every distinct flow id exactly once.
+
+    Each flow code maps to integer (sender, receiver) company codes, company ids
+    are interned in a shared vocabulary. Lookups are counted as hits and misses,
+    a miss being the first (parsing) lookup of a flow id.
+    Flow ids that cannot be parsed are indexed with company codes of -1
+    and raise ValueError only when their companies are requested.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.companies = StringCodes()
+        self.senders = array('i')
+        self.receivers = array('i')
+        self.hits = 0
+        self.misses = 0
+
+    def code(self, flow_id: str) -> int:
+        code = self.get(flow_id)
+        if code is not None:
+            self.hits += 1
+            return code
+
+        self.misses += 1
+        try:
+            sender, receiver = parse_flow_id(flow_id)
+            sender_code, receiver_code = self.companies.code(sender), self.companies.code(receiver)
+        except ValueError:
+            sender_code, receiver_code = -1, -1
+        self.senders.append(sender_code)
+        self.receivers.append(receiver_code)
+        return super().code(flow_id)
+
+    def company_codes(self, flow_code: int) -> tuple[int, int]:
+        """Returns (sender, receiver) company codes of a flow code"""
+        sender, receiver = self.senders[flow_code], self.receivers[flow_code]
+        if sender < 0:
+            raise ValueError(f'Invalid flow_id format: {self.values[flow_code]}: should contain _ separator')
+        return sender, receiver
+
+    def company_ids(self, flow_code: int) -> tuple[str, str]:
+        """Returns (sender, receiver) company ids of a flow code"""
+        sender, receiver = self.company_codes(flow_code)
+        return self.companies.values[sender], self.companies.values[receiver]
+
+    def company_id_pairs(self) -> list[tuple[str, str] | None]:
+        """Returns (sender, receiver) company ids of every flow code, None for invalid flow ids"""
+        companies = self.companies.values
+        return [(companies[sender], companies[receiver]) if sender >= 0 else None
+                for sender, receiver in zip(self.senders, self.receivers)]
+
+    def lookup(self, flow_id: str) -> tuple[str, str]:
+        """Returns (sender, receiver) company ids of a flow id, parsing it if it is new"""
+        return self.company_ids(self.code(flow_id))
+
+    @staticmethod
+    def from_flow_ids(flow_ids: Iterable[str]) -> 'FlowIndex':
+        """Indexes flow ids in the given order, so codes match the order of the iterable's distinct values"""
+        index = FlowIndex()
+        for flow_id in flow_ids:
+            index.code(flow_id)
+        return index
+
+    def __repr__(self) -> str:
+        return f'FlowIndex({len(self)} flows, {len(self.companies)} companies, {self.hits} hits, {self.misses} misses)'
@@ -0,0 +1,226 @@
+"""
+Mergeable streaming sketches of order values: quantiles and distinct product counts
+in fixed, small memory
+"""
+
+
+import hashlib
+import math
+from array import array
+from functools import lru_cache
+
+import numpy as np
+
+
+class QuantileSketch:
+    """
+    KLL-style quantile sketch.
+
+    Values are kept in levels of compactors, a value on level h standing for 2**h original values.
+    A full level is sorted and every other value moves one level up, alternating between odd and
+    even positions. Level capacities shrink geometrically towards the bottom, so memory stays
+    below about 3 * k values, and ranks are off by about n / k at most.
+    """
+
+    __slots__ = ('k', 'n', 'levels', '_offset')
+
+    def __init__(self, k: int = 128):
+        self.k = k
+        self.n = 0
+        self.levels = [array('d')]
+        self._offset = 0
+
+    def __len__(self) -> int:
+        """Number of values kept"""
+        return sum(len(level) for level in self.levels)
+
+    def add(self, value: float) -> None:
+        self.levels[0].append(value)
+        self.n += 1
+        if len(self.levels[0]) >= self._capacity(0):
+            self._compress()
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        while len(self.levels) < len(other.levels):
+            self.levels.append(array('d'))
+        for level, other_level in zip(self.levels, other.levels):
+            level.extend(other_level)
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantile(self, q: float) -> float:
+        """Approximate q-quantile, nan for an empty sketch"""
+        items = sorted((value, 1 << h) for h, level in enumerate(self.levels) for value in level)
+        if not items:
+            return math.nan
+        target = q * sum(weight for _, weight in items)
+        cumulative = 0
+        for value, weight in items:
+            cumulative += weight
+            if cumulative >= target:
+                return value
+        return items[-1][0]
+
+    @staticmethod
+    def from_sorted(values: np.ndarray, k: int = 128) -> 'QuantileSketch':
+        """Sketch of sorted values in one step: every 2**h-th value on the lowest level h that fits into 2 * k values"""
+        sketch = QuantileSketch(k)
+        sketch.n = len(values)
+        h = 0
+        while len(values) > 2 * k << h:
+            h += 1
+        sketch.levels = [array('d') for _ in range(h + 1)]
+        sketch.levels[h] = array('d', values[(1 << h) // 2::1 << h].tolist())
+        return sketch
+
+    def _capacity(self, h: int) -> int:
+        return max(2, math.ceil(self.k * (2 / 3) ** (len(self.levels) - 1 - h)))
+
+    def _compress(self) -> None:
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) >= self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(array('d'))
+                values = sorted(level)
+                # an odd value out stays on its level
+                kept = values[len(values) - len(values) % 2:]
+                self.levels[h + 1].extend(values[self._offset:len(values) - len(kept):2])
+                self.levels[h] = array('d', kept)
+                self._offset ^= 1
+            h += 1
+
+
+@lru_cache(maxsize=1 << 16)
+def _hash64(value: str) -> int:
+    """Stable 64-bit hash, the same in every process, unlike hash()"""
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class DistinctCounter:
+    """HyperLogLog distinct counter with 2**p one-byte registers, about 1.04 / sqrt(2**p) relative error"""
+
+    __slots__ = ('p', 'registers')
+
+    def __init__(self, p: int = 10):
+        self.p = p
+        self.registers = bytearray(1 << p)
+
+    def add(self, value: str) -> None:
+        register, rank = self.register_rank(_hash64(value), self.p)
+        if rank > self.registers[register]:
+            self.registers[register] = rank
+
+    @staticmethod
+    def register_rank(hash64: int, p: int) -> tuple[int, int]:
+        """Register index and rank (position of the first 1 bit) of a 64-bit hash"""
+        rest = hash64 & ((1 << (64 - p)) - 1)
+        return hash64 >> (64 - p), 64 - p - rest.bit_length() + 1
+
+    def merge(self, other: 'DistinctCounter') -> 'DistinctCounter':
+        self.registers = bytearray(np.maximum(np.frombuffer(self.registers, dtype=np.uint8),
+                                              np.frombuffer(other.registers, dtype=np.uint8)).tobytes())
+        return self
+
+    def count(self) -> int:
+        m = len(self.registers)
+        registers = np.frombuffer(self.registers, dtype=np.uint8)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / float(np.sum(np.ldexp(1.0, -registers.astype(np.int64))))
+        zeros = int(np.count_nonzero(registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # linear counting is more precise for small cardinalities
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+
+class ValueSketch:
+    """Order value quantiles and distinct products of a TransactionStatistics, mergeable across shards"""
+
+    __slots__ = ('quantiles', 'products')
+
+    def __init__(self, quantiles: QuantileSketch | None = None, products: DistinctCounter | None = None):
+        self.quantiles = quantiles if quantiles is not None else QuantileSketch()
+        self.products = products if products is not None else DistinctCounter()
+
+    def add(self, value: float, product: str | None = None) -> None:
+        self.quantiles.add(value)
+        if product is not None:
+            self.products.add(product)
+
+    def merge(self, other: 'ValueSketch') -> 'ValueSketch':
+        self.quantiles.merge(other.quantiles)
+        self.products.merge(other.products)
+        return self
+
+    def quantile(self, q: float) -> float:
+        return self.quantiles.quantile(q)
+
+    def distinct_products(self) -> int:
+        return self.products.count()
+
+    @staticmethod
+    def from_groups(groups: np.ndarray, values: np.ndarray, products: np.ndarray, product_names: list[str],
+                    n_groups: int) -> list['ValueSketch']:
+        """
+        Sketches of values and product codes per group id, built with NumPy:
+        quantile sketches from values sorted within groups, distinct counters by
+        a maximum of product register ranks per (group, register).
+        """
+        sketches = [ValueSketch() for _ in range(n_groups)]
+        if not sketches:
+            return sketches
+        # one sort of int64 keys (group, rank of value) instead of a slower lexsort
+        order = np.argsort(values)
+        ranks = np.empty(len(values), dtype=np.int64)
+        ranks[order] = np.arange(len(values))
+        keys = groups.astype(np.int64) * len(values) + ranks
+        keys.sort()
+        bounds = np.searchsorted(keys, np.arange(n_groups + 1, dtype=np.int64) * len(values))
+        sorted_values = values[order][keys % len(values)] if len(values) else values
+        for group, sketch in enumerate(sketches):
+            sketch.quantiles = QuantileSketch.from_sorted(sorted_values[bounds[group]:bounds[group + 1]])
+
+        p = sketches[0].products.p
+        register_ranks = np.array([DistinctCounter.register_rank(_hash64(name), p) for name in product_names],
+                                  dtype=np.intp).reshape(len(product_names), 2)
+        registers = np.zeros((n_groups, 1 << p), dtype=np.uint8)
+        np.maximum.at(registers, (groups, register_ranks[products, 0]), register_ranks[products, 1].astype(np.uint8))
+        for sketch, group_registers in zip(sketches, registers):
+            sketch.products.registers = bytearray(group_registers.tobytes())
+        return sketches
+
+    @staticmethod
+    def to_arrays(sketches: list['ValueSketch']) -> dict[str, np.ndarray]:
+        """Columns of a list of sketches: registers matrix, level sizes and concatenated kept values"""
+        level_count = max((len(sketch.quantiles.levels) for sketch in sketches), default=1)
+        level_sizes = np.zeros((len(sketches), level_count), dtype=np.int64)
+        for i, sketch in enumerate(sketches):
+            level_sizes[i, :len(sketch.quantiles.levels)] = [len(level) for level in sketch.quantiles.levels]
+        values = [value for sketch in sketches for level in sketch.quantiles.levels for value in level]
+        return {
+            'registers': np.array([np.frombuffer(sketch.products.registers, dtype=np.uint8) for sketch in sketches],
+                                  dtype=np.uint8).reshape(len(sketches), -1),
+            'level_sizes': level_sizes,
+            'counts': np.array([sketch.quantiles.n for sketch in sketches], dtype=np.int64),
+            'values': np.array(values, dtype=np.float64),
+        }
+
+    @staticmethod
+    def from_arrays(arrays: dict[str, np.ndarray]) -> list['ValueSketch']:
+        sketches = []
+        values = arrays['values'].tolist()
+        position = 0
+        for registers, level_sizes, n in zip(arrays['registers'], arrays['level_sizes'].tolist(), arrays['counts'].tolist()):
+            while len(level_sizes) > 1 and level_sizes[-1] == 0:
+                level_sizes.pop()
+            sketch = ValueSketch()
+            sketch.quantiles.n = n
+            sketch.quantiles.levels = []
+            for size in level_sizes:
+                sketch.quantiles.levels.append(array('d', values[position:position + size]))
+                position += size
+            sketch.products.registers = bytearray(registers.tobytes())
+            sketches.append(sketch)
+        return sketches
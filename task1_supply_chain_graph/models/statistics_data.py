@@ -1,13 +1,15 @@
-from collections import UserDict
 from dataclasses import dataclass, field
+from .sketches import ValueSketch
 
-@dataclass
+@dataclass(slots=True)
 class TransactionStatistics:
     quantity: int = 0
     total_value: float = 0.0
     average_value: float = 0.0
     max_value: float = 0.0
     min_value: float = field(default_factory=lambda: float('inf'))
+    # optional quantile and distinct product sketch, not part of equality
+    sketch: ValueSketch | None = field(default=None, compare=False, repr=False)
     
     def __getitem__(self, key):
         return getattr(self, key)
@@ -15,15 +17,10 @@ class TransactionStatistics:
     def __setitem__(self, key, value):
         setattr(self, key, value)
 
-class TransactionStatisticsPerFlow(UserDict):
+class TransactionStatisticsPerFlow(dict[str, TransactionStatistics]):
     '''A dictionary to hold TransactionStatistics indexed by flow_id'''
-    def __setitem__(self, key: str, value: TransactionStatistics) -> None:
-        super().__setitem__(key, value)
 
-    def __getitem__(self, key: str) -> TransactionStatistics:
-        return super().__getitem__(key)
-
-@dataclass
+@dataclass(slots=True)
 class CompanyTransactionStatistics:
     exported: TransactionStatistics = field(default_factory=TransactionStatistics)
     imported: TransactionStatistics = field(default_factory=TransactionStatistics)
@@ -34,15 +31,10 @@ class CompanyTransactionStatistics:
     def __setitem__(self, key, value):
         setattr(self, key, value)
     
-class TransactionStatisticsPerCompany(UserDict):
-    '''A dictionary to hold TransactionStatistics indexed by company_id'''
-    def __setitem__(self, key: str, value: CompanyTransactionStatistics) -> None:
-        super().__setitem__(key, value)
-
-    def __getitem__(self, key: str) -> CompanyTransactionStatistics:
-        return super().__getitem__(key)
+class TransactionStatisticsPerCompany(dict[str, CompanyTransactionStatistics]):
+    '''A dictionary to hold CompanyTransactionStatistics indexed by company_id'''
 
-@dataclass
+@dataclass(slots=True)
 class GlobalTransactionStatistics:
     global_statistics: TransactionStatistics = field(default_factory=TransactionStatistics)
     statistics_per_flow: TransactionStatisticsPerFlow = field(default_factory=TransactionStatisticsPerFlow)
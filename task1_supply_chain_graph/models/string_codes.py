@@ -0,0 +1,37 @@
+"""
+Interned string vocabulary with sequential integer codes
+"""
+
+
+import sys
+
+
+class StringCodes:
+    """Interns strings and assigns each distinct value a sequential integer code"""
+
+    def __init__(self):
+        self.values: list[str] = []
+        self._codes: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __contains__(self, value: str) -> bool:
+        return value in self._codes
+
+    def get(self, value: str) -> int | None:
+        """Returns the code of the value, or None if it was not seen before"""
+        return self._codes.get(value)
+
+    def code(self, value: str) -> int:
+        """Returns the code of the value, assigning a new one if it was not seen before"""
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            value = sys.intern(value)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    def value(self, code: int) -> str:
+        return self.values[code]
@@ -0,0 +1,104 @@
+"""
+Columnar, array-backed storage for supply chain transactions
+"""
+
+
+from array import array
+from typing import Iterable, Iterator
+
+from .csv_data import Transaction
+from .flow_index import FlowIndex
+from .string_codes import StringCodes
+
+
+class TransactionTable:
+    """
+    Holds transactions as typed columns instead of one object per row.
+
+    Flow ids, product names and product categories are stored as integer codes
+    into shared vocabularies, order values as a float64 array.
+    The flow vocabulary is a FlowIndex, so every distinct flow id is parsed once on load.
+    Iterating the table yields Transaction objects one at a time.
+    """
+
+    def __init__(self,
+                 flows: StringCodes | None = None,
+                 product_names: StringCodes | None = None,
+                 product_categories: StringCodes | None = None):
+        self.flows = flows if flows is not None else FlowIndex()
+        self.product_names = product_names if product_names is not None else StringCodes()
+        self.product_categories = product_categories if product_categories is not None else StringCodes()
+
+        self.supplier_flow_codes = array('i')
+        self.internal_flow_codes = array('i')
+        self.customer_flow_codes = array('i')
+        self.product_name_codes = array('i')
+        self.product_category_codes = array('i')
+        self.order_values = array('d')
+
+    def __len__(self) -> int:
+        return len(self.order_values)
+
+    def __getitem__(self, index: int) -> Transaction:
+        return Transaction(
+            product_name=self.product_names.values[self.product_name_codes[index]],
+            product_category=self.product_categories.values[self.product_category_codes[index]],
+            flow_id_supplier=self.flows.values[self.supplier_flow_codes[index]],
+            flow_id_internal=self.flows.values[self.internal_flow_codes[index]],
+            flow_id_customer=self.flows.values[self.customer_flow_codes[index]],
+            order_value=self.order_values[index],
+        )
+
+    def __iter__(self) -> Iterator[Transaction]:
+        flow_ids = self.flows.values
+        product_names = self.product_names.values
+        product_categories = self.product_categories.values
+        for name, category, supplier, internal, customer, value in zip(
+                self.product_name_codes, self.product_category_codes,
+                self.supplier_flow_codes, self.internal_flow_codes, self.customer_flow_codes,
+                self.order_values):
+            yield Transaction(
+                product_name=product_names[name],
+                product_category=product_categories[category],
+                flow_id_supplier=flow_ids[supplier],
+                flow_id_internal=flow_ids[internal],
+                flow_id_customer=flow_ids[customer],
+                order_value=value,
+            )
+
+    def append(self,
+               product_name: str,
+               product_category: str,
+               flow_id_supplier: str,
+               flow_id_internal: str,
+               flow_id_customer: str,
+               order_value: float) -> None:
+        """Appends a single transaction, coding its strings on the fly"""
+        self.product_name_codes.append(self.product_names.code(product_name))
+        self.product_category_codes.append(self.product_categories.code(product_category))
+        self.supplier_flow_codes.append(self.flows.code(flow_id_supplier))
+        self.internal_flow_codes.append(self.flows.code(flow_id_internal))
+        self.customer_flow_codes.append(self.flows.code(flow_id_customer))
+        self.order_values.append(order_value)
+
+    def extend(self, transactions: Iterable[Transaction]) -> None:
+        for t in transactions:
+            self.append(*t)
+
+    def take(self, indices: Iterable[int]) -> 'TransactionTable':
+        """Returns a new table with the selected rows, sharing this table's vocabularies"""
+        table = TransactionTable(self.flows, self.product_names, self.product_categories)
+        for i in indices:
+            table.product_name_codes.append(self.product_name_codes[i])
+            table.product_category_codes.append(self.product_category_codes[i])
+            table.supplier_flow_codes.append(self.supplier_flow_codes[i])
+            table.internal_flow_codes.append(self.internal_flow_codes[i])
+            table.customer_flow_codes.append(self.customer_flow_codes[i])
+            table.order_values.append(self.order_values[i])
+        return table
+
+    @staticmethod
+    def from_transactions(transactions: Iterable[Transaction]) -> 'TransactionTable':
+        table = TransactionTable()
+        table.extend(transactions)
+        return table
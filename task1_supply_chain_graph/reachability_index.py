@@ -0,0 +1,104 @@
+"""
+Precomputed reachability from every company to the leaf companies (distribution centers) it feeds.
+"""
+import weakref
+from collections import deque
+import networkx as nx
+
+class LeafReachabilityIndex:
+    """
+    Leaf companies reachable from every node of a directed graph, built once per graph version.
+
+    Strongly connected components are condensed into a DAG, which is walked in reverse topological
+    order: a component reaches the leafs of all its successors plus its own leaf. Reachable leafs
+    are stored as int bitsets (bit i = leafs[i]) per component, so membership and counts are O(1).
+    A representative path to a leaf is rebuilt from the bitsets: every hop goes to a successor in a later
+    component that still reaches the leaf, with a BFS inside the component only for cyclic components.
+    Without cycles a path costs O(path length * out-degree), independent of the size of the graph.
+    """
+
+    def __init__(self, G: nx.DiGraph):
+        self.G = G
+        self.version = G.graph.get('version')
+        self.leafs = [node for node in G.nodes if G.out_degree(node) == 0]
+        self.leaf_codes = {leaf: i for i, leaf in enumerate(self.leafs)}
+
+        condensed = nx.condensation(G)
+        self._components = condensed.graph['mapping']
+        self._bits = [0] * condensed.number_of_nodes()
+        for component in reversed(list(nx.topological_sort(condensed))):
+            bits = 0
+            for successor in condensed.successors(component):
+                bits |= self._bits[successor]
+            for member in condensed.nodes[component]['members']:
+                if member in self.leaf_codes:
+                    bits |= 1 << self.leaf_codes[member]
+            self._bits[component] = bits
+
+    def related_leaf_bits(self, company_id: str) -> int:
+        """Bitset of leafs reachable from the company, without the company itself"""
+        bits = self._bits[self._components[company_id]]
+        own_code = self.leaf_codes.get(company_id)
+        if own_code is not None:
+            bits &= ~(1 << own_code)
+        return bits
+
+    def count(self, company_id: str) -> int:
+        return self.related_leaf_bits(company_id).bit_count()
+
+    def is_related(self, company_id: str, leaf_id: str) -> bool:
+        code = self.leaf_codes.get(leaf_id)
+        return code is not None and bool(self.related_leaf_bits(company_id) >> code & 1)
+
+    def related_leafs(self, company_id: str) -> list[str]:
+        bits = self.related_leaf_bits(company_id)
+        leafs = []
+        while bits:
+            lowest = bits & -bits
+            leafs.append(self.leafs[lowest.bit_length() - 1])
+            bits ^= lowest
+        return leafs
+
+    def path(self, company_id: str, leaf_id: str) -> list[str]:
+        """Representative path from the company to a related leaf"""
+        if not self.is_related(company_id, leaf_id):
+            raise KeyError(f"Leaf {leaf_id} is not reachable from {company_id}")
+        code = self.leaf_codes[leaf_id]
+        path = [company_id]
+        while path[-1] != leaf_id:
+            path += self._hops_towards(path[-1], code)
+        return path
+
+    def related_leafs_with_path(self, company_id: str) -> dict[str, list[str]]:
+        """Same shape as task2.find_related_leafs: leaf id -> path from the company"""
+        return {leaf_id: self.path(company_id, leaf_id) for leaf_id in self.related_leafs(company_id)}
+
+    def _hops_towards(self, node: str, code: int) -> list[str]:
+        """Nodes after node on a path to the leaf code, up to the first one in a later component that reaches it"""
+        component = self._components[node]
+        parents = {node: None}
+        queue = deque([node])
+        while queue:
+            current = queue.popleft()
+            for successor in self.G.successors(current):
+                successor_component = self._components[successor]
+                if successor_component != component:
+                    if self._bits[successor_component] >> code & 1:
+                        hops = [successor]
+                        while parents[current] is not None:
+                            hops.append(current)
+                            current = parents[current]
+                        return hops[::-1]
+                elif successor not in parents:
+                    parents[successor] = current
+                    queue.append(successor)
+        raise KeyError(f"Leaf code {code} is not reachable from {node}")
+
+# index per graph object, rebuilt when the graph version changes
+_indexes = weakref.WeakKeyDictionary()
+
+def get_reachability_index(G: nx.DiGraph) -> LeafReachabilityIndex:
+    index = _indexes.get(G)
+    if index is None or index.version != G.graph.get('version'):
+        index = _indexes[G] = LeafReachabilityIndex(G)
+    return index
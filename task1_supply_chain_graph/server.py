@@ -0,0 +1,214 @@
+"""
+Local HTTP query server over one in-memory graph and its statistics, on asyncio streams.
+
+  GET /shortest_path?source=..&target=..[&algorithm=csr_dijkstra]
+  GET /related_leafs?company=..[&paths=true]
+  GET /company_statistics?company=..[&category=..]
+  GET /flow_statistics?flow=..[&category=..]
+  GET /figure          Plotly figure JSON of the graph
+  GET /health          graph size and version
+  GET /metrics         query latencies in the Prometheus text format
+
+Queries and the figure are built on a process pool with the graph loaded once per worker (a single thread
+for workers=1), so the event loop only parses requests and writes responses.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import parse_qsl, urlsplit
+import networkx as nx
+from .models import GlobalTransactionStatistics
+from .batch_queries import QUERY_TYPES, QueryError, answer_worker_query, init_query_worker, warm_indexes, worker_figure_json
+from .instrumentation import Instrumentation
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+KEEP_ALIVE_SECONDS = 15
+# request bodies are not used, larger ones are rejected instead of being read
+MAX_BODY_BYTES = 64 * 1024
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+class QueryServer:
+    """
+    Answers HTTP/1.1 GET requests with JSON, keeping connections alive between requests.
+    Query endpoints accept the parameters of the batch queries as URL query parameters.
+    """
+
+    def __init__(self, graph: nx.DiGraph, statistics: GlobalTransactionStatistics,
+                 workers: int | None = None, instrumentation: Instrumentation | None = None):
+        self.graph = graph
+        self.statistics = statistics
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
+        if workers is None:
+            workers = os.cpu_count() or 1
+        warm_indexes(graph)
+        if workers > 1:
+            self.executor: Executor = ProcessPoolExecutor(max_workers=workers, initializer=init_query_worker,
+                                                          initargs=(graph, statistics))
+            # workers are forked now, before the event loop and its threads exist
+            self.executor.submit(os.getpid).result()
+        else:
+            init_query_worker(graph, statistics)
+            self.executor = ThreadPoolExecutor(max_workers=1)
+        # figure JSON of the graph version it was built for, built once by a worker
+        self._figure = None
+        self._figure_lock = asyncio.Lock()
+        # open connections, closed on shutdown instead of being cancelled mid-request
+        self._connections: set[asyncio.Task] = set()
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> asyncio.Server:
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self) -> None:
+        self.executor.shutdown(cancel_futures=True)
+
+    async def close_connections(self) -> None:
+        """Cancels the open connections and waits until their sockets are closed"""
+        for task in self._connections:
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._connections.add(task)
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_SECONDS)
+                    if not request_line:
+                        break
+                    headers = await _read_headers(reader)
+                    length = _content_length(headers)
+                    if length:
+                        await reader.readexactly(length)
+                except asyncio.TimeoutError:
+                    break
+                except (ValueError, asyncio.LimitOverrunError) as error:
+                    # a line over the reader limit or a bad Content-Length, the rest of the stream cannot be parsed
+                    await _write_response(writer, *_json_response(400, {'error': f'Malformed request: {error}'}), keep_alive=False)
+                    break
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    status, content_type, body = _json_response(400, {'error': 'Malformed request line'})
+                else:
+                    status, content_type, body = await self.respond(parts[0], parts[1])
+                keep_alive = parts[-1:] == ['HTTP/1.1'] and headers.get('connection', '').lower() != 'close'
+                await _write_response(writer, status, content_type, body, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            pass  # server is shutting down, the connection is closed quietly
+        finally:
+            self._connections.discard(task)
+            writer.close()
+
+    async def respond(self, method: str, target: str) -> tuple[int, str, bytes]:
+        """Status, content type and body of a request"""
+        if method != 'GET':
+            return _json_response(405, {'error': f'Method {method} not allowed, use GET'})
+        url = urlsplit(target)
+        endpoint = url.path.strip('/')
+        if endpoint == 'health':
+            return _json_response(200, {'status': 'ok', 'companies': self.graph.number_of_nodes(),
+                                        'connections': self.graph.number_of_edges(), 'version': self.graph.graph.get('version')})
+        if endpoint == 'metrics':
+            return 200, 'text/plain; version=0.0.4', self.instrumentation.to_prometheus().encode()
+        if endpoint == 'figure':
+            with self.instrumentation.query('figure'):
+                return 200, 'application/json', await self.figure_json()
+        if endpoint not in QUERY_TYPES:
+            return _json_response(404, {'error': f'Unknown endpoint /{endpoint}'})
+
+        query = {**dict(parse_qsl(url.query)), 'type': endpoint}
+        loop = asyncio.get_running_loop()
+        with self.instrumentation.query(endpoint):
+            try:
+                result = await loop.run_in_executor(self.executor, answer_worker_query, query)
+            except QueryError as error:
+                return _json_response(400, {'error': str(error)})
+            except Exception as error:
+                return _json_response(500, {'error': f'{type(error).__name__}: {error}'})
+        return _json_response(200, result)
+
+    async def figure_json(self) -> bytes:
+        version = self.graph.graph.get('version')
+        async with self._figure_lock:
+            if self._figure is None or self._figure[0] != version:
+                loop = asyncio.get_running_loop()
+                figure = await loop.run_in_executor(self.executor, worker_figure_json)
+                self._figure = (version, figure)
+        return self._figure[1]
+
+async def _read_headers(reader: asyncio.StreamReader) -> dict[str, str]:
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            return headers
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+
+def _content_length(headers: dict[str, str]) -> int:
+    length = int(headers.get('content-length') or 0)
+    if not 0 <= length <= MAX_BODY_BYTES:
+        raise ValueError(f"Content-Length {length} is outside 0..{MAX_BODY_BYTES}")
+    return length
+
+async def _write_response(writer: asyncio.StreamWriter, status: int, content_type: str, body: bytes, keep_alive: bool):
+    writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: {content_type}\r\n"
+                 f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+                 .encode('latin-1') + body)
+    await writer.drain()
+
+def _json_response(status: int, payload: dict) -> tuple[int, str, bytes]:
+    return status, 'application/json', json.dumps(payload).encode()
+
+async def serve(server: QueryServer, host: str, port: int):
+    listener = await server.start(host, port)
+    address = listener.sockets[0].getsockname()
+    print(f"Serving {server.graph.number_of_nodes()} companies on http://{address[0]}:{address[1]}/ (Ctrl+C to stop)", flush=True)
+    loop = asyncio.get_running_loop()
+    try:
+        # a terminated server stops like on Ctrl+C
+        loop.add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:  # no loop signal handlers on Windows
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+    async with listener:
+        try:
+            await listener.serve_forever()
+        except asyncio.CancelledError:
+            pass  # Ctrl+C or SIGTERM
+        finally:
+            listener.close()
+            await server.close_connections()
+
+def main(argv: list[str] | None = None):
+    from .main import DATA_DIR, load_graph
+
+    parser = argparse.ArgumentParser(prog="python -m task1_supply_chain_graph.server", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on, 0 picks a free one")
+    parser.add_argument("--workers", type=int, default=None, help="query worker processes, defaults to CPU count")
+    parser.add_argument("--data-dir", type=Path, default=DATA_DIR, help="directory with companies, connections and transactions CSV files")
+    parser.add_argument("--no-cache", action="store_true", help="rebuild graph from CSV files, ignoring and not writing the snapshot cache")
+    args = parser.parse_args(argv)
+
+    instrumentation = Instrumentation()
+    graph, statistics = load_graph(args.data_dir, use_cache=not args.no_cache, instrumentation=instrumentation)
+    server = QueryServer(graph, statistics, args.workers, instrumentation)
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        print("Server stopped.")
+
+if __name__ == "__main__":
+    main()
@@ -1,54 +1,137 @@
-from .models import Transaction, TransactionStatistics, GlobalTransactionStatistics, CompanyTransactionStatistics
+from typing import Iterable
+from .models import Transaction, TransactionTable, FlowIndex, TransactionStatistics, GlobalTransactionStatistics, CompanyTransactionStatistics, ValueSketch, parse_flow_id
 
-def calculate_statistics(transactions: list[Transaction]) -> GlobalTransactionStatistics:
-    """Calculates transaction statistics from a list of transactions"""
-    results = GlobalTransactionStatistics()
+def calculate_statistics(transactions: Iterable[Transaction],
+                         flow_index: FlowIndex | None = None,
+                         sketches: bool = False) -> GlobalTransactionStatistics:
+    """
+    Calculates transaction statistics from a list of transactions or a TransactionTable, in a single pass.
+    With sketches, every statistics also gets a ValueSketch of order value quantiles and distinct products.
+    """
+    results = GlobalTransactionStatistics(global_statistics=new_statistics(sketches))
 
+    if isinstance(transactions, TransactionTable) and isinstance(transactions.flows, FlowIndex):
+        # The table already holds flow codes, so the loop works on integers and interned ids only
+        index = transactions.flows
+        flow_ids = index.values
+        company_ids = index.company_id_pairs()
+        product_names = transactions.product_names.values
+        for supplier, internal, customer, value, product in zip(transactions.supplier_flow_codes,
+                                                                transactions.internal_flow_codes,
+                                                                transactions.customer_flow_codes,
+                                                                transactions.order_values,
+                                                                transactions.product_name_codes):
+            flow_codes = (supplier, internal, customer)
+            transaction_company_ids = [company_ids[code] for code in flow_codes]
+            if None in transaction_company_ids:
+                for code in flow_codes:
+                    index.company_ids(code)  # raises ValueError for the invalid flow id
+            add_flows(results, [flow_ids[code] for code in flow_codes], transaction_company_ids, value, product_names[product])
+        return results
+
+    if flow_index is None:
+        flow_index = FlowIndex()
     for t in transactions:
-        value = t.order_value
-        flow_id_supplier = t.flow_id_supplier
-        flow_id_internal = t.flow_id_internal
-        flow_id_customer = t.flow_id_customer
-        flow_ids = [flow_id_supplier, flow_id_internal, flow_id_customer]
-
-        company_ids = [flow_id_to_company_ids(flow_id) for flow_id in flow_ids]
-        exporting_companies = [id['sender'] for id in company_ids]
-        importing_companies = [id['receiver'] for id in company_ids]
-
-        # Update global statistics
-        update_statistics(results['global_statistics'], value)
-
-        # Update per-flow statistics
-        for flow_id in flow_ids:
-            if flow_id not in results['statistics_per_flow']:
-                results['statistics_per_flow'][flow_id] = TransactionStatistics()
-            update_statistics(results['statistics_per_flow'][flow_id], value)
-
-        # Update per-company statistics
-        for company_id in exporting_companies + importing_companies:
-            if company_id not in results['statistics_per_company']:
-                results['statistics_per_company'][company_id] = CompanyTransactionStatistics()
-        for company_id in exporting_companies:
-            update_statistics(results['statistics_per_company'][company_id]['exported'], value)
-        for company_id in importing_companies:
-            update_statistics(results['statistics_per_company'][company_id]['imported'], value)
+        add_transaction(results, t, flow_index)
 
     return results
 
-def flow_id_to_company_ids(flow_id: str) -> dict[str, str]:
-    """Extracts company ID from flow ID by removing the last 4 characters"""
-    company_ids = flow_id.split('_')
-    if len(company_ids) < 2:
-        raise ValueError(f'Invalid flow_id format: {flow_id}: should contain _ separator')
-    
-    company_ids = [cid.strip('0').upper() for cid in company_ids]
+def add_transaction(results: GlobalTransactionStatistics, t: Transaction, flow_index: FlowIndex | None = None) -> None:
+    """Accounts a single transaction in global, per-flow and per-company statistics in-place"""
+    flow_ids = [t.flow_id_supplier, t.flow_id_internal, t.flow_id_customer]
+    if flow_index is None:
+        company_ids = [parse_flow_id(flow_id) for flow_id in flow_ids]
+    else:
+        company_ids = [flow_index.lookup(flow_id) for flow_id in flow_ids]
+    add_flows(results, flow_ids, company_ids, t.order_value, t.product_name)
+
+def add_flows(results: GlobalTransactionStatistics,
+              flow_ids: list[str],
+              company_ids: list[tuple[str, str]],
+              value: float,
+              product: str | None = None) -> None:
+    """
+    Accounts the value of a transaction passing the given flows, with their (sender, receiver) company ids.
+    New flows and companies get sketches when the global statistics have one.
+    """
+    with_sketches = results.global_statistics.sketch is not None
+
+    # Update global statistics
+    update_statistics(results.global_statistics, value, product)
+
+    # Update per-flow statistics
+    statistics_per_flow = results.statistics_per_flow
+    for flow_id in flow_ids:
+        stats = statistics_per_flow.get(flow_id)
+        if stats is None:
+            stats = statistics_per_flow[flow_id] = new_statistics(with_sketches)
+        update_statistics(stats, value, product)
+
+    # Update per-company statistics
+    statistics_per_company = results.statistics_per_company
+    for company_id, _ in company_ids:
+        company_stats = statistics_per_company.get(company_id)
+        if company_stats is None:
+            company_stats = statistics_per_company[company_id] = new_company_statistics(with_sketches)
+        update_statistics(company_stats.exported, value, product)
+    for _, company_id in company_ids:
+        company_stats = statistics_per_company.get(company_id)
+        if company_stats is None:
+            company_stats = statistics_per_company[company_id] = new_company_statistics(with_sketches)
+        update_statistics(company_stats.imported, value, product)
 
-    return { 'sender': company_ids[0], 'receiver': company_ids[1] }
+def new_statistics(with_sketch: bool = False) -> TransactionStatistics:
+    return TransactionStatistics(sketch=ValueSketch() if with_sketch else None)
+
+def new_company_statistics(with_sketches: bool = False) -> CompanyTransactionStatistics:
+    return CompanyTransactionStatistics(exported=new_statistics(with_sketches), imported=new_statistics(with_sketches))
+
+def merge_statistics(results: GlobalTransactionStatistics, partial: GlobalTransactionStatistics) -> GlobalTransactionStatistics:
+    """
+    Merges statistics of a later part of the transactions into results in-place.
+    Merging partials in transaction order keeps flows and companies in order of first appearance.
+    """
+    merge_transaction_statistics(results.global_statistics, partial.global_statistics)
+    for flow_id, stats in partial.statistics_per_flow.items():
+        if flow_id not in results.statistics_per_flow:
+            results.statistics_per_flow[flow_id] = TransactionStatistics()
+        merge_transaction_statistics(results.statistics_per_flow[flow_id], stats)
+    for company_id, company_stats in partial.statistics_per_company.items():
+        if company_id not in results.statistics_per_company:
+            results.statistics_per_company[company_id] = CompanyTransactionStatistics()
+        merge_transaction_statistics(results.statistics_per_company[company_id].exported, company_stats.exported)
+        merge_transaction_statistics(results.statistics_per_company[company_id].imported, company_stats.imported)
+    return results
+
+def merge_transaction_statistics(stats: TransactionStatistics, other: TransactionStatistics) -> None:
+    """Adds counts and sums and combines min/max of other into stats in-place"""
+    if other.quantity == 0:
+        return
+    stats.quantity += other.quantity
+    stats.total_value += other.total_value
+    if other.max_value > stats.max_value:
+        stats.max_value = other.max_value
+    if other.min_value < stats.min_value:
+        stats.min_value = other.min_value
+    stats.average_value = stats.total_value / stats.quantity
+    if other.sketch is not None:
+        if stats.sketch is None:
+            stats.sketch = ValueSketch()
+        stats.sketch.merge(other.sketch)
+
+def flow_id_to_company_ids(flow_id: str) -> dict[str, str]:
+    """Extracts sender and receiver company ids from a flow id"""
+    sender, receiver = parse_flow_id(flow_id)
+    return { 'sender': sender, 'receiver': receiver }
 
-def update_statistics(stats: TransactionStatistics, value: float) -> None:
+def update_statistics(stats: TransactionStatistics, value: float, product: str | None = None) -> None:
     """Updates average statistics in-place"""
-    stats['quantity'] += 1
-    stats['total_value'] += value
-    stats['max_value'] = max(stats['max_value'], value)
-    stats['min_value'] = min(stats['min_value'], value)
-    stats['average_value'] = stats['total_value'] / stats['quantity'] if stats['quantity'] > 0 else 0.0
\ No newline at end of file
+    stats.quantity += 1
+    stats.total_value += value
+    if value > stats.max_value:
+        stats.max_value = value
+    if value < stats.min_value:
+        stats.min_value = value
+    stats.average_value = stats.total_value / stats.quantity
+    if stats.sketch is not None:
+        stats.sketch.add(value, product)
@@ -0,0 +1,202 @@
+"""
+Pre-aggregated statistics cube: transaction statistics per (flow, product category)
+and per (company, product category), for category slicing without rescanning transactions.
+"""
+from typing import Iterable
+import numpy as np
+from .models import (Transaction, TransactionTable, FlowIndex, StringCodes,
+                     TransactionStatistics, CompanyTransactionStatistics)
+
+class CubeCells:
+    """Quantity, total, max and min value of every (row, category) cell, as dense 2D arrays"""
+
+    def __init__(self, rows: int = 0, columns: int = 0):
+        self.quantity = np.zeros((rows, columns), dtype=np.int64)
+        self.total_value = np.zeros((rows, columns))
+        self.max_value = np.zeros((rows, columns))
+        self.min_value = np.full((rows, columns), np.inf)
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.quantity.shape
+
+    @staticmethod
+    def aggregate(rows: np.ndarray, columns: np.ndarray, values: np.ndarray, shape: tuple[int, int]) -> 'CubeCells':
+        """Cells of values grouped by (row, column) pairs"""
+        cells = CubeCells()
+        index = rows * shape[1] + columns
+        size = shape[0] * shape[1]
+        cells.quantity = np.bincount(index, minlength=size).reshape(shape)
+        cells.total_value = np.bincount(index, weights=values, minlength=size).reshape(shape)
+        cells.max_value = np.zeros(size)
+        np.maximum.at(cells.max_value, index, values)
+        cells.max_value = cells.max_value.reshape(shape)
+        cells.min_value = np.full(size, np.inf)
+        np.minimum.at(cells.min_value, index, values)
+        cells.min_value = cells.min_value.reshape(shape)
+        return cells
+
+    def resize(self, rows: int, columns: int) -> None:
+        """Grows the cells to the given shape, new cells are empty"""
+        pad = ((0, rows - self.shape[0]), (0, columns - self.shape[1]))
+        if pad == ((0, 0), (0, 0)):
+            return
+        self.quantity = np.pad(self.quantity, pad)
+        self.total_value = np.pad(self.total_value, pad)
+        self.max_value = np.pad(self.max_value, pad)
+        self.min_value = np.pad(self.min_value, pad, constant_values=np.inf)
+
+    def merge(self, other: 'CubeCells', row_map: np.ndarray, column_map: np.ndarray) -> None:
+        """Adds other's cells in-place, other's row i and column j go to row_map[i], column_map[j]"""
+        index = np.ix_(row_map, column_map)
+        self.quantity[index] += other.quantity
+        self.total_value[index] += other.total_value
+        self.max_value[index] = np.maximum(self.max_value[index], other.max_value)
+        self.min_value[index] = np.minimum(self.min_value[index], other.min_value)
+
+    def cell(self, row: int, column: int) -> TransactionStatistics:
+        return _statistics(self.quantity[row, column], self.total_value[row, column],
+                           self.max_value[row, column], self.min_value[row, column])
+
+    def rollup(self, row: int) -> TransactionStatistics:
+        """Statistics of a row over all categories"""
+        return _statistics(self.quantity[row].sum(), self.total_value[row].sum(),
+                           self.max_value[row].max(initial=0.0), self.min_value[row].min(initial=np.inf))
+
+class StatisticsCube:
+    """
+    Transaction statistics per (flow, category), (exporting company, category),
+    (importing company, category) and per category.
+
+    Drill-down queries read a single cell, roll-ups over categories combine a row of cells
+    (sum of counts and totals, max of max, min of min). Roll-ups equal calculate_statistics results,
+    totals up to summation order. Cubes of separate batches of transactions can be merged.
+    """
+
+    def __init__(self):
+        self.flows = StringCodes()
+        self.companies = StringCodes()
+        self.categories = StringCodes()
+        self.global_cells = CubeCells(1, 0)
+        self.flow_cells = CubeCells()
+        self.exported_cells = CubeCells()
+        self.imported_cells = CubeCells()
+
+    @staticmethod
+    def from_table(table: TransactionTable) -> 'StatisticsCube':
+        """Builds the cube with NumPy grouping over the table's integer codes"""
+        cube = StatisticsCube()
+        for value in table.flows.values:
+            cube.flows.code(value)
+        for value in table.product_categories.values:
+            cube.categories.code(value)
+        index = table.flows if isinstance(table.flows, FlowIndex) else FlowIndex.from_flow_ids(table.flows.values)
+        for value in index.companies.values:
+            cube.companies.code(value)
+        n_flows, n_companies, n_categories = len(cube.flows), len(cube.companies), len(cube.categories)
+        if len(table) == 0:
+            cube.global_cells.resize(1, n_categories)
+            cube.flow_cells.resize(n_flows, n_categories)
+            cube.exported_cells.resize(n_companies, n_categories)
+            cube.imported_cells.resize(n_companies, n_categories)
+            return cube
+
+        values = np.frombuffer(table.order_values, dtype=np.float64)
+        categories = np.frombuffer(table.product_category_codes, dtype=np.intc)
+        legs = np.stack([
+            np.frombuffer(table.supplier_flow_codes, dtype=np.intc),
+            np.frombuffer(table.internal_flow_codes, dtype=np.intc),
+            np.frombuffer(table.customer_flow_codes, dtype=np.intc),
+        ], axis=1)
+        senders = np.frombuffer(index.senders, dtype=np.intc)[legs]
+        receivers = np.frombuffer(index.receivers, dtype=np.intc)[legs]
+        if (senders < 0).any():
+            index.company_codes(int(legs[senders < 0][0]))  # raises ValueError for the invalid flow id
+
+        leg_categories = np.repeat(categories, 3)
+        leg_values = np.repeat(values, 3)
+        cube.global_cells = CubeCells.aggregate(np.zeros(len(values), dtype=np.intp), categories, values, (1, n_categories))
+        cube.flow_cells = CubeCells.aggregate(legs.ravel(), leg_categories, leg_values, (n_flows, n_categories))
+        cube.exported_cells = CubeCells.aggregate(senders.ravel(), leg_categories, leg_values, (n_companies, n_categories))
+        cube.imported_cells = CubeCells.aggregate(receivers.ravel(), leg_categories, leg_values, (n_companies, n_categories))
+        return cube
+
+    def add(self, transactions: Iterable[Transaction]) -> None:
+        """Accounts a batch of new transactions in-place"""
+        table = transactions if isinstance(transactions, TransactionTable) else TransactionTable.from_transactions(transactions)
+        self.merge(StatisticsCube.from_table(table))
+
+    def merge(self, other: 'StatisticsCube') -> 'StatisticsCube':
+        """Adds the cells of another cube in-place, mapping its flows, companies and categories to this cube's"""
+        flow_map = _code_map(self.flows, other.flows)
+        company_map = _code_map(self.companies, other.companies)
+        category_map = _code_map(self.categories, other.categories)
+        n_categories = len(self.categories)
+        self.global_cells.resize(1, n_categories)
+        self.flow_cells.resize(len(self.flows), n_categories)
+        self.exported_cells.resize(len(self.companies), n_categories)
+        self.imported_cells.resize(len(self.companies), n_categories)
+
+        self.global_cells.merge(other.global_cells, np.zeros(1, dtype=np.intp), category_map)
+        self.flow_cells.merge(other.flow_cells, flow_map, category_map)
+        self.exported_cells.merge(other.exported_cells, company_map, category_map)
+        self.imported_cells.merge(other.imported_cells, company_map, category_map)
+        return self
+
+    def total(self, category: str | None = None) -> TransactionStatistics:
+        """Statistics of all transactions, or of the transactions of a category"""
+        if category is None:
+            return self.global_cells.rollup(0)
+        column = self.categories.get(category)
+        return self.global_cells.cell(0, column) if column is not None else TransactionStatistics()
+
+    def flow(self, flow_id: str, category: str | None = None) -> TransactionStatistics:
+        return self._query(self.flow_cells, self.flows.get(flow_id), category)
+
+    def company(self, company_id: str, category: str | None = None) -> CompanyTransactionStatistics:
+        row = self.companies.get(company_id)
+        return CompanyTransactionStatistics(exported=self._query(self.exported_cells, row, category),
+                                            imported=self._query(self.imported_cells, row, category))
+
+    def total_by_category(self) -> dict[str, TransactionStatistics]:
+        return {category: self.global_cells.cell(0, column)
+                for column, category in enumerate(self.categories.values) if self.global_cells.quantity[0, column]}
+
+    def flow_by_category(self, flow_id: str) -> dict[str, TransactionStatistics]:
+        """Drill-down of a flow into the categories it carries"""
+        row = self.flows.get(flow_id)
+        if row is None:
+            return {}
+        return {category: self.flow_cells.cell(row, column)
+                for column, category in enumerate(self.categories.values) if self.flow_cells.quantity[row, column]}
+
+    def company_by_category(self, company_id: str) -> dict[str, CompanyTransactionStatistics]:
+        """Drill-down of a company into the categories it exports or imports"""
+        row = self.companies.get(company_id)
+        if row is None:
+            return {}
+        return {category: self.company(company_id, category)
+                for column, category in enumerate(self.categories.values)
+                if self.exported_cells.quantity[row, column] or self.imported_cells.quantity[row, column]}
+
+    def _query(self, cells: CubeCells, row: int | None, category: str | None) -> TransactionStatistics:
+        if row is None:
+            return TransactionStatistics()
+        if category is None:
+            return cells.rollup(row)
+        column = self.categories.get(category)
+        return cells.cell(row, column) if column is not None else TransactionStatistics()
+
+def _code_map(codes: StringCodes, other: StringCodes) -> np.ndarray:
+    """Codes in codes of every value of other, adding new values"""
+    return np.array([codes.code(value) for value in other.values], dtype=np.intp)
+
+def _statistics(quantity, total_value, max_value, min_value) -> TransactionStatistics:
+    quantity = int(quantity)
+    return TransactionStatistics(
+        quantity=quantity,
+        total_value=float(total_value),
+        average_value=float(total_value) / quantity if quantity > 0 else 0.0,
+        max_value=float(max_value),
+        min_value=float(min_value),
+    )
@@ -0,0 +1,99 @@
+import numpy as np
+from typing import Iterable
+from .models import Transaction, TransactionTable, FlowIndex, TransactionStatistics, GlobalTransactionStatistics, CompanyTransactionStatistics, ValueSketch
+
+def calculate_statistics_numpy(transactions: Iterable[Transaction], sketches: bool = False) -> GlobalTransactionStatistics:
+    """
+    Calculates the same statistics as calculate_statistics, grouping with NumPy instead of a Python loop.
+
+    Flow codes are factorized once, sender and receiver company codes are taken from the table's FlowIndex,
+    then all aggregates are computed per group with bincount / minimum.at / maximum.at.
+    Sums are accumulated in row order, so results are identical to the Python engine.
+    With sketches, ValueSketches are built per group from values sorted within groups.
+    """
+    table = transactions if isinstance(transactions, TransactionTable) else TransactionTable.from_transactions(transactions)
+    results = GlobalTransactionStatistics()
+    if sketches:
+        results.global_statistics.sketch = ValueSketch()
+    if len(table) == 0:
+        return results
+
+    values = np.frombuffer(table.order_values, dtype=np.float64)
+    legs = np.stack([
+        np.frombuffer(table.supplier_flow_codes, dtype=np.intc),
+        np.frombuffer(table.internal_flow_codes, dtype=np.intc),
+        np.frombuffer(table.customer_flow_codes, dtype=np.intc),
+    ], axis=1)
+    leg_values = np.repeat(values, 3)
+    products = np.frombuffer(table.product_name_codes, dtype=np.intc)
+    leg_products = np.repeat(products, 3)
+
+    def attach_sketches(stats: list[TransactionStatistics], groups: np.ndarray, group_values: np.ndarray, group_products: np.ndarray):
+        if sketches:
+            for group_stats, sketch in zip(stats, ValueSketch.from_groups(groups, group_values, group_products,
+                                                                          table.product_names.values, len(stats))):
+                group_stats.sketch = sketch
+        return stats
+
+    # Global statistics
+    global_groups = np.zeros(len(values), dtype=np.intp)
+    results.global_statistics = attach_sketches(_group_statistics(global_groups, values, 1), global_groups, values, products)[0]
+
+    # Per-flow statistics, flows ordered by first appearance like in the Python engine
+    flow_groups, flow_codes = _factorize(legs.ravel(), len(table.flows))
+    flow_ids = [table.flows.values[code] for code in flow_codes.tolist()]
+    flow_statistics = attach_sketches(_group_statistics(flow_groups, leg_values, len(flow_ids)), flow_groups, leg_values, leg_products)
+    for flow_id, stats in zip(flow_ids, flow_statistics):
+        results.statistics_per_flow[flow_id] = stats
+
+    # Per-company statistics, company codes come from the flow index, so no flow id is parsed here
+    index = table.flows if isinstance(table.flows, FlowIndex) else FlowIndex.from_flow_ids(table.flows.values)
+    senders = np.frombuffer(index.senders, dtype=np.intc)[flow_codes]
+    receivers = np.frombuffer(index.receivers, dtype=np.intc)[flow_codes]
+    if (senders < 0).any():
+        index.company_codes(int(flow_codes[np.argmax(senders < 0)]))  # raises ValueError for the invalid flow id
+    company_ids = index.companies.values
+    flow_groups = flow_groups.reshape(legs.shape)
+    # exporting companies of a row come before importing ones, as in the Python engine
+    company_groups, company_order = _factorize(np.concatenate([senders[flow_groups], receivers[flow_groups]], axis=1).ravel(), len(company_ids))
+    company_groups = company_groups.reshape(len(values), 6)
+
+    n_companies = len(company_order)
+    exported_groups = company_groups[:, :3].ravel()
+    imported_groups = company_groups[:, 3:].ravel()
+    exported = attach_sketches(_group_statistics(exported_groups, leg_values, n_companies), exported_groups, leg_values, leg_products)
+    imported = attach_sketches(_group_statistics(imported_groups, leg_values, n_companies), imported_groups, leg_values, leg_products)
+    for code, exported_stats, imported_stats in zip(company_order.tolist(), exported, imported):
+        results.statistics_per_company[company_ids[code]] = CompanyTransactionStatistics(exported=exported_stats, imported=imported_stats)
+
+    return results
+
+def _factorize(codes: np.ndarray, n_codes: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Maps integer codes in range [0, n_codes) to dense group ids numbered by first appearance.
+    Returns the group id of every element and the original code of every group.
+    """
+    first_seen = np.full(n_codes, len(codes), dtype=np.intp)
+    np.minimum.at(first_seen, codes, np.arange(len(codes)))
+    present = np.flatnonzero(first_seen < len(codes))
+    group_codes = present[np.argsort(first_seen[present], kind='stable')]
+    group_of_code = np.empty(n_codes, dtype=np.intp)
+    group_of_code[group_codes] = np.arange(len(group_codes))
+    return group_of_code[codes], group_codes
+
+def _group_statistics(groups: np.ndarray, values: np.ndarray, n_groups: int) -> list[TransactionStatistics]:
+    """Aggregates values per group id into TransactionStatistics, groups without values keep defaults"""
+    quantity = np.bincount(groups, minlength=n_groups)
+    total_value = np.bincount(groups, weights=values, minlength=n_groups)
+    max_value = np.zeros(n_groups)
+    np.maximum.at(max_value, groups, values)
+    min_value = np.full(n_groups, np.inf)
+    np.minimum.at(min_value, groups, values)
+
+    return [TransactionStatistics(
+        quantity=q,
+        total_value=total,
+        average_value=total / q if q > 0 else 0.0,
+        max_value=max_v,
+        min_value=min_v,
+    ) for q, total, max_v, min_v in zip(quantity.tolist(), total_value.tolist(), max_value.tolist(), min_value.tolist())]
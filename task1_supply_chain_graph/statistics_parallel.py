@@ -0,0 +1,61 @@
+import os
+from typing import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from .csv_utils import split_csv_byte_ranges, iter_rows_in_byte_range
+from .models import TransactionTable, GlobalTransactionStatistics
+from .statistics import merge_statistics
+from .statistics_numpy import calculate_statistics_numpy
+from .statistics_cube import StatisticsCube
+
+DEFAULT_CHUNK_SIZE = 64 * 1024 * 1024
+
+def calculate_statistics_parallel(csv_path: str,
+                                  workers: int | None = None,
+                                  chunk_size: int = DEFAULT_CHUNK_SIZE,
+                                  cube: StatisticsCube | None = None) -> GlobalTransactionStatistics:
+    """
+    Calculates transaction statistics of a CSV file on a process pool.
+
+    The file is split into byte ranges on line boundaries, at least one per worker and at most
+    chunk_size bytes each. Every range is parsed and aggregated in a worker process, and the
+    partial statistics are merged in file order. Counts, min and max values and the order of
+    flows and companies are identical to the serial engines; totals and averages can differ
+    in the last bits, since the sums are added up in a different order.
+    Value sketches are built per range and merged too.
+    If a cube is given, per-category cubes of the ranges are merged into it as well.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    size = os.path.getsize(csv_path)
+    fieldnames, ranges = split_csv_byte_ranges(csv_path, max(workers, -(-size // chunk_size)))
+
+    results = GlobalTransactionStatistics()
+    arguments = ([csv_path] * len(ranges), [fieldnames] * len(ranges), *zip(*ranges), [cube is not None] * len(ranges))
+    if workers <= 1:
+        _merge_partials(results, cube, map(_range_statistics, *arguments))
+        return results
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        _merge_partials(results, cube, executor.map(_range_statistics, *arguments))
+    return results
+
+def _merge_partials(results: GlobalTransactionStatistics, cube: StatisticsCube | None, partials: Iterable[tuple]) -> None:
+    for partial, partial_cube in partials:
+        merge_statistics(results, partial)
+        if cube is not None:
+            cube.merge(partial_cube)
+
+def _range_statistics(csv_path: str, fieldnames: list[str], start: int, end: int,
+                      with_cube: bool = False) -> tuple[GlobalTransactionStatistics, StatisticsCube | None]:
+    """Parses a byte range of the transactions file and aggregates it, runs in a worker process"""
+    table = TransactionTable()
+    for row in iter_rows_in_byte_range(csv_path, fieldnames, start, end):
+        table.append(
+            product_name=row['product_name'],
+            product_category=row['product_category'],
+            flow_id_supplier=row['flow_id_supplier'],
+            flow_id_internal=row['flow_id_internal'],
+            flow_id_customer=row['flow_id_customer'],
+            order_value=float(row['order_value'])
+        )
+    return calculate_statistics_numpy(table, sketches=True), StatisticsCube.from_table(table) if with_cube else None
@@ -1,10 +1,20 @@
+import time
 from enum import Enum
+from typing import Iterable
 import networkx as nx
+from .models import Transaction
 from .statistics import GlobalTransactionStatistics
-from .draw_with_matplotlib import draw_graph_with_matplotlib
-from .draw_with_plotly import plot_graph_nodes, highlight_path
+from .draw_with_matplotlib import LayoutMethod, draw_graph_with_matplotlib
+from .draw_with_plotly import plot_graph_nodes, highlight_path, clear_highlight
 from .task2 import find_related_leafs_compare
-from .task3 import GraphPathNotFound, dijkstra_shortest_path
+from .task3 import GraphPathNotFound, dijkstra_shortest_path, bidirectional_dijkstra_shortest_path, astar_shortest_path
+from .incremental import GraphUpdate, apply_transactions
+from .path_service import ShortestPathCache, ShortestPathResult, networkx_shortest_path
+from .reachability_index import get_reachability_index
+from .company_search import get_company_search_index
+from .csr_graph import csr_dijkstra_shortest_path
+from .bottlenecks import DEFAULT_EPSILON, get_bottleneck_ranking
+from .instrumentation import Instrumentation
 
 class SupplyChainApp:
     class Tasks(Enum):
@@ -12,6 +22,7 @@ class SupplyChainApp:
         FIND_RELATED_LEAFS = '2'
         SHORTEST_PATH = '3'
         SHOW_STATISTICS = '4'
+        RANK_BOTTLENECKS = '5'
         QUIT = 'q'
 
     class DisplayTools(Enum):
@@ -21,24 +32,38 @@ class SupplyChainApp:
     class ShortestPathAlgorithms(Enum):
         CUSTOM_DIJKSTRA = '1'
         NETWORKX_BUILTIN = '2'
+        BIDIRECTIONAL_DIJKSTRA = '3'
+        ASTAR_GEOGRAPHIC = '4'
+        CSR_DIJKSTRA = '5'
 
     @staticmethod
     def print_info():
         print("Supply Chain Graph Application")
         print("This application allows you to visualize and analyze a supply chain graph.")
         print("You can visualize the graph, find related distribution centers,")
-        print("compute shortest paths between companies, and view transaction statistics.")
+        print("compute shortest paths between companies, view transaction statistics and rank bottleneck companies.")
         print("Graph node and edge sizes are proportional to transaction volumes.")
         print("Enter 'quit', 'exit', or 'q' at any prompt to stop the application.\n")
 
-    def __init__(self, graph: nx.Graph, statistics: GlobalTransactionStatistics):
+    def __init__(self, graph: nx.Graph, statistics: GlobalTransactionStatistics, workers: int | None = None,
+                 instrumentation: Instrumentation | None = None, matplotlib_layout: LayoutMethod = LayoutMethod.SPRING):
         self.graph = graph
         self.statistics = statistics
+        self.workers = workers
+        self.instrumentation = instrumentation if instrumentation is not None else Instrumentation()
         self.display_tool = SupplyChainApp.DisplayTools.PLOTLY.value
+        self.matplotlib_layout = matplotlib_layout
+        self._figure = None
+        self._figure_version = None
+        self.path_cache = ShortestPathCache()
 
     def set_display_tool(self, tool: DisplayTools):
         self.display_tool = tool
 
+    def apply_transactions(self, delta: Iterable[Transaction]) -> GraphUpdate:
+        """Appends new transactions, updating statistics and the affected graph attributes in-place."""
+        return apply_transactions(self.graph, self.statistics, delta)
+
     def run(self):
         while True:
             task = self.get_task_choice()
@@ -54,7 +79,10 @@ class SupplyChainApp:
                 company_id = self.get_valid_company_id("\nEnter company ID or name to start search for related distribution centers (grapth leafs): ")
                 if company_id is None:
                     break
-                find_related_leafs_compare(self.graph, company_id)
+                self.show_related_leafs(company_id)
+                compare = input("\nDo you want to compare with BFS/DFS leaf search? (y/n): ").strip().lower()
+                if compare == 'y':
+                    find_related_leafs_compare(self.graph, company_id)
             elif task == SupplyChainApp.Tasks.SHORTEST_PATH:
                 source = self.get_valid_company_id("\nEnter source company ID or name: ")
                 if source is None:
@@ -70,12 +98,16 @@ class SupplyChainApp:
                 alg_to_use = self.get_valid_algorithm_choice()
                 if alg_to_use is None:
                     break
-                path, total_weight = self.find_shortest_path(source, target, alg_to_use.value)
+                result = self.query_shortest_path(source, target, alg_to_use.value)
+                path, total_weight = result.path, result.total_weight
+                timing = f"{result.elapsed * 1000:.2f} ms"
+                if result.cached:
+                    timing += f", cached, computed in {result.compute_elapsed * 1000:.2f} ms"
                 if not path:
-                    print(f"✗ No path exists between {self.graph.nodes[source]['name']} ({source}) and {self.graph.nodes[target]['name']} ({target}).")
+                    print(f"✗ No path exists between {self.graph.nodes[source]['name']} ({source}) and {self.graph.nodes[target]['name']} ({target}) ({timing}).")
                     continue
 
-                print(f"\n✓ Shortest path found ({len(path)} nodes, weight: {total_weight:.2f}):")
+                print(f"\n✓ Shortest path found ({len(path)} nodes, weight: {total_weight:.2f}, {timing}):")
                 # Show company names in path
                 path_names = [self.graph.nodes[node]['name'] for node in path]
                 print(f"Path: {' → '.join(path_names)}")
@@ -84,6 +116,11 @@ class SupplyChainApp:
 
             elif task == SupplyChainApp.Tasks.SHOW_STATISTICS:
                 self.show_statistics_summary()
+            elif task == SupplyChainApp.Tasks.RANK_BOTTLENECKS:
+                epsilon = self.get_valid_error_bound()
+                if epsilon is None:
+                    break
+                self.show_bottlenecks(epsilon)
 
         confirm_leave = input("Are you sure you want to quit? (y/n): ").strip().lower()
         if confirm_leave == 'y':
@@ -92,51 +129,88 @@ class SupplyChainApp:
             print("Returning to the application.")
             self.run()
 
+    def show_related_leafs(self, company_id: str):
+        """Print leaf companies fed by the company, looked up in the reachability index."""
+        index = get_reachability_index(self.graph)
+        start = time.perf_counter()
+        related_leafs = index.related_leafs(company_id)
+        elapsed = time.perf_counter() - start
+        self.instrumentation.record_query("related_leafs", elapsed)
+        print(f"Index lookup found {len(related_leafs)} leaf companies ({elapsed * 1000:.2f} ms):")
+        for leaf_id in related_leafs:
+            print(f"  Leaf ID: {leaf_id}, Path: {' -> '.join(index.path(company_id, leaf_id))}")
+
     def show_graph(self):
         """Show the graph using the selected display tool."""
         try:
             if self.display_tool == SupplyChainApp.DisplayTools.MATPLOTLIB.value:
-                draw_graph_with_matplotlib(self.graph)
+                draw_graph_with_matplotlib(self.graph, layout=self.matplotlib_layout)
             elif self.display_tool == SupplyChainApp.DisplayTools.PLOTLY.value:
-                fig = plot_graph_nodes(self.graph)
-                fig.show()
+                clear_highlight(self.get_figure()).show()
         except Exception as e:
             print(f"Error displaying graph: {e}, recommending to switch display tool or restart app.")
 
+    def get_figure(self):
+        """Plotly figure of the graph, built once per graph version and reused for highlights."""
+        version = self.graph.graph.get('version')
+        if self._figure is None or self._figure_version != version:
+            self._figure = plot_graph_nodes(self.graph)
+            self._figure_version = version
+        return self._figure
+
     def find_shortest_path(self, source: str, target: str, algorithm: str) -> tuple[list[str], float]:
         """Find the shortest path between source and target using the specified algorithm."""
-        if algorithm == SupplyChainApp.ShortestPathAlgorithms.CUSTOM_DIJKSTRA.value:
+        result = self.query_shortest_path(source, target, algorithm)
+        return result.path, result.total_weight
+
+    def query_shortest_path(self, source: str, target: str, algorithm: str) -> ShortestPathResult:
+        """
+        Find the shortest path with its cost and timing in a single search per algorithm.
+        Results are cached per (source, target, algorithm, graph version); an empty path means no path exists.
+        """
+        algorithms = {
+            SupplyChainApp.ShortestPathAlgorithms.CUSTOM_DIJKSTRA.value: dijkstra_shortest_path,
+            SupplyChainApp.ShortestPathAlgorithms.NETWORKX_BUILTIN.value: networkx_shortest_path,
+            SupplyChainApp.ShortestPathAlgorithms.BIDIRECTIONAL_DIJKSTRA.value: bidirectional_dijkstra_shortest_path,
+            SupplyChainApp.ShortestPathAlgorithms.ASTAR_GEOGRAPHIC.value: astar_shortest_path,
+            SupplyChainApp.ShortestPathAlgorithms.CSR_DIJKSTRA.value: csr_dijkstra_shortest_path,
+        }
+        if algorithm not in algorithms:
+            raise ValueError(f"Invalid algorithm choice: {algorithm}")
+
+        # latency is recorded per query, cache hits included
+        with self.instrumentation.query("shortest_path"):
+            key = (source, target, algorithm, self.graph.graph.get('version'))
+            result = self.path_cache.get(key)
+            if result is not None:
+                return result
+
+            start = time.perf_counter()
             try:
-                path, total_weight = dijkstra_shortest_path(self.graph, source, target)
-                return path, total_weight
+                path, total_weight = algorithms[algorithm](self.graph, source, target)
             except GraphPathNotFound:
-                return [], 0.0
-        elif algorithm == SupplyChainApp.ShortestPathAlgorithms.NETWORKX_BUILTIN.value:
-            try:
-                path = nx.shortest_path(self.graph, source, target, weight="weight")
-                total_weight = nx.shortest_path_length(self.graph, source, target, weight="weight")
-                return path, total_weight
-            except nx.NetworkXNoPath:
-                return [], 0.0
-        else:
-            raise ValueError(f"Invalid algorithm choice: {algorithm}")
+                path, total_weight = [], 0.0
+            elapsed = time.perf_counter() - start
+            result = ShortestPathResult(path, total_weight, elapsed, compute_elapsed=elapsed)
+            self.path_cache.put(key, result)
+            return result
 
     def highlight_path(self, highlight_path_nodes: list[str]):
         """Highlight a path on the plotly figure."""
         if self.display_tool == SupplyChainApp.DisplayTools.MATPLOTLIB.value:
-            draw_graph_with_matplotlib(self.graph, highlight_path_nodes)
+            draw_graph_with_matplotlib(self.graph, highlight_path_nodes, layout=self.matplotlib_layout)
         elif self.display_tool == SupplyChainApp.DisplayTools.PLOTLY.value:
-            fig = plot_graph_nodes(self.graph)
-            highlight_path(self.graph, fig, highlight_path_nodes)
+            fig = highlight_path(self.graph, self.get_figure(), highlight_path_nodes)
+            fig.show()
 
     def show_statistics_summary(self):
-        print("\nGlobal Transaction Statistics:")
-        global_stats = self.statistics['global_statistics']
-        print(f"  Total Transactions: {global_stats['quantity']}")
-        print(f"  Total Value: {global_stats['total_value']:.2f}")
-        print(f"  Average Value: {global_stats['average_value']:.2f}")
-        print(f"  Max Value: {global_stats['max_value']:.2f}")
-        print(f"  Min Value: {global_stats['min_value']:.2f}")
+        category = self.get_valid_category()
+        cube = self.graph.graph.get('statistics_cube')
+        title = f" ({category})" if category else ""
+
+        print(f"\nGlobal Transaction Statistics{title}:")
+        global_stats = cube.total(category) if category else self.statistics['global_statistics']
+        self.print_transaction_statistics(global_stats, indent="  ")
 
         show_for_company = input("\nDo you want to see statistics for a specific company? (y/n): ").strip().lower()
         if show_for_company == 'y':
@@ -146,31 +220,83 @@ class SupplyChainApp:
             if company_id not in self.statistics['statistics_per_company']:
                 print(f"No statistics available for Company ID {company_id}.")
             else:
-                company_stats = self.statistics['statistics_per_company'][company_id]
-                print(f"\nStatistics for Company ID {company_id} - {self.graph.nodes[company_id]['name']}:")
-                exported = company_stats['exported']
-                imported = company_stats['imported']
+                company_stats = cube.company(company_id, category) if category else self.statistics['statistics_per_company'][company_id]
+                if category and company_stats['exported']['quantity'] == 0 and company_stats['imported']['quantity'] == 0:
+                    traded = ', '.join(cube.company_by_category(company_id))
+                    print(f"No {category} transactions for Company ID {company_id}, it trades in: {traded}.")
+                    return
+                print(f"\nStatistics for Company ID {company_id} - {self.graph.nodes[company_id]['name']}{title}:")
                 print("  Exported:")
-                print(f"    Total Transactions: {exported['quantity']}")
-                print(f"    Total Value: {exported['total_value']:.2f}")
-                print(f"    Average Value: {exported['average_value']:.2f}")
-                print(f"    Max Value: {exported['max_value']:.2f}")
-                print(f"    Min Value: {exported['min_value']:.2f}")
+                self.print_transaction_statistics(company_stats['exported'], indent="    ")
                 print("  Imported:")
-                print(f"    Total Transactions: {imported['quantity']}")
-                print(f"    Total Value: {imported['total_value']:.2f}")
-                print(f"    Average Value: {imported['average_value']:.2f}")
-                print(f"    Max Value: {imported['max_value']:.2f}")
-                print(f"    Min Value: {imported['min_value']:.2f}")
+                self.print_transaction_statistics(company_stats['imported'], indent="    ")
+
+    @staticmethod
+    def print_transaction_statistics(stats, indent: str):
+        print(f"{indent}Total Transactions: {stats['quantity']}")
+        print(f"{indent}Total Value: {stats['total_value']:.2f}")
+        print(f"{indent}Average Value: {stats['average_value']:.2f}")
+        print(f"{indent}Max Value: {stats['max_value']:.2f}")
+        print(f"{indent}Min Value: {stats['min_value']:.2f}")
+        sketch = stats['sketch']
+        if sketch is not None and stats['quantity'] > 0:
+            print(f"{indent}Value Percentiles (approx.): p50 {sketch.quantile(0.5):.2f}, "
+                  f"p95 {sketch.quantile(0.95):.2f}, p99 {sketch.quantile(0.99):.2f}")
+            print(f"{indent}Distinct Products (approx.): {sketch.distinct_products()}")
+
+    def show_bottlenecks(self, epsilon: float = DEFAULT_EPSILON, count: int = 10):
+        """Print companies with the highest value-weighted betweenness, computed once per graph version and error bound."""
+        start = time.perf_counter()
+        ranking = get_bottleneck_ranking(self.graph, self.statistics, epsilon, workers=self.workers)
+        elapsed = time.perf_counter() - start
+        method = "exact" if ranking.exact else f"{ranking.samples} sampled sources, ±{ranking.epsilon} with {1 - ranking.delta:.0%} confidence"
+        print(f"\nTop {count} bottleneck companies by value-weighted betweenness ({method}, {elapsed * 1000:.2f} ms):")
+        print("  Share of value-weighted demand routed through the company on shortest paths")
+        for rank, (company_id, score) in enumerate(ranking.top(count), 1):
+            node = self.graph.nodes[company_id]
+            print(f"  {rank:2}. {score:7.2%}  {node['name']} ({company_id}), {node['type']}, {node['country']}")
+
+    def get_valid_error_bound(self) -> float | None:
+        """Get the error bound of sampled betweenness, the default for empty input."""
+        while True:
+            value = input(f"\nEnter error bound of bottleneck scores (0-1), or press Enter for {DEFAULT_EPSILON}: ").strip()
+            if not value:
+                return DEFAULT_EPSILON
+            if value.lower() in ['q', 'quit', 'exit']:
+                return None
+            try:
+                epsilon = float(value)
+            except ValueError:
+                epsilon = 0.0
+            if 0 < epsilon < 1:
+                return epsilon
+            print(f"Invalid error bound '{value}'. Please enter a number between 0 and 1.")
+
+    def get_valid_category(self) -> str | None:
+        """Get a product category to slice statistics by, None for all categories."""
+        cube = self.graph.graph.get('statistics_cube')
+        if cube is None:
+            return None
+        categories = cube.categories.values
+        while True:
+            value = input(f"\nProduct categories: {', '.join(categories)}\n"
+                          "Enter a category to slice statistics by, or press Enter for all: ").strip()
+            if not value:
+                return None
+            for category in categories:
+                if category.casefold() == value.casefold():
+                    return category
+            print(f"Unknown category '{value}'. Please try again.")
 
     def get_task_choice(self) -> Tasks:
         """Get and validate task choice from user input."""
         while True:
             task = input("\nChoose task - \n"
             "(1) Visualize graph or change display tool\n" \
-            "(2) Execute and compare BFS/DFS leaf search, \n"
+            "(2) Find related leaf companies (optionally compare BFS/DFS search), \n"
             "(3) Find shortest path between companies \n"
             "(4) Show statistics summary \n"
+            "(5) Rank bottleneck companies (value-weighted betweenness) \n"
             "(q) Quit: ").strip()
 
             for t in SupplyChainApp.Tasks:
@@ -184,7 +310,7 @@ class SupplyChainApp:
         """Get and validate display tool choice from user input."""
         while True:
             value = input("\nChoose graph display tool - \n"
-            "(1) Show graph with matplotlib - connection-driven placing, process-blocking until window closed\n"
+            f"(1) Show graph with matplotlib - {self.matplotlib_layout.value} layout, window stays open while you continue in console\n"
             "(2) Show graph with plotly - place company nodes on earth map, non-blocking, opens in web browser\n"
             "(q) Quit: ").strip()
             if value in [dt.value for dt in SupplyChainApp.DisplayTools]:
@@ -199,6 +325,9 @@ class SupplyChainApp:
             value = input("\nChoose shortest path algorithm - \n"
             "(1) Custom Dijkstra's algorithm (considers edge weights) \n"
             "(2) Built-in NetworkX algorithm (considers edge weights) \n"
+            "(3) Bidirectional Dijkstra's algorithm (considers edge weights) \n"
+            "(4) A* with great-circle distance heuristic (considers edge weights) \n"
+            "(5) Dijkstra's algorithm on CSR arrays (considers edge weights) \n"
             "(q) Quit: ").strip()
             for alg in SupplyChainApp.ShortestPathAlgorithms:
                 if value == alg.value:
@@ -208,14 +337,24 @@ class SupplyChainApp:
             print("Invalid algorithm choice. Please try again.")
 
     def get_valid_company_id(self, prompt, allow_quit=True) -> str | None:
-        """Get and validate a company ID from user input."""
+        """Get and validate a company ID from user input, suggesting close matches by ID or name."""
+        index = get_company_search_index(self.graph)
+        candidates = []
         while True:
             value = input(prompt).strip()
             if allow_quit and value.lower() in ['quit', 'exit', 'q']:
                 return None
-            if value in self.graph.nodes():
-                return value
-            for node, data in self.graph.nodes(data=True):
-                if data['name'].lower() == value.lower():
-                    return data['id']
-            print(f"Company ID or name '{value}' not found. Try again.")
\ No newline at end of file
+            # right after suggestions a number picks one of them, even if it is also a company ID
+            if value.isdigit() and 1 <= int(value) <= len(candidates):
+                return candidates[int(value) - 1].company_id
+            company_id = index.lookup(value)
+            if company_id is not None:
+                return company_id
+            candidates = index.search(value)
+            if not candidates:
+                print(f"Company ID or name '{value}' not found. Try again.")
+                continue
+            print(f"Company ID or name '{value}' not found. Did you mean:")
+            for i, candidate in enumerate(candidates, 1):
+                print(f"  ({i}) {candidate.name} ({candidate.company_id})")
+            print("Enter a number to choose, or try again.")
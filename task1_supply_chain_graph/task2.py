@@ -8,26 +8,55 @@ class GraphSearchMethod(Enum):
 
 def find_related_leafs(G, company_id, method=GraphSearchMethod.BFS):
     """Find all leaf companies related to the given company in the directional graph."""
-    related_leafs_with_path = dict()
-    queue = deque(({"id": neighbor_id, "path": [company_id]}) for neighbor_id in G.neighbors(company_id))
-    visited = set([company_id])
-    while queue:
-        if method == GraphSearchMethod.BFS:
-            current = queue.popleft()
-        elif method == GraphSearchMethod.DFS:
-            current = queue.pop()
-        else:
-            raise ValueError("Invalid graph search method")
-        current_id = current["id"]
-        if current_id in visited:
-            continue
-        visited.add(current_id)
-        if G.out_degree(current_id) == 0:  # Leaf node
-            related_leafs_with_path[current_id] = current["path"] + [current_id]
-        else:
-            for neighbor in G.neighbors(current_id):
-                queue.append({"id": neighbor, "path": current["path"] + [current_id]})
-    return related_leafs_with_path
+    return dict(iter_related_leafs(G, company_id, method))
+
+def iter_related_leafs(G, company_id, method=GraphSearchMethod.BFS):
+    """
+    Yields (leaf_id, path) of related leaf companies as the search finds them.
+    The queue holds (node, parent) pairs and the search keeps one parent pointer per visited node,
+    paths are rebuilt only for reported leafs.
+    """
+    if method not in (GraphSearchMethod.BFS, GraphSearchMethod.DFS):
+        raise ValueError("Invalid graph search method")
+    queue = deque((neighbor_id, company_id) for neighbor_id in G.neighbors(company_id))
+    parents = {company_id: None}
+    if method == GraphSearchMethod.BFS:
+        # in FIFO order the first discovery of a node is also its first visit,
+        # so later duplicates are not queued at all
+        queue = deque(entry for entry in queue if entry[0] != company_id)
+        visited = set(parents)
+        visited.update(neighbor_id for neighbor_id, _ in queue)
+        while queue:
+            current_id, parent_id = queue.popleft()
+            parents[current_id] = parent_id
+            if G.out_degree(current_id) == 0:  # Leaf node
+                yield current_id, _path_to(parents, current_id)
+            else:
+                for neighbor in G.neighbors(current_id):
+                    if neighbor not in visited:
+                        visited.add(neighbor)
+                        queue.append((neighbor, current_id))
+    else:
+        # in LIFO order the last queued parent of a node wins, so only visited nodes are skipped
+        while queue:
+            current_id, parent_id = queue.pop()
+            if current_id in parents:
+                continue
+            parents[current_id] = parent_id
+            if G.out_degree(current_id) == 0:  # Leaf node
+                yield current_id, _path_to(parents, current_id)
+            else:
+                for neighbor in G.neighbors(current_id):
+                    if neighbor not in parents:
+                        queue.append((neighbor, current_id))
+
+def _path_to(parents, node_id):
+    path = []
+    while node_id is not None:
+        path.append(node_id)
+        node_id = parents[node_id]
+    path.reverse()
+    return path
 
 def find_related_leafs_compare(G, company_id):
     """Find all leaf companies related to the given company in the directional graph."""
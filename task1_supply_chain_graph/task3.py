@@ -1,38 +1,193 @@
 import heapq
+import math
+import weakref
 
 class GraphPathNotFound(Exception):
     pass
 
 def dijkstra_shortest_path(G, source, target):
+    """
+    Point-to-point Dijkstra: stops as soon as the target is popped from the heap,
+    distance and predecessor maps only hold the nodes reached so far.
+    """
+    distances, previous_nodes = _dijkstra(G, source, target)
+
+    if target not in distances:
+        raise GraphPathNotFound(f"No path exists between {source} and {target}.")
+
+    return _path_to(previous_nodes, target), distances[target]
+
+def dijkstra_single_source(G, source):
+    """
+    Runs Dijkstra from the source over the whole reachable graph.
+    Returns distances and predecessors of every reachable node; paths rebuilt from them
+    are the same as dijkstra_shortest_path returns for each target.
+    """
+    return _dijkstra(G, source)
+
+def _dijkstra(G, source, target=None):
     queue = []
     heapq.heappush(queue, (0, source))
-    distances = {node: float('inf') for node in G.nodes}
-    distances[source] = 0
-    previous_nodes = {node: None for node in G.nodes}
+    distances = {source: 0}
+    previous_nodes = {source: None}
 
     while queue:
         current_distance, current_node = heapq.heappop(queue)
 
+        if current_node == target:
+            break
         if current_distance > distances[current_node]:
             continue
 
-        for neighbor in G.neighbors(current_node):
-            weight = G[current_node][neighbor].get('weight', 1)
-            distance = current_distance + weight
+        for neighbor, attrs in G.adj[current_node].items():
+            distance = current_distance + attrs.get('weight', 1)
 
-            if distance < distances[neighbor]:
+            if distance < distances.get(neighbor, math.inf):
                 distances[neighbor] = distance
                 previous_nodes[neighbor] = current_node
                 heapq.heappush(queue, (distance, neighbor))
 
-    path = []
-    current_node = target
-    if distances[target] == float('inf'):
+    return distances, previous_nodes
+
+def bidirectional_dijkstra_shortest_path(G, source, target):
+    """
+    Runs Dijkstra forward from the source over successors and backward from the target
+    over predecessors, stopping when the two frontiers cannot improve the best meeting point.
+    """
+    if source == target:
+        return [source], 0
+
+    distances = ({source: 0}, {target: 0})
+    previous_nodes = ({source: None}, {target: None})
+    queues = ([(0, source)], [(0, target)])
+    settled = (set(), set())
+    neighbors = (G.succ, G.pred)
+    best_distance = math.inf
+    meeting_node = None
+
+    while queues[0] and queues[1]:
+        if queues[0][0][0] + queues[1][0][0] >= best_distance:
+            break
+        # expand the side with the smaller frontier
+        side = 0 if len(queues[0]) <= len(queues[1]) else 1
+        current_distance, current_node = heapq.heappop(queues[side])
+        if current_node in settled[side]:
+            continue
+        settled[side].add(current_node)
+
+        for neighbor, attrs in neighbors[side][current_node].items():
+            distance = current_distance + attrs.get('weight', 1)
+            if distance < distances[side].get(neighbor, math.inf):
+                distances[side][neighbor] = distance
+                previous_nodes[side][neighbor] = current_node
+                heapq.heappush(queues[side], (distance, neighbor))
+            other_distance = distances[1 - side].get(neighbor)
+            if other_distance is not None and distances[side][neighbor] + other_distance < best_distance:
+                best_distance = distances[side][neighbor] + other_distance
+                meeting_node = neighbor
+
+    if meeting_node is None:
+        raise GraphPathNotFound(f"No path exists between {source} and {target}.")
+
+    forward = _path_to(previous_nodes[0], meeting_node)
+    backward = _path_to(previous_nodes[1], meeting_node)
+    return forward + backward[::-1][1:], best_distance
+
+def astar_shortest_path(G, source, target):
+    """
+    A* search with a great-circle heuristic: the distance to the target in km times
+    the smallest weight-per-km ratio over all edges. No edge is cheaper per km than that ratio,
+    so the heuristic never overestimates and the result is as exact as Dijkstra's.
+    Nodes without lat/lon get a zero heuristic.
+    """
+    weight_per_km, coordinates = _geographic_model(G)
+    target_coordinates = coordinates.get(target)
+    heuristics = {}
+
+    def heuristic(node):
+        h = heuristics.get(node)
+        if h is None:
+            node_coordinates = coordinates.get(node)
+            if weight_per_km == 0 or node_coordinates is None or target_coordinates is None:
+                h = 0
+            else:
+                h = weight_per_km * great_circle_km(node_coordinates, target_coordinates)
+            heuristics[node] = h
+        return h
+
+    queue = [(heuristic(source), 0, source)]
+    distances = {source: 0}
+    previous_nodes = {source: None}
+
+    while queue:
+        _, current_distance, current_node = heapq.heappop(queue)
+
+        if current_node == target:
+            break
+        if current_distance > distances[current_node]:
+            continue
+
+        for neighbor, attrs in G.adj[current_node].items():
+            distance = current_distance + attrs.get('weight', 1)
+            if distance < distances.get(neighbor, math.inf):
+                distances[neighbor] = distance
+                previous_nodes[neighbor] = current_node
+                heapq.heappush(queue, (distance + heuristic(neighbor), distance, neighbor))
+
+    if target not in distances:
         raise GraphPathNotFound(f"No path exists between {source} and {target}.")
 
-    while current_node is not None:
-        path.append(current_node)
-        current_node = previous_nodes[current_node]
+    return _path_to(previous_nodes, target), distances[target]
+
+def great_circle_km(a: tuple[float, float], b: tuple[float, float]) -> float:
+    """Haversine distance in km between two (lat, lon) points in degrees"""
+    lat_a, lon_a = math.radians(a[0]), math.radians(a[1])
+    lat_b, lon_b = math.radians(b[0]), math.radians(b[1])
+    h = math.sin((lat_b - lat_a) / 2) ** 2 + math.cos(lat_a) * math.cos(lat_b) * math.sin((lon_b - lon_a) / 2) ** 2
+    return 2 * 6371.0 * math.asin(min(1.0, math.sqrt(h)))
+
+def _path_to(previous_nodes, node):
+    path = []
+    while node is not None:
+        path.append(node)
+        node = previous_nodes[node]
     path.reverse()
+    return path
+
+def _coordinates(G, node) -> tuple[float, float] | None:
+    attrs = G.nodes[node]
+    try:
+        return float(attrs['lat']), float(attrs['lon'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+# (graph version, smallest edge weight per km, node coordinates) per graph object
+_geographic_models = weakref.WeakKeyDictionary()
+
+def _geographic_model(G) -> tuple[float, dict]:
+    """Smallest edge weight per km of great-circle distance and parsed node coordinates, cached per graph version"""
+    version = G.graph.get('version')
+    cached = _geographic_models.get(G)
+    if cached is not None and cached[0] == version:
+        return cached[1], cached[2]
+
+    coordinates = {}
+    for node in G.nodes:
+        node_coordinates = _coordinates(G, node)
+        if node_coordinates is not None:
+            coordinates[node] = node_coordinates
+
+    ratio = math.inf
+    for u, v, weight in G.edges(data='weight', default=1):
+        if u not in coordinates or v not in coordinates:
+            # an edge of unknown length could be arbitrarily cheap per km
+            ratio = 0.0
+            break
+        distance = great_circle_km(coordinates[u], coordinates[v])
+        if distance > 0:
+            ratio = min(ratio, weight / distance)
+    if ratio == math.inf:
+        ratio = 0.0
 
-    return path, distances[target]
\ No newline at end of file
+    _geographic_models[G] = (version, ratio, coordinates)
+    return ratio, coordinates